@@ -0,0 +1,443 @@
+# -*- coding: utf-8 -*-
+"""
+基准测试 - 在模拟桌面上测量定位、读取、条件处理和监控循环的耗时，结果可保存为JSON并与基线对比
+
+    python benchmark.py --output baseline.json
+    python benchmark.py --latency 0.0002 --compare baseline.json
+"""
+
+import argparse
+import json
+import os
+import platform
+import random
+import statistics
+import sys
+import tempfile
+import time
+
+from conditions import CompiledMonitor, get_checker, get_extractor
+from element_cache import locator_fingerprint
+from engine import MonitorEngine
+from monitor import MonitorManager
+from sim_desktop import SimulatedDesktop
+from sound_bank import SoundBank
+from sound_player import SoundPlayer
+from stats import Stats
+from ui_selector import UISelector
+
+
+# 结果文件的格式版本
+RESULT_VERSION = 1
+
+# 监控循环测试的监控项数
+LOOP_SIZES = (10, 100, 1000)
+
+# 条件处理测试使用的 (提取方式, 条件, 目标值)
+CONDITION_CASES = (
+    ("原始值", "=", "500.00"),
+    ("提取数字", ">", "500"),
+    ("提取数字", "<=", "250.5"),
+    ("提取整数", "!=", "0"),
+    ("提取小数", ">=", "999.9"),
+    ("去除空格", "包含", "5"),
+    ("取长度", "<", "8"),
+)
+
+# 对比时超过这个比例的变慢记为退化
+DEFAULT_THRESHOLD = 0.2
+
+# 监控循环测试的读取超时（秒）：要测量的是全部读取的耗时，不能让超时丢弃读取
+LOOP_READ_TIMEOUT = 600.0
+
+
+class Benchmark:
+    def __init__(self, windows=4, width=5, depth=4, latency=0.0, seed=0, targets=200, repeat=5, ticks=20,
+                 churn=0.1, stats=False):
+        """
+        windows/width/depth: 模拟桌面的窗口数、每层子元素数和层数
+        latency: 每次跨进程调用的模拟延迟（秒）
+        seed: 随机种子，相同参数生成相同的树和目标
+        targets: 定位和读取测试使用的元素个数
+        repeat: 每项测试重复的次数（取最好和中位数）
+        ticks: 监控循环测试中测量的轮数
+        churn: 监控循环测试中每轮值发生变化的元素比例
+        stats: 是否开启性能统计（默认关闭，只测量监控本身）
+        """
+        self.params = {
+            "windows": windows,
+            "width": width,
+            "depth": depth,
+            "latency": latency,
+            "seed": seed,
+            "targets": targets,
+            "repeat": repeat,
+            "ticks": ticks,
+            "churn": churn,
+            "stats": stats,
+        }
+        self.repeat = repeat
+        self.ticks = ticks
+        self.churn = churn
+        self.stats = Stats(enabled=stats)
+
+        self.desktop = SimulatedDesktop(windows=windows, width=width, depth=depth, latency=latency, seed=seed)
+        self.random = random.Random(seed)
+        self.results = {}
+        self.only = None
+        self.errors = []  # 结果不可信的原因，如读取超时或被拒绝
+
+        # 在叶子元素中均匀取样作为目标
+        leaves = self.desktop.leaves()
+        step = max(1, len(leaves) // targets)
+        self.leaves = leaves
+        self.targets = leaves[::step][:targets]
+
+        selector = UISelector(None, backend=self.desktop)
+        self.infos = {id(control): selector._get_element_info(control) for control in leaves}
+
+    def run(self, only=None):
+        """运行所有测试，返回结果（only: 名称前缀列表，如 ["find", "loop.100"]，只运行匹配的测试）"""
+        self.only = only
+        benchmarks = (
+            ("find", self.bench_find),
+            ("read", self.bench_read),
+            ("conditions", self.bench_conditions),
+            ("loop", self.bench_loop),
+        )
+        for name, bench in benchmarks:
+            if only and not any(prefix.split(".")[0] == name for prefix in only):
+                continue
+            bench()
+
+        self.results = {name: result for name, result in self.results.items() if self._selected(name)}
+        return self.results
+
+    def _selected(self, name):
+        """测试是否在 only 的范围内（前缀按 "." 分段匹配）"""
+        if not self.only:
+            return True
+        return any(name == prefix or name.startswith(prefix + ".") or prefix.startswith(name + ".")
+                   for prefix in self.only)
+
+    def to_dict(self):
+        """可保存为JSON的完整结果（errors 非空时结果不可信）"""
+        return {
+            "version": RESULT_VERSION,
+            "time": time.time(),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "params": self.params,
+            "results": self.results,
+        }
+
+    def _new_manager(self):
+        return MonitorManager(self.desktop, stats=self.stats)
+
+    def _measure(self, name, ops, setup, func):
+        """
+        重复 repeat 次：每次先调用 setup()（不计时），再对 func(state) 计时
+        ops: 每次 func 执行的操作数，用于计算单次耗时和调用次数
+        """
+        times = []
+        calls = 0
+        for _ in range(self.repeat):
+            state = setup()
+            self.desktop.reset_stats()
+            start = time.perf_counter()
+            func(state)
+            times.append(time.perf_counter() - start)
+            calls += self.desktop.calls
+
+        best = min(times)
+        median = statistics.median(times)
+        self.results[name] = {
+            "ops": ops,
+            "best": best,
+            "median": median,
+            "per_op_us": best / ops * 1e6 if ops else 0.0,
+            "calls_per_op": calls / self.repeat / ops if ops else 0.0,
+        }
+        return self.results[name]
+
+    # ---- 定位 ----
+
+    def bench_find(self):
+        """三种定位方式分别定位所有目标（每次使用新的 MonitorManager，不命中任何缓存）"""
+        locators = [self.infos[id(control)]["locator"] for control in self.targets]
+        by_strategy = (
+            ("automation_id", "_find_by_automation_id", [locator for locator in locators if locator.get("automation_id")]),
+            ("path", "_find_by_path", [locator for locator in locators if locator.get("path")]),
+            ("properties", "_find_by_properties", locators),
+        )
+
+        for strategy, method, targets in by_strategy:
+            def setup():
+                manager = self._new_manager()
+                manager.begin_tick()
+                return manager
+
+            def find_all(manager, method=method, targets=targets):
+                find = getattr(manager, method)
+                for locator in targets:
+                    find(locator)
+
+            self._measure(f"find.{strategy}", len(targets), setup, find_all)
+
+        # 路径定位的祖先链已缓存时（元素失效后重新定位的常见情况）
+        path_targets = by_strategy[1][2]
+
+        def setup_warm():
+            manager = setup()
+            for locator in path_targets:
+                manager._find_by_path(locator)
+            return manager
+
+        def find_path(manager):
+            for locator in path_targets:
+                manager._find_by_path(locator)
+
+        self._measure("find.path.warm", len(path_targets), setup_warm, find_path)
+
+    # ---- 读取 ----
+
+    def bench_read(self):
+        """读取已定位元素的值：逐个探测读取方式、使用记住的读取方式、同进程批量读取"""
+        manager = self._new_manager()
+        infos = [self.infos[id(control)] for control in self.targets]
+        elements = [(manager.resolve_element(info), locator_fingerprint(info["locator"])) for info in infos]
+        elements = [(element, key) for element, key in elements if element is not None]
+
+        def probe(_):
+            for element, _ in elements:
+                manager._get_value(element)
+
+        self._measure("read.probe", len(elements), lambda: None, probe)
+
+        def memoized(_):
+            for element, key in elements:
+                manager._get_value(element, key)
+
+        for element, key in elements:
+            manager._get_value(element, key)
+        self._measure("read.memoized", len(elements), lambda: None, memoized)
+
+        by_process = {}
+        for info in infos:
+            by_process.setdefault(info["locator"].get("process_id", 0), []).append(info)
+
+        def bulk(_):
+            manager.begin_tick()
+            for process_infos in by_process.values():
+                manager.get_element_values(process_infos)
+
+        bulk(None)
+        self._measure("read.bulk", len(infos), lambda: None, bulk)
+
+    # ---- 提取和条件 ----
+
+    def bench_conditions(self):
+        """提取方式和条件检查的吞吐：每次查找函数（界面的 extract_value/check_condition）和预编译流水线"""
+        values = [f"{self.random.uniform(-1000, 1000):.2f}" for _ in range(1000)]
+        values += [f" 价格: {value} 元 " for value in values[:500]]
+        ops = len(values) * len(CONDITION_CASES)
+
+        def uncompiled(_):
+            for mode, condition, target in CONDITION_CASES:
+                for value in values:
+                    get_checker(condition, target)(get_extractor(mode)(value))
+
+        self._measure("conditions.lookup", ops, lambda: None, uncompiled)
+
+        pipelines = [
+            CompiledMonitor({"extract_mode": mode, "condition": condition, "target_value": target})
+            for mode, condition, target in CONDITION_CASES
+        ]
+
+        def compiled(_):
+            for pipeline in pipelines:
+                extract = pipeline.extract
+                check = pipeline.check
+                for value in values:
+                    check(extract(value))
+
+        self._measure("conditions.compiled", ops, lambda: None, compiled)
+
+    # ---- 监控循环 ----
+
+    def bench_loop(self):
+        """端到端的监控循环：每轮所有元素都到期，部分元素的值发生变化"""
+        for size in LOOP_SIZES:
+            if not self._selected(f"loop.{size}"):
+                continue
+            if size > len(self.leaves):
+                print(f"跳过 loop.{size}: 模拟桌面只有 {len(self.leaves)} 个叶子元素")
+                continue
+            self._bench_loop_size(size)
+
+    def _bench_loop_size(self, size):
+        step = max(1, len(self.leaves) // size)
+        controls = self.leaves[::step][:size]
+        config_file = os.path.join(tempfile.gettempdir(), f"benchmark_monitors_{os.getpid()}.json")
+
+        def new_engine():
+            engine = MonitorEngine(
+                backend=self.desktop,
+                sound_player=SoundPlayer(SoundBank(driver="dummy")),
+                config_file=config_file,
+                stats=self.stats
+            )
+            engine.read_pool.timeout = LOOP_READ_TIMEOUT
+            for control in controls:
+                # 条件不会满足，只测量读取和处理
+                engine.schedule_item({
+                    "element_info": self.infos[id(control)],
+                    "condition": ">",
+                    "target_value": "1e12",
+                    "extract_mode": "提取数字",
+                    "sound_file": "",
+                    "interval": 1,
+                    "enabled": True,
+                })
+            return engine
+
+        def tick(engine):
+            # 让所有元素立即到期
+            for group in list(engine._groups.values()):
+                engine.scheduler.run_now(group)
+            return engine.run_once()
+
+        engines = []
+
+        def setup_cold():
+            engine = new_engine()
+            engines.append(engine)
+            return engine
+
+        self._measure(f"loop.{size}.cold", size, setup_cold, tick)
+
+        engine = new_engine()
+        engines.append(engine)
+        tick(engine)
+        changing = max(1, int(size * self.churn)) if self.churn > 0 else 0
+
+        def setup_warm():
+            return engine
+
+        def steady(engine):
+            for _ in range(self.ticks):
+                for control in self.random.sample(controls, changing):
+                    self.desktop.set_value(control, f"{self.random.uniform(0, 1000):.2f}")
+                tick(engine)
+
+        self._measure(f"loop.{size}", size * self.ticks, setup_warm, steady)
+
+        # 超时或被拒绝的读取没有真正执行，这样的耗时不可比
+        dropped = {"timeouts": 0, "rejected": 0}
+        for engine in engines:
+            pool_stats = engine.read_pool.stats()
+            dropped["timeouts"] += pool_stats["timeouts"]
+            dropped["rejected"] += pool_stats["rejected"]
+            engine.stop()
+
+        for name in (f"loop.{size}.cold", f"loop.{size}"):
+            self.results[name].update(dropped)
+        if dropped["timeouts"] or dropped["rejected"]:
+            self.errors.append(f"loop.{size}: {dropped['timeouts']} 次读取超时, {dropped['rejected']} 次读取被拒绝")
+
+
+def compare(baseline, current, threshold=DEFAULT_THRESHOLD):
+    """
+    对比两次结果（Benchmark.to_dict() 的格式）
+    返回 [(名称, 基线单次微秒, 当前单次微秒, 比例, 基线调用次数, 当前调用次数, 是否退化)]
+    """
+    rows = []
+    for name, result in current["results"].items():
+        base = baseline.get("results", {}).get(name)
+        if base is None:
+            continue
+
+        ratio = result["per_op_us"] / base["per_op_us"] if base["per_op_us"] else 1.0
+        regressed = ratio > 1 + threshold or result["calls_per_op"] > base["calls_per_op"] * (1 + threshold) + 1e-9
+        rows.append((name, base["per_op_us"], result["per_op_us"], ratio,
+                     base["calls_per_op"], result["calls_per_op"], regressed))
+    return rows
+
+
+def format_results(results):
+    lines = [f"{'测试':<24}{'操作数':>8}{'单次us':>12}{'中位ms':>10}{'调用/次':>10}"]
+    for name, result in results.items():
+        lines.append(
+            f"{name:<24}{result['ops']:>8}{result['per_op_us']:>12.2f}"
+            f"{result['median'] * 1000:>10.2f}{result['calls_per_op']:>10.2f}"
+        )
+    return "\n".join(lines)
+
+
+def format_comparison(rows):
+    lines = [f"{'测试':<24}{'基线us':>10}{'当前us':>10}{'比例':>8}{'基线调用':>10}{'当前调用':>10}"]
+    for name, base_us, current_us, ratio, base_calls, current_calls, regressed in rows:
+        lines.append(
+            f"{name:<24}{base_us:>10.2f}{current_us:>10.2f}{ratio:>8.2f}"
+            f"{base_calls:>10.2f}{current_calls:>10.2f}" + ("  退化" if regressed else "")
+        )
+    return "\n".join(lines)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="UI元素监控基准测试（模拟桌面）")
+    parser.add_argument("--windows", type=int, default=4, help="顶层窗口数")
+    parser.add_argument("--width", type=int, default=5, help="每层子元素数")
+    parser.add_argument("--depth", type=int, default=4, help="每个窗口下的层数")
+    parser.add_argument("--latency", type=float, default=0.0, help="每次跨进程调用的模拟延迟（秒）")
+    parser.add_argument("--seed", type=int, default=0, help="随机种子")
+    parser.add_argument("--targets", type=int, default=200, help="定位和读取测试的元素个数")
+    parser.add_argument("--repeat", type=int, default=5, help="每项测试的重复次数")
+    parser.add_argument("--ticks", type=int, default=20, help="监控循环测试的轮数")
+    parser.add_argument("--churn", type=float, default=0.1, help="监控循环中每轮值变化的元素比例")
+    parser.add_argument("--stats", action="store_true", help="开启性能统计")
+    parser.add_argument("--only", default="", help="只运行这些测试，逗号分隔的名称前缀，如 find,loop.100")
+    parser.add_argument("--output", default=None, help="把结果保存到这个JSON文件")
+    parser.add_argument("--compare", default=None, help="与这个JSON文件中的基线结果对比")
+    parser.add_argument("--threshold", type=float, default=DEFAULT_THRESHOLD, help="记为退化的变慢比例")
+    args = parser.parse_args(argv)
+
+    benchmark = Benchmark(
+        windows=args.windows, width=args.width, depth=args.depth, latency=args.latency, seed=args.seed,
+        targets=args.targets, repeat=args.repeat, ticks=args.ticks, churn=args.churn, stats=args.stats
+    )
+    only = [prefix for prefix in args.only.split(",") if prefix]
+    benchmark.run(only)
+    current = benchmark.to_dict()
+
+    print(format_results(current["results"]))
+
+    if benchmark.errors:
+        for error in benchmark.errors:
+            print(f"错误: {error}")
+        print("部分读取没有执行，结果不可信，未保存也未对比")
+        return 2
+
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(current, f, ensure_ascii=False, indent=2)
+        print(f"结果已保存到 {args.output}")
+
+    if args.compare:
+        with open(args.compare, "r", encoding="utf-8") as f:
+            baseline = json.load(f)
+
+        if baseline.get("params") != current["params"]:
+            print("注意: 基线的测试参数不同，对比结果仅供参考")
+
+        rows = compare(baseline, current, args.threshold)
+        print()
+        print(format_comparison(rows))
+        if any(row[-1] for row in rows):
+            return 1
+
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,148 @@
+# -*- coding: utf-8 -*-
+"""
+条件编译 - 把监控项的提取方式和条件预先编译成可直接调用的流水线
+"""
+
+import operator
+import re
+
+
+# 预编译的正则
+_NUMBER_RE = re.compile(r'-?\d+\.?\d*')
+_INTEGER_RE = re.compile(r'-?\d+')
+_DECIMAL_RE = re.compile(r'-?\d+\.\d+')
+_WHITESPACE_TABLE = str.maketrans("", "", " \t\n")
+
+
+def _first_match(pattern):
+    """生成提取第一个匹配项的函数"""
+    search = pattern.search
+
+    def extract(value_str):
+        match = search(value_str)
+        return match.group(0) if match else ""
+
+    return extract
+
+
+def _extract_decimal(value_str):
+    """提取小数，没有小数时提取整数"""
+    match = _DECIMAL_RE.search(value_str) or _INTEGER_RE.search(value_str)
+    return match.group(0) if match else ""
+
+
+# 提取方式：名称 -> 处理函数（参数和返回值都是字符串）
+EXTRACT_MODES = {
+    "原始值": lambda value_str: value_str,
+    "提取数字": _first_match(_NUMBER_RE),
+    "提取整数": _first_match(_INTEGER_RE),
+    "提取小数": _extract_decimal,
+    "去除空格": lambda value_str: value_str.translate(_WHITESPACE_TABLE),
+    "取长度": lambda value_str: str(len(value_str)),
+}
+
+# 条件：名称 -> (数值比较函数, 字符串比较函数)，不支持的方式为None
+# 两边都能转为数字时使用数值比较，否则使用字符串比较
+OPERATORS = {
+    ">": (operator.gt, None),
+    "<": (operator.lt, None),
+    "=": (operator.eq, operator.eq),
+    ">=": (operator.ge, None),
+    "<=": (operator.le, None),
+    "!=": (operator.ne, operator.ne),
+    "包含": (None, lambda current, target: target in current),
+    "不包含": (None, lambda current, target: target not in current),
+}
+
+
+def get_extractor(mode):
+    """获取提取函数，未知的提取方式按原始值处理"""
+    extract = EXTRACT_MODES.get(mode, EXTRACT_MODES["原始值"])
+
+    def extractor(value):
+        if value is None:
+            return ""
+        return extract(str(value))
+
+    return extractor
+
+
+# 回差的方向：已触发后，目标值按这个方向放宽回差，值越过放宽后的目标才解除
+_HYSTERESIS_SIGN = {">": -1, ">=": -1, "<": 1, "<=": 1}
+
+
+def get_release_checker(condition, target, hysteresis):
+    """
+    获取带回差的条件检查函数：已触发的监控项只要它仍然满足就保持触发
+    只对数值大小比较生效，其他条件或目标值不是数字时与 get_checker 相同
+    """
+    sign = _HYSTERESIS_SIGN.get(condition)
+    if sign is not None and hysteresis:
+        try:
+            target = float(target) if target else 0
+        except (ValueError, TypeError):
+            pass
+        else:
+            return get_checker(condition, target + sign * abs(hysteresis))
+
+    return get_checker(condition, target)
+
+
+def get_checker(condition, target):
+    """获取条件检查函数，目标值在此时预先解析"""
+    numeric_op, string_op = OPERATORS.get(condition, (None, None))
+    target_str = str(target) if target else ""
+
+    # 预先解析目标值
+    target_num = None
+    if numeric_op is not None:
+        try:
+            target_num = float(target) if target else 0
+        except (ValueError, TypeError):
+            target_num = None
+
+    if target_num is not None:
+        def check(current):
+            try:
+                current_num = float(current) if current else 0
+            except (ValueError, TypeError):
+                if string_op is None:
+                    return False
+                return string_op(str(current) if current else "", target_str)
+            return numeric_op(current_num, target_num)
+
+    elif string_op is not None:
+        def check(current):
+            return string_op(str(current) if current else "", target_str)
+
+    else:
+        def check(current):
+            return False
+
+    return check
+
+
+class CompiledMonitor:
+    """编译后的监控项：提取函数、条件检查函数和带回差的解除检查函数"""
+
+    __slots__ = ("extract", "check", "hold")
+
+    def __init__(self, item):
+        condition = item.get("condition", "=")
+        target = item.get("target_value", "")
+
+        self.extract = get_extractor(item.get("extract_mode", "原始值"))
+        self.check = get_checker(condition, target)
+        self.hold = get_release_checker(condition, target, _to_float(item.get("hysteresis", 0)))
+
+    def evaluate(self, value):
+        """处理原始值，返回 (提取后的值, 是否满足条件)"""
+        extracted = self.extract(value)
+        return extracted, self.check(extracted)
+
+
+def _to_float(value):
+    try:
+        return float(value) if value else 0.0
+    except (ValueError, TypeError):
+        return 0.0
@@ -0,0 +1,137 @@
+# -*- coding: utf-8 -*-
+"""
+配置存储 - 监控项快照 + 追加式变更日志
+单次增删只追加一行日志，日志达到一定长度后合并为新快照，快照通过临时文件+重命名原子替换
+"""
+
+import json
+import os
+
+
+# 日志条数达到这个数量时合并为快照
+COMPACT_EVERY = 200
+
+# 快照格式版本
+SNAPSHOT_VERSION = 1
+
+
+class ConfigStore:
+    def __init__(self, path, compact_every=COMPACT_EVERY):
+        """
+        初始化配置存储
+        path: 快照文件路径，日志文件为 path + ".journal"
+        compact_every: 日志达到多少条时需要合并
+        """
+        self.path = path
+        self.journal_path = path + ".journal"
+        self.compact_every = compact_every
+
+        self._seq = 0  # 最后一条变更的序号
+        self._journal_size = 0  # 日志中尚未合并的条数
+
+    @property
+    def needs_compaction(self):
+        """日志是否已经足够长，需要合并为快照"""
+        return self._journal_size >= self.compact_every
+
+    @property
+    def dirty(self):
+        """日志中是否有尚未合并到快照的变更"""
+        return self._journal_size > 0
+
+    def load(self):
+        """
+        读取快照并重放日志，返回监控项列表
+        兼容旧版的整体JSON列表；日志末尾不完整的行（写入时崩溃）被忽略
+        """
+        items = []
+        snapshot_seq = 0
+
+        if os.path.exists(self.path):
+            with open(self.path, "r", encoding="utf-8") as f:
+                data = json.load(f)
+
+            if isinstance(data, list):
+                items = data  # 旧版格式
+            else:
+                items = data.get("items", [])
+                snapshot_seq = data.get("seq", 0)
+
+        self._seq = snapshot_seq
+        replayed, damaged = self._replay(items, snapshot_seq)
+
+        # 日志中有内容时合并一次，之后的变更追加到空日志上
+        if replayed or damaged:
+            self.compact(items)
+
+        return items
+
+    def add(self, item):
+        """记录新增的监控项"""
+        self._append({"op": "add", "item": item})
+
+    def remove(self, index):
+        """记录删除第index个监控项"""
+        self._append({"op": "remove", "index": index})
+
+    def compact(self, items):
+        """把当前的监控项写为新快照并清空日志"""
+        data = {"version": SNAPSHOT_VERSION, "seq": self._seq, "items": items}
+        _write_atomic(self.path, json.dumps(data, ensure_ascii=False, separators=(",", ":")))
+
+        # 快照已包含所有变更，日志可以清空（即使这里失败，重放时也会按序号跳过）
+        _write_atomic(self.journal_path, "")
+        self._journal_size = 0
+
+    def _append(self, entry):
+        """追加一条日志并落盘"""
+        self._seq += 1
+        entry["seq"] = self._seq
+
+        line = json.dumps(entry, ensure_ascii=False, separators=(",", ":"))
+        with open(self.journal_path, "a", encoding="utf-8") as f:
+            f.write(line + "\n")
+            f.flush()
+            os.fsync(f.fileno())
+
+        self._journal_size += 1
+
+    def _replay(self, items, snapshot_seq):
+        """按顺序把日志应用到items上，返回 (应用的条数, 日志是否损坏)"""
+        if not os.path.exists(self.journal_path):
+            return 0, False
+
+        replayed = 0
+        with open(self.journal_path, "r", encoding="utf-8") as f:
+            for line in f:
+                try:
+                    entry = json.loads(line)
+                    seq = entry["seq"]
+                    op = entry["op"]
+                except (ValueError, KeyError, TypeError):
+                    return replayed, True
+
+                # 快照已包含的变更
+                if seq <= snapshot_seq:
+                    continue
+
+                if op == "add":
+                    items.append(entry["item"])
+                elif op == "remove":
+                    if 0 <= entry["index"] < len(items):
+                        del items[entry["index"]]
+
+                self._seq = seq
+                replayed += 1
+
+        return replayed, False
+
+
+def _write_atomic(path, text):
+    """先写入同目录的临时文件再重命名，写入中途崩溃不会损坏原文件"""
+    temp_path = path + ".tmp"
+    with open(temp_path, "w", encoding="utf-8") as f:
+        f.write(text)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(temp_path, path)
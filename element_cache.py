@@ -0,0 +1,219 @@
+# -*- coding: utf-8 -*-
+"""
+元素缓存 - 缓存已定位的UI元素，复用前做轻量校验，按LRU/TTL淘汰
+"""
+
+import threading
+import time
+from collections import OrderedDict
+
+
+def locator_fingerprint(locator):
+    """
+    根据定位器生成稳定的指纹（可哈希）
+    相同的定位器总是得到相同的指纹，与字典顺序无关
+    """
+    if not locator:
+        return ()
+
+    path = tuple(
+        (
+            item.get("automation_id", ""),
+            item.get("class_name", ""),
+            item.get("control_type", ""),
+            item.get("name", ""),
+        )
+        for item in locator.get("path", []) or []
+    )
+
+    return (
+        locator.get("automation_id", ""),
+        locator.get("class_name", ""),
+        locator.get("control_type", ""),
+        locator.get("name", ""),
+        locator.get("process_id", 0),
+        path,
+    )
+
+
+class _CacheEntry:
+    __slots__ = ("element", "process_id", "runtime_id", "created", "reader")
+
+    def __init__(self, element, process_id, runtime_id, created):
+        self.element = element
+        self.process_id = process_id
+        self.runtime_id = runtime_id
+        self.created = created
+        self.reader = None  # 上次成功读取值的方式
+
+
+class ElementCache:
+    def __init__(self, max_size=256, ttl=30.0, validator=None, process_checker=None,
+                 process_check_interval=1.0, clock=time.monotonic):
+        """
+        初始化元素缓存
+        max_size: 最多缓存的元素个数，超出后淘汰最久未使用的
+        ttl: 缓存有效期（秒），超时后强制重新定位，None表示不过期
+        validator: 校验元素是否仍然有效的函数 validator(element, runtime_id) -> bool
+        process_checker: 检查进程是否存在的函数 process_checker(process_id) -> bool
+        process_check_interval: 同一进程的存活检查结果复用时间（秒）
+        clock: 时钟函数（便于测试）
+        """
+        self.max_size = max_size
+        self.ttl = ttl
+        self.validator = validator
+        self.process_checker = process_checker
+        self.process_check_interval = process_check_interval
+        self.clock = clock
+
+        self._entries = OrderedDict()
+        self._process_checked = {}  # process_id -> 上次确认存活的时间
+        self._lock = threading.RLock()
+
+        # 统计
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def __len__(self):
+        return len(self._entries)
+
+    def __contains__(self, key):
+        return key in self._entries
+
+    def get(self, key):
+        """获取缓存的元素，元素失效或过期时返回None"""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+
+            if self._expired(key, entry):
+                self.misses += 1
+                return None
+
+        # 校验元素本身（可能涉及跨进程调用，不持有锁）
+        if self.validator is not None:
+            try:
+                alive = self.validator(entry.element, entry.runtime_id)
+            except Exception:
+                alive = False
+
+            if not alive:
+                with self._lock:
+                    if self._entries.get(key) is entry:
+                        self._drop(key)
+                    self.misses += 1
+                return None
+
+        with self._lock:
+            if self._entries.get(key) is entry:
+                self._entries.move_to_end(key)
+            self.hits += 1
+
+        return entry.element
+
+    def put(self, key, element, process_id=0, runtime_id=None):
+        """缓存已定位的元素"""
+        with self._lock:
+            if key in self._entries:
+                del self._entries[key]
+
+            self._entries[key] = _CacheEntry(element, process_id, runtime_id, self.clock())
+
+            while self.max_size and len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def peek(self, key):
+        """
+        查看缓存项，返回 (元素, runtime_id, 取值方式)，未缓存、过期或进程已退出时返回None
+        不调用 validator，用于能以其他方式确认元素有效的场景（如批量快照中包含该元素）
+        """
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or self._expired(key, entry):
+                return None
+            self._entries.move_to_end(key)
+            return entry.element, entry.runtime_id, entry.reader
+
+    def process_of(self, key):
+        """获取缓存项所属的进程ID（不做校验），未缓存时返回None"""
+        with self._lock:
+            entry = self._entries.get(key)
+            return entry.process_id if entry is not None else None
+
+    def reader_of(self, key):
+        """获取缓存元素上次成功的取值方式，未记录时返回None"""
+        entry = self._entries.get(key)
+        return entry.reader if entry is not None else None
+
+    def set_reader(self, key, reader):
+        """记录缓存元素成功的取值方式（元素重新定位后自动清除）"""
+        entry = self._entries.get(key)
+        if entry is not None:
+            entry.reader = reader
+
+    def invalidate(self, key):
+        """使指定的缓存项失效"""
+        with self._lock:
+            self._drop(key)
+
+    def invalidate_process(self, process_id):
+        """使某个进程的所有缓存项失效（进程退出时调用）"""
+        with self._lock:
+            self._drop_process(process_id)
+
+    def clear(self):
+        """清空缓存"""
+        with self._lock:
+            self._entries.clear()
+            self._process_checked.clear()
+
+    def _expired(self, key, entry):
+        """缓存项是否已过期或所属进程已退出，是则移除（需持有锁）"""
+        now = self.clock()
+
+        # TTL过期
+        if self.ttl is not None and now - entry.created > self.ttl:
+            self._drop(key)
+            return True
+
+        # 目标进程已退出，整个进程的缓存都失效
+        if entry.process_id and not self._process_alive(entry.process_id, now):
+            self._drop_process(entry.process_id)
+            return True
+
+        return False
+
+    def _process_alive(self, process_id, now):
+        """检查进程是否存在，短时间内复用检查结果"""
+        if self.process_checker is None:
+            return True
+
+        last_checked = self._process_checked.get(process_id)
+        if last_checked is not None and now - last_checked < self.process_check_interval:
+            return True
+
+        try:
+            alive = self.process_checker(process_id)
+        except Exception:
+            alive = True  # 无法判断时不主动失效
+
+        if alive:
+            self._process_checked[process_id] = now
+        else:
+            self._process_checked.pop(process_id, None)
+
+        return alive
+
+    def _drop(self, key):
+        if self._entries.pop(key, None) is not None:
+            self.evictions += 1
+
+    def _drop_process(self, process_id):
+        stale = [key for key, entry in self._entries.items() if entry.process_id == process_id]
+        for key in stale:
+            self._drop(key)
+        self._process_checked.pop(process_id, None)
@@ -0,0 +1,630 @@
+# -*- coding: utf-8 -*-
+"""
+监控引擎 - 不依赖界面的监控核心：调度、读取、提取、条件、触发和报警
+可以由图形界面驱动，也可以通过命令行作为无界面服务运行：
+
+    python engine.py --config monitors.json
+"""
+
+import argparse
+import concurrent.futures
+import threading
+import time
+from monitor import MonitorManager, element_label, window_key, BULK_READ_MIN
+from sound_player import SoundPlayer
+from scheduler import MonitorScheduler, AdaptiveRate
+from worker_pool import WorkerPool, ProcessBusyError
+from conditions import CompiledMonitor
+from element_cache import locator_fingerprint
+from config_store import ConfigStore
+from trigger import Trigger, FIRED, ACTIVE
+from stats import get_stats
+
+
+# 事件驱动模式下的兜底轮询间隔（秒），防止控件静默不再发送事件
+EVENT_FALLBACK_INTERVAL = 30.0
+
+# 自适应轮询：未设置最长间隔时，值稳定或读取失败的元素最多退避到检测间隔的这个倍数
+ADAPTIVE_MAX_FACTOR = 8
+
+# 并发读取的工作线程数和单次读取超时（秒，按每块计算）
+READ_WORKERS = 4
+READ_TIMEOUT = 2.0
+
+# 同一进程的元素每块读取的个数，每块读完立即处理
+READ_CHUNK = 16
+
+# 加载配置时按定位开销排序后，相邻监控项首次运行的间隔（秒）
+STARTUP_STAGGER = 0.001
+
+# 定期导出性能统计的默认间隔（秒）
+STATS_INTERVAL = 10.0
+
+
+class _MonitorGroup:
+    """同一元素上的所有监控项，共用一次定位、读取和事件订阅"""
+
+    __slots__ = ("key", "element_info", "label", "window", "items", "event_callback", "event_watched", "rate",
+                 "interval", "last_value")
+
+    def __init__(self, key, element_info):
+        self.key = key
+        self.element_info = element_info
+        self.label = element_label(element_info)  # 性能统计中的名称
+        self.window = window_key(element_info)  # 所在顶层窗口，同一窗口的组尽量在同一轮读取
+        self.items = []  # 只整体替换，监控线程遍历时无需加锁
+        self.event_callback = None
+        self.event_watched = None  # None: 未订阅, True: 已订阅事件, False: 元素不支持事件
+        self.rate = None  # 轮询间隔的 AdaptiveRate
+        self.interval = None  # 当前调度使用的间隔
+        self.last_value = None  # 上次读取的原始值
+
+
+class MonitorEngine:
+    def __init__(self, backend=None, sound_player=None, config_file="monitors.json",
+                 on_update=None, start_time=None, stats=None, stats_file=None, stats_interval=STATS_INTERVAL):
+        """
+        初始化监控引擎
+        backend: UI自动化后端，默认使用 ui_backend.get_backend()
+        sound_player: 报警播放器，默认新建一个 SoundPlayer
+        config_file: 配置文件路径（快照 + 追加式变更日志）
+        on_update: 监控项的显示内容变化时调用 on_update(item, column, value)，
+                   column 为 "current"（当前值）或 "status"（状态），在监控线程中调用
+        start_time: 启动计时的起点（time.perf_counter()），默认为创建引擎的时间
+        stats: 性能统计，默认使用 stats.get_stats()
+        stats_file: 定期把性能统计导出到这个JSON文件，None表示不导出
+        stats_interval: 导出间隔（秒）
+        """
+        self.stats = stats if stats is not None else get_stats()
+        self.stats_file = stats_file
+        self.stats_interval = stats_interval
+        self.monitor_manager = MonitorManager(backend, stats=self.stats)
+        self.sound_player = sound_player if sound_player is not None else SoundPlayer()
+        self.scheduler = MonitorScheduler()
+        self.read_pool = WorkerPool(self.monitor_manager.backend, max_workers=READ_WORKERS, timeout=READ_TIMEOUT)
+        self.on_update = on_update
+
+        # 监控项列表
+        self.monitor_items = []
+
+        # 同一元素上的监控项：locator指纹 -> _MonitorGroup
+        self._groups = {}
+
+        # 按顶层窗口索引的组：窗口 -> [_MonitorGroup]（只整体替换）
+        self._windows = {}
+
+        # 事件驱动模式
+        self.event_mode = False
+
+        # 编译后的提取和条件流水线：id(item) -> CompiledMonitor
+        self._pipelines = {}
+
+        # 触发状态（含上次处理的值）：id(item) -> Trigger
+        self._triggers = {}
+
+        # 只通知发生变化的内容：(id(item), 列名) -> 最近发布的值
+        self._published = {}
+
+        self.config_file = config_file
+        self.config_store = ConfigStore(config_file)
+
+        # 启动计时：名称 -> 距启动的秒数
+        self.start_time = start_time if start_time is not None else time.perf_counter()
+        self.startup_times = {}
+
+        self.monitoring = False
+        self.monitor_thread = None
+
+    def start(self):
+        """启动监控线程"""
+        if self.monitoring:
+            return
+        self.monitoring = True
+        self.monitor_thread = threading.Thread(target=self.monitor_loop, daemon=True)
+        self.monitor_thread.start()
+
+    def stop(self):
+        """停止监控线程和报警（不等待挂起的读取）"""
+        self.monitoring = False
+        self.scheduler.wake()
+        self.read_pool.shutdown()
+        self.sound_player.stop()
+
+    def contains(self, item):
+        """监控项是否仍在引擎中（未被删除）"""
+        return id(item) in self._pipelines
+
+    def add_item(self, item):
+        """添加监控项并记录到配置"""
+        self.monitor_items.append(item)
+        self.schedule_item(item)
+
+        self._record_change(self.config_store.add, item)
+        self.preload_sounds([item.get("sound_file", "")])
+
+    def remove_item(self, index):
+        """删除第index个监控项并记录到配置，返回被删除的监控项"""
+        if not 0 <= index < len(self.monitor_items):
+            return None
+
+        item = self.monitor_items[index]
+        self.unschedule_item(item)
+        self._pipelines.pop(id(item), None)
+        self._triggers.pop(id(item), None)
+        self._published.pop((id(item), "status"), None)
+        self._published.pop((id(item), "current"), None)
+        del self.monitor_items[index]
+
+        self._record_change(self.config_store.remove, index)
+        return item
+
+    def load(self):
+        """加载配置：先按定位开销从小到大调度，返回加载的监控项"""
+        try:
+            items = self.config_store.load()
+        except Exception as e:
+            print(f"加载配置失败: {e}")
+            return []
+
+        self.monitor_items.extend(items)
+
+        # 定位快的元素先被读取，尽早开始报警：首次运行时间按排序依次错开
+        ranked = sorted(items, key=lambda item: self.monitor_manager.resolve_cost(item["element_info"]))
+        for rank, item in enumerate(ranked):
+            try:
+                self.schedule_item(item, delay=rank * STARTUP_STAGGER)
+            except Exception as e:
+                print(f"加载监控项失败: {e}")
+
+        self.mark_startup("config_loaded")
+
+        # 在后台把所有音效解码到内存
+        self.preload_sounds([item.get("sound_file", "") for item in items])
+        return items
+
+    def save(self):
+        """把日志合并为新快照，没有未合并的变更时快照已是最新，不重写"""
+        if not self.config_store.dirty:
+            return
+        try:
+            self.config_store.compact(self.monitor_items)
+        except Exception as e:
+            print(f"保存配置失败: {e}")
+
+    def preload_sounds(self, sound_files):
+        """在后台线程中预先解码音效"""
+        sound_files = [sound_file for sound_file in set(sound_files) if sound_file]
+        if sound_files:
+            threading.Thread(target=self.sound_player.preload, args=(sound_files,), daemon=True).start()
+
+    def stop_sound(self):
+        """停止音效"""
+        self.sound_player.stop()
+
+    def set_event_mode(self, enabled):
+        """切换事件驱动模式"""
+        self.event_mode = enabled
+
+        if not self.event_mode:
+            # 回到轮询模式
+            for group in list(self._groups.values()):
+                self._unwatch_group(group)
+
+        self.scheduler.wake()
+
+    def mark_startup(self, name):
+        """记录启动过程中某个时刻第一次出现的时间"""
+        if name in self.startup_times:
+            return
+        elapsed = time.perf_counter() - self.start_time
+        self.startup_times[name] = elapsed
+        print(f"启动计时 {name}: {elapsed:.3f}s")
+
+    def _record_change(self, record, *args):
+        """把一次增删追加到配置日志，日志过长时合并为快照"""
+        try:
+            record(*args)
+            if self.config_store.needs_compaction:
+                self.save()
+        except Exception as e:
+            print(f"保存配置失败: {e}")
+
+    def schedule_item(self, item, delay=0.0):
+        """
+        编译监控项并加入调度，同一元素上的监控项合并为一组
+        delay: 新建的组首次运行前的延迟（秒）
+        """
+        self._pipelines[id(item)] = CompiledMonitor(item)
+        self._triggers[id(item)] = Trigger(
+            hold_time=float(item.get("hold_time", 0) or 0),
+            cooldown=float(item.get("cooldown", 0) or 0)
+        )
+
+        if not item.get("enabled", True):
+            return
+
+        key = locator_fingerprint(item["element_info"].get("locator", {}))
+        group = self._groups.get(key)
+        if group is None:
+            group = self._groups[key] = _MonitorGroup(key, item["element_info"])
+            if group.window is not None:
+                self._windows[group.window] = self._windows.get(group.window, []) + [group]
+
+        group.items = group.items + [item]
+        self._schedule_group(group, delay)
+
+    def unschedule_item(self, item):
+        """把监控项移出调度"""
+        key = locator_fingerprint(item["element_info"].get("locator", {}))
+        group = self._groups.get(key)
+        if group is None or not any(existing is item for existing in group.items):
+            return
+
+        group.items = [existing for existing in group.items if existing is not item]
+
+        if group.items:
+            self._schedule_group(group)
+        else:
+            del self._groups[key]
+            self.scheduler.remove(group)
+            self._unwatch_group(group)
+            if group.window is not None:
+                siblings = [other for other in self._windows.get(group.window, ()) if other is not group]
+                if siblings:
+                    self._windows[group.window] = siblings
+                else:
+                    self._windows.pop(group.window, None)
+
+    def _schedule_group(self, group, delay=0.0):
+        """按组内的自适应间隔调度，已订阅事件的组只做兜底轮询（delay只用于新加入调度的组）"""
+        group.rate = self._group_rate(group.items)
+
+        interval = group.rate.interval
+        if group.event_watched:
+            interval = max(interval, EVENT_FALLBACK_INTERVAL)
+        group.interval = interval
+
+        if group in self.scheduler:
+            self.scheduler.set_interval(group, interval)
+        else:
+            self.scheduler.add(group, interval, delay)
+
+    def _group_rate(self, items):
+        """
+        组的自适应间隔：全速为组内最短的检测间隔，
+        最长间隔取各监控项允许的最长间隔中最小的一个
+        """
+        min_interval = min(float(item.get("interval", 1)) for item in items)
+        max_interval = min(
+            float(item.get("max_interval") or float(item.get("interval", 1)) * ADAPTIVE_MAX_FACTOR)
+            for item in items
+        )
+        return AdaptiveRate(min_interval, max_interval)
+
+    def _adapt_rate(self, group, value):
+        """
+        根据本次读取的结果调整组的轮询间隔
+        已订阅事件的组只做兜底轮询，但有监控项在等待保持时间或冷却时间时按全速间隔重新检查
+        """
+        failed = value is None or isinstance(value, Exception)
+        changed = not failed and value != group.last_value
+        if not failed:
+            group.last_value = value
+
+        # 还在等待保持时间或冷却时间的监控项需要按时重新检查（值不变时不会有事件）
+        # 监控项可能正被界面线程删除，用get而不是先判断再取
+        pending = False
+        for item in group.items:
+            trigger = self._triggers.get(id(item))
+            if trigger is not None and trigger.pending:
+                pending = True
+                break
+
+        rate = group.rate
+        if rate is None:
+            return
+
+        if group.event_watched:
+            interval = rate.min_interval if pending else max(rate.interval, EVENT_FALLBACK_INTERVAL)
+        else:
+            interval = rate.observe(changed=changed or pending, failed=failed)
+
+        if interval != group.interval:
+            group.interval = interval
+            self.scheduler.set_interval(group, interval)
+
+    def _watch_group(self, group):
+        """为元素订阅值变化事件，不支持事件的元素继续按间隔轮询"""
+        if group.event_watched is not None:
+            return
+
+        if group.event_callback is None:
+            group.event_callback = lambda: self.scheduler.run_now(group)
+
+        result = self.monitor_manager.watch(group.element_info, group.event_callback)
+        if result is None:
+            return  # 元素暂时找不到，下次再试
+
+        group.event_watched = result
+        if result and group.items:
+            # 已订阅事件，轮询只作为兜底
+            self._schedule_group(group)
+
+    def _unwatch_group(self, group):
+        """取消元素的事件订阅，恢复原轮询间隔"""
+        callback = group.event_callback
+        watched = group.event_watched
+        group.event_callback = None
+        group.event_watched = None
+
+        if callback is not None:
+            self.monitor_manager.unwatch(group.element_info, callback)
+
+        if watched and group.items:
+            self._schedule_group(group)
+
+    def monitor_loop(self):
+        """监控循环"""
+        # 在线程中初始化COM
+        backend = self.monitor_manager.backend
+        backend.init_thread()
+
+        try:
+            self._do_monitor_loop()
+        finally:
+            backend.uninit_thread()
+
+    def _do_monitor_loop(self):
+        """实际的监控循环"""
+        clock = self.scheduler.clock
+        next_dump = clock() + self.stats_interval
+
+        while self.monitoring:
+            # 单轮的意外错误不能结束整个监控线程
+            try:
+                with self.stats.timer("loop.tick"):
+                    self.run_once()
+            except Exception as e:
+                self.stats.exception("loop", e)
+                print(f"监控循环出错: {e}")
+
+            timeout = None
+            if self.stats_file:
+                now = clock()
+                if now >= next_dump:
+                    self.dump_stats()
+                    next_dump = now + self.stats_interval
+                timeout = max(0.0, next_dump - now)
+
+            # 睡眠到下一个监控项到期；醒来时超过到期时间的部分计为循环延迟
+            deadline = self.scheduler.next_deadline()
+            start = clock()
+            self.scheduler.wait(timeout)
+            now = clock()
+            self.stats.record("loop.sleep", now - start)
+            if deadline is not None and now >= deadline:
+                self.stats.record("loop.lag", now - deadline)
+
+    def stats_snapshot(self):
+        """性能统计的快照，附带缓存、线程池、窗口索引和报警的状态"""
+        monitor_manager = self.monitor_manager
+        element_cache = monitor_manager.element_cache
+        return self.stats.snapshot({
+            "monitors_count": len(self.monitor_items),
+            "groups_count": len(self._groups),
+            "element_cache": {
+                "size": len(element_cache),
+                "hits": element_cache.hits,
+                "misses": element_cache.misses,
+                "evictions": element_cache.evictions,
+            },
+            "read_pool": self.read_pool.stats(),
+            "window_index": {"refreshes": monitor_manager.window_index.refreshes},
+            "sound": {
+                "playing": self.sound_player.playing,
+                "preempted": self.sound_player.preempted,
+                "dropped": self.sound_player.dropped,
+            },
+            "startup": dict(self.startup_times),
+        })
+
+    def dump_stats(self, path=None):
+        """把性能统计导出为JSON文件，path默认为 stats_file"""
+        path = path or self.stats_file
+        try:
+            self.stats.dump(path, self.stats_snapshot())
+        except Exception as e:
+            print(f"导出性能统计失败: {e}")
+
+    def run_once(self):
+        """处理一轮到期的元素，返回处理的元素个数"""
+        # 只处理到期的元素，每个元素每轮只定位和读取一次
+        groups = [group for group in self.scheduler.pop_due() if group.items]
+        if not groups:
+            return 0
+
+        self.monitor_manager.begin_tick()
+        groups = self._align_windows(groups)
+
+        # 同一进程的元素分块批量读取，不同进程并发读取，挂起的进程只影响自己的监控项
+        # 同一窗口的元素排在一起，落在同一块中才能共用一次快照
+        by_process = {}
+        for group in sorted(groups, key=lambda group: group.window or ()):
+            process_id = self.monitor_manager.get_process_id(group.element_info)
+            by_process.setdefault(process_id, []).append(group)
+
+        chunks = []
+        calls = []
+        for process_id, process_groups in by_process.items():
+            for start in range(0, len(process_groups), READ_CHUNK):
+                chunk = process_groups[start:start + READ_CHUNK]
+                chunks.append(chunk)
+                calls.append((process_id, self.monitor_manager.get_element_values,
+                              ([group.element_info for group in chunk],)))
+
+        # 每块读完立即处理和发布，不等待其他块
+        read_time = 0.0
+        start = time.perf_counter()
+        for index, chunk_values in self.read_pool.imap(calls):
+            read_time += time.perf_counter() - start
+
+            chunk = chunks[index]
+            if isinstance(chunk_values, Exception):
+                chunk_values = [chunk_values] * len(chunk)
+            for group, current_value in zip(chunk, chunk_values):
+                self._process_group(group, current_value)
+
+            start = time.perf_counter()
+        self.stats.record("loop.read", read_time)
+
+        return len(groups)
+
+    def _align_windows(self, groups):
+        """
+        把同一顶层窗口中在下一次读取这个窗口之前就会到期的组提前到本轮，让每个窗口每轮只取一次快照
+        抖动和自适应间隔会把同一窗口的组分散到不同的轮次，单独读取时用不上快照
+        只有凑得够批量读取的个数时才提前；已订阅事件的组不提前
+        """
+        due = set(id(group) for group in groups)
+        by_window = {}  # 窗口 -> [到期的组数, 其中最短的间隔]
+        for group in groups:
+            if group.window is None or not group.interval:
+                continue
+            window = by_window.setdefault(group.window, [0, group.interval])
+            window[0] += 1
+            window[1] = min(window[1], group.interval)
+
+        now = self.scheduler.clock()
+        for window, (count, horizon) in by_window.items():
+            siblings = [group for group in self._windows.get(window, ())
+                        if id(group) not in due and group.items and not group.event_watched]
+            if count + len(siblings) < BULK_READ_MIN:
+                continue
+
+            for group in siblings:
+                if self.scheduler.pull(group, horizon, now):
+                    groups.append(group)
+                    due.add(id(group))
+
+        return groups
+
+    def _process_group(self, group, current_value):
+        """把一个元素读取到的值分发给它的所有监控项"""
+        # 读取成功说明元素已定位并缓存，订阅时直接使用，不在监控线程中重新查找
+        if self.event_mode and current_value is not None and not isinstance(current_value, Exception):
+            self._watch_group(group)
+
+        # 同一个值分发给该元素上的所有条件
+        start = time.perf_counter()
+        for item in group.items:
+            self._process_value(item, current_value)
+        self.stats.record("process", time.perf_counter() - start, group.label)
+
+        # 值变化时全速轮询，值稳定或找不到元素时逐步放慢
+        self._adapt_rate(group, current_value)
+
+    def _process_value(self, item, current_value):
+        """处理读取到的值：提取、更新显示、检查条件"""
+        pipeline = self._pipelines.get(id(item))
+        trigger = self._triggers.get(id(item))
+        if pipeline is None or trigger is None:
+            return  # 已被删除
+
+        try:
+            if isinstance(current_value, (TimeoutError, concurrent.futures.TimeoutError, ProcessBusyError)):
+                self.stats.exception("read", current_value)
+                trigger.forget()
+                self._publish(item, "status", "无响应")
+                return
+            if isinstance(current_value, Exception):
+                raise current_value
+
+            # 应用提取方式
+            extracted_value = pipeline.extract(current_value)
+
+            # 值没有变化时状态也不会变化，除非还在等待保持时间或冷却时间
+            if trigger.seen(extracted_value) and not trigger.pending:
+                return
+
+            # 更新显示
+            self._publish(item, "current", str(extracted_value))
+
+            # 检查条件：只在由不满足变为满足（并保持足够久）时报警，已触发的按回差判断解除
+            result = trigger.update(pipeline.check(extracted_value), pipeline.hold(extracted_value), time.monotonic())
+            if result == FIRED:
+                # 触发音效
+                # 同一监控项正在播放或排队时不会重复报警，更紧急的报警抢占通道
+                if self.sound_player.play(item["sound_file"], priority=item.get("priority", 0), key=id(item)):
+                    self.mark_startup("first_alert")
+
+            self._publish(item, "status", "已触发" if trigger.state == ACTIVE else "监控中")
+
+        except Exception as e:
+            self.stats.exception("process", e)
+            trigger.forget()
+            self._publish(item, "status", f"错误: {type(e).__name__}")
+
+    def _publish(self, item, column, value):
+        """只通知发生变化的内容"""
+        key = (id(item), column)
+        if self._published.get(key) == value:
+            return
+        self._published[key] = value
+
+        if self.on_update is not None:
+            self.on_update(item, column, value)
+
+
+def main(argv=None):
+    """命令行入口：无界面地加载配置并运行监控"""
+    parser = argparse.ArgumentParser(description="UI元素监控引擎（无界面）")
+    parser.add_argument("--config", default="monitors.json", help="配置文件路径")
+    parser.add_argument("--backend", choices=["uiautomation", "sim"], default=None,
+                        help="UI自动化后端，默认读取环境变量 UILISTEN_BACKEND")
+    parser.add_argument("--events", action="store_true", help="使用事件驱动模式")
+    parser.add_argument("--duration", type=float, default=None, help="运行指定秒数后退出，默认一直运行")
+    parser.add_argument("--audio-driver", default=None, help="SDL音频驱动，如 dummy 表示不出声")
+    parser.add_argument("--quiet", action="store_true", help="不输出状态变化")
+    parser.add_argument("--stats-file", default=None, help="定期把性能统计导出到这个JSON文件")
+    parser.add_argument("--stats-interval", type=float, default=STATS_INTERVAL, help="导出性能统计的间隔（秒）")
+    args = parser.parse_args(argv)
+
+    from ui_backend import create_backend
+    from sound_bank import SoundBank
+
+    def on_update(item, column, value):
+        if column == "status":
+            element_info = item["element_info"]
+            name = element_info.get("name", "") or element_info.get("automation_id", "") or "未命名"
+            print(f"{name} {item['condition']} {item['target_value']}: {value}")
+
+    engine = MonitorEngine(
+        backend=create_backend(args.backend),
+        sound_player=SoundPlayer(SoundBank(driver=args.audio_driver)),
+        config_file=args.config,
+        on_update=None if args.quiet else on_update,
+        stats_file=args.stats_file,
+        stats_interval=args.stats_interval
+    )
+    engine.set_event_mode(args.events)
+    items = engine.load()
+    print(f"已加载 {len(items)} 个监控项")
+
+    engine.start()
+    try:
+        if args.duration is None:
+            while engine.monitor_thread.is_alive():
+                engine.monitor_thread.join(1.0)
+        else:
+            engine.monitor_thread.join(args.duration)
+    except KeyboardInterrupt:
+        pass
+    finally:
+        engine.stop()
+        engine.save()
+        if args.stats_file:
+            engine.dump_stats()
+
+
+if __name__ == "__main__":
+    main()
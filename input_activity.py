@@ -0,0 +1,226 @@
+# -*- coding: utf-8 -*-
+"""
+输入活动服务 - 进程内共用一个常驻的鼠标监听，没有订阅者时回调立即返回，按移动阈值和频率限制通知订阅者
+"""
+
+import threading
+import time
+
+
+# 默认的移动阈值（像素）和两次处理之间的最短间隔（秒）
+MOVE_THRESHOLD = 10
+MIN_INTERVAL = 0.05
+
+
+class PynputSource:
+    """基于 pynput 的鼠标输入源（低级鼠标钩子，停止后可再次启动）"""
+
+    def __init__(self):
+        self._listener = None
+        self._controller = None
+
+    def start(self, handler):
+        """启动监听，鼠标移动时调用 handler(x, y)"""
+        from pynput import mouse
+        self._controller = mouse.Controller()
+        self._listener = mouse.Listener(on_move=handler)
+        self._listener.daemon = True
+        self._listener.start()
+
+    def position(self):
+        """当前鼠标位置"""
+        if self._controller is None:
+            from pynput import mouse
+            self._controller = mouse.Controller()
+        x, y = self._controller.position
+        return int(x), int(y)
+
+    def stop(self):
+        if self._listener is not None:
+            self._listener.stop()
+            self._listener = None
+
+
+class ManualSource:
+    """手动驱动的输入源，用于测试和模拟"""
+
+    def __init__(self, x=0, y=0):
+        self._handler = None
+        self._position = (x, y)
+
+    def start(self, handler):
+        self._handler = handler
+
+    def position(self):
+        return self._position
+
+    def move(self, x, y):
+        """模拟鼠标移动到 (x, y)"""
+        self._position = (x, y)
+        if self._handler is not None:
+            self._handler(x, y)
+
+    def stop(self):
+        self._handler = None
+
+
+class _Subscription:
+    __slots__ = ("callback", "threshold", "origin")
+
+    def __init__(self, callback, threshold, origin):
+        self.callback = callback
+        self.threshold = threshold
+        self.origin = origin  # 上次通知（或订阅）时的鼠标位置
+
+
+class InputActivity:
+    def __init__(self, source=None, threshold=MOVE_THRESHOLD, min_interval=MIN_INTERVAL, clock=time.monotonic):
+        """
+        初始化输入活动服务（输入源在第一次订阅时启动并一直保留，没有订阅者时不处理鼠标移动）
+        source: 输入源，需提供 start(handler)、position()、stop()，默认使用 PynputSource
+        threshold: 默认的移动阈值（像素），任一方向超过时通知
+        min_interval: 两次处理鼠标移动之间的最短间隔（秒），期间的移动合并，间隔结束时按最新位置处理
+        clock: 时钟函数（便于测试）
+        """
+        self.source = source if source is not None else PynputSource()
+        self.threshold = threshold
+        self.min_interval = min_interval
+        self.clock = clock
+
+        self._subscriptions = {}  # 句柄 -> _Subscription
+        self._next_handle = 0
+        self._started = False
+        self._failed = False  # 输入源无法启动（如缺少 pynput），之后不再尝试
+        self._last_handled = None
+        self._latest = None  # 还没有处理的最新位置
+        self._flush_timer = None  # 间隔结束时处理最新位置的定时器
+        self._lock = threading.Lock()
+
+        # 统计
+        self.events = 0
+        self.notifications = 0
+
+    def subscribe(self, callback, threshold=None):
+        """
+        订阅鼠标移动，移动距离超过阈值时调用 callback(x, y)，之后以新位置为起点继续计算
+        返回订阅句柄，输入源无法启动时返回None（只提示一次）
+        """
+        with self._lock:
+            if self._failed:
+                return None
+
+            if not self._started:
+                try:
+                    self.source.start(self._on_move)
+                except Exception as e:
+                    print(f"鼠标监听启动失败: {e}")
+                    self._failed = True
+                    return None
+                self._started = True
+
+            try:
+                origin = self.source.position()
+            except Exception:
+                origin = None
+
+            self._next_handle += 1
+            handle = self._next_handle
+            self._subscriptions[handle] = _Subscription(
+                callback, self.threshold if threshold is None else threshold, origin)
+            return handle
+
+    @property
+    def available(self):
+        """输入源是否可用（启动失败后为False）"""
+        return not self._failed
+
+    def unsubscribe(self, handle):
+        """取消订阅（输入源保留，下次订阅不用重新安装鼠标钩子）"""
+        with self._lock:
+            self._subscriptions.pop(handle, None)
+
+    def shutdown(self):
+        """停止输入源"""
+        with self._lock:
+            self._subscriptions.clear()
+            self._latest = None
+            if self._flush_timer is not None:
+                self._flush_timer.cancel()
+                self._flush_timer = None
+
+            if self._started:
+                self._started = False
+                try:
+                    self.source.stop()
+                except Exception as e:
+                    print(f"鼠标监听停止失败: {e}")
+
+    def _on_move(self, x, y):
+        """
+        输入源的回调（在监听线程中调用），没有订阅者时立即返回
+        距上次处理不到 min_interval 时只记录最新位置，间隔结束时再处理，最后一次移动不会丢失
+        """
+        if not self._subscriptions:
+            return
+
+        with self._lock:
+            self._latest = (x, y)
+            if self._flush_timer is not None:
+                return  # 已安排在间隔结束时处理
+
+            if self._last_handled is not None:
+                wait = self._last_handled + self.min_interval - self.clock()
+                if wait > 0:
+                    self._flush_timer = threading.Timer(wait, self._flush)
+                    self._flush_timer.daemon = True
+                    self._flush_timer.start()
+                    return
+
+        self._flush()
+
+    def _flush(self):
+        """处理最新的鼠标位置，通知移动超过阈值的订阅者"""
+        with self._lock:
+            self._flush_timer = None
+            position = self._latest
+            self._latest = None
+            if position is None or not self._subscriptions:
+                return
+
+            self._last_handled = self.clock()
+            self.events += 1
+
+            x, y = position
+            triggered = []
+            for subscription in self._subscriptions.values():
+                if subscription.origin is None:
+                    subscription.origin = (x, y)
+                    continue
+
+                dx = abs(x - subscription.origin[0])
+                dy = abs(y - subscription.origin[1])
+                if dx > subscription.threshold or dy > subscription.threshold:
+                    subscription.origin = (x, y)
+                    triggered.append(subscription.callback)
+
+        # 回调中可能取消订阅，不持有锁
+        for callback in triggered:
+            self.notifications += 1
+            try:
+                callback(x, y)
+            except Exception:
+                pass
+
+
+_default_activity = None
+_default_activity_lock = threading.Lock()
+
+
+def get_input_activity():
+    """获取进程内共享的输入活动服务"""
+    global _default_activity
+
+    with _default_activity_lock:
+        if _default_activity is None:
+            _default_activity = InputActivity()
+        return _default_activity
@@ -1,17 +1,31 @@
 # -*- coding: utf-8 -*-
 """
-UI元素监控工具 - 主程序
-功能：选择桌面UI元素，设置监控条件，触发时播放音效
+UI元素监控工具 - 主程序（图形界面）
+功能：选择桌面UI元素，设置监控条件，触发时播放音效；监控核心见 engine.py
 """
 
+import time
+
+# 启动计时的起点（在导入其他模块之前）
+_START_TIME = time.perf_counter()
+
 import tkinter as tk
 from tkinter import ttk, messagebox, filedialog
-import threading
-import json
 import os
-from ui_selector import UISelector
-from monitor import MonitorManager
-from sound_player import SoundPlayer
+import queue
+from engine import MonitorEngine
+from conditions import EXTRACT_MODES, OPERATORS
+from stats import format_snapshot
+
+
+# 列表刷新周期（毫秒）
+UI_REFRESH_MS = 100
+
+# 启动时每批插入的行数
+LOAD_CHUNK = 500
+
+# 性能统计面板的刷新周期（毫秒）
+STATS_REFRESH_MS = 1000
 
 
 class MonitorApp:
@@ -21,24 +35,27 @@ class MonitorApp:
         self.root.geometry("800x600")
         self.root.minsize(700, 500)
 
-        # 组件
-        self.monitor_manager = MonitorManager()
-        self.sound_player = SoundPlayer()
+        # 监控引擎：调度、读取、条件和报警都在引擎中，界面只负责显示和编辑
+        self.engine = MonitorEngine(on_update=self._on_engine_update, start_time=_START_TIME)
         self.ui_selector = None
 
-        # 监控项列表
-        self.monitor_items = []
+        # 列表更新：监控线程只发布变化，由Tk主线程定时批量刷新
+        self._row_ids = {}  # id(item) -> Treeview item_id
+        self._ui_updates = queue.Queue()
 
-        # 配置文件路径
-        self.config_file = "monitors.json"
+        self.stats = self.engine.stats
+        self.stats_window = None
 
         self.setup_ui()
-        self.load_config()
+
+        # 先显示窗口，再加载配置
+        self.root.after(0, self._startup)
 
         # 启动监控线程
-        self.monitoring = True
-        self.monitor_thread = threading.Thread(target=self.monitor_loop, daemon=True)
-        self.monitor_thread.start()
+        self.engine.start()
+
+        # 定时刷新列表
+        self.root.after(UI_REFRESH_MS, self._drain_ui_updates)
 
         # 窗口关闭事件
         self.root.protocol("WM_DELETE_WINDOW", self.on_closing)
@@ -58,6 +75,12 @@ class MonitorApp:
         self.btn_stop_sound = ttk.Button(toolbar, text="停止音效", command=self.stop_sound)
         self.btn_stop_sound.pack(side=tk.LEFT, padx=5)
 
+        self.event_mode_var = tk.BooleanVar(value=False)
+        ttk.Checkbutton(toolbar, text="事件驱动", variable=self.event_mode_var,
+                        command=self.toggle_event_mode).pack(side=tk.LEFT, padx=5)
+
+        ttk.Button(toolbar, text="性能统计", command=self.show_stats).pack(side=tk.LEFT, padx=5)
+
         # 状态标签
         self.status_label = ttk.Label(toolbar, text="就绪")
         self.status_label.pack(side=tk.RIGHT, padx=5)
@@ -103,7 +126,8 @@ class MonitorApp:
         self.root.iconify()  # 最小化主窗口
         self.status_label.config(text="选择中...")
 
-        # 创建选择器
+        # 创建选择器（首次使用时才导入）
+        from ui_selector import UISelector
         self.ui_selector = UISelector(self.on_element_selected)
         self.ui_selector.start()
 
@@ -143,7 +167,7 @@ class MonitorApp:
         ttk.Label(cond_frame, text="提取方式:").grid(row=0, column=0, padx=5, pady=8, sticky=tk.W)
         extract_var = tk.StringVar(value="原始值")
         extract_combo = ttk.Combobox(cond_frame, textvariable=extract_var,
-                                      values=["原始值", "提取数字", "提取整数", "提取小数", "去除空格", "取长度"], width=12)
+                                      values=list(EXTRACT_MODES), width=12)
         extract_combo.grid(row=0, column=1, padx=5, pady=8, sticky=tk.W)
 
         # 提取方式说明
@@ -153,7 +177,7 @@ class MonitorApp:
         ttk.Label(cond_frame, text="条件:").grid(row=1, column=0, padx=5, pady=8, sticky=tk.W)
         condition_var = tk.StringVar(value="=")
         condition_combo = ttk.Combobox(cond_frame, textvariable=condition_var,
-                                        values=[">", "<", "=", ">=", "<=", "!=", "包含", "不包含"], width=12)
+                                        values=list(OPERATORS), width=12)
         condition_combo.grid(row=1, column=1, padx=5, pady=8, sticky=tk.W)
 
         ttk.Label(cond_frame, text="目标值:").grid(row=2, column=0, padx=5, pady=8, sticky=tk.W)
@@ -181,6 +205,11 @@ class MonitorApp:
 
         ttk.Button(sound_frame, text="浏览...", command=browse_sound).pack(side=tk.LEFT, padx=5, pady=8)
 
+        # 优先级：多个报警同时发生时，优先级高的抢占播放通道
+        ttk.Label(sound_frame, text="优先级:").pack(side=tk.LEFT, padx=5, pady=8)
+        priority_var = tk.StringVar(value="0")
+        ttk.Spinbox(sound_frame, from_=0, to=9, textvariable=priority_var, width=4).pack(side=tk.LEFT, padx=5, pady=8)
+
         # 检测间隔
         interval_frame = ttk.LabelFrame(dialog, text="检测间隔")
         interval_frame.pack(fill=tk.X, padx=10, pady=8)
@@ -190,6 +219,21 @@ class MonitorApp:
         interval_entry = ttk.Entry(interval_frame, textvariable=interval_var, width=10)
         interval_entry.pack(side=tk.LEFT, padx=5, pady=8)
 
+        # 值长时间不变或找不到元素时，检测间隔逐步放慢到这个上限（留空为检测间隔的若干倍）
+        ttk.Label(interval_frame, text="最长间隔(秒):").pack(side=tk.LEFT, padx=5, pady=8)
+        max_interval_var = tk.StringVar(value="")
+        ttk.Entry(interval_frame, textvariable=max_interval_var, width=10).pack(side=tk.LEFT, padx=5, pady=8)
+
+        # 触发设置：回差防止值在阈值附近反复触发，保持时间过滤抖动，冷却时间限制报警频率
+        trigger_frame = ttk.LabelFrame(dialog, text="触发设置")
+        trigger_frame.pack(fill=tk.X, padx=10, pady=8)
+
+        trigger_vars = {}
+        for key, label in (("hysteresis", "回差:"), ("hold_time", "保持(秒):"), ("cooldown", "冷却(秒):")):
+            ttk.Label(trigger_frame, text=label).pack(side=tk.LEFT, padx=5, pady=8)
+            trigger_vars[key] = tk.StringVar(value="0")
+            ttk.Entry(trigger_frame, textvariable=trigger_vars[key], width=6).pack(side=tk.LEFT, padx=5, pady=8)
+
         # 按钮
         btn_frame = ttk.Frame(dialog)
         btn_frame.pack(fill=tk.X, padx=10, pady=15)
@@ -201,17 +245,54 @@ class MonitorApp:
                 messagebox.showerror("错误", "检测间隔必须是数字")
                 return
 
+            if interval <= 0:
+                messagebox.showerror("错误", "检测间隔必须大于0")
+                return
+
+            max_interval = None
+            if max_interval_var.get().strip():
+                try:
+                    max_interval = float(max_interval_var.get())
+                except ValueError:
+                    messagebox.showerror("错误", "最长间隔必须是数字")
+                    return
+                if max_interval < interval:
+                    messagebox.showerror("错误", "最长间隔不能小于检测间隔")
+                    return
+
             if not sound_var.get():
                 messagebox.showerror("错误", "请选择音效文件")
                 return
 
+            try:
+                priority = int(priority_var.get())
+            except ValueError:
+                messagebox.showerror("错误", "优先级必须是整数")
+                return
+
+            trigger_settings = {}
+            for key, var in trigger_vars.items():
+                try:
+                    trigger_settings[key] = float(var.get() or 0)
+                except ValueError:
+                    messagebox.showerror("错误", "回差、保持时间和冷却时间必须是数字")
+                    return
+                if trigger_settings[key] < 0:
+                    messagebox.showerror("错误", "回差、保持时间和冷却时间不能小于0")
+                    return
+
             monitor_item = {
                 "element_info": element_info,
                 "condition": condition_var.get(),
                 "target_value": value_var.get(),
                 "extract_mode": extract_var.get(),
                 "sound_file": sound_var.get(),
+                "priority": priority,
                 "interval": interval,
+                "max_interval": max_interval,
+                "hysteresis": trigger_settings["hysteresis"],
+                "hold_time": trigger_settings["hold_time"],
+                "cooldown": trigger_settings["cooldown"],
                 "enabled": True
             }
 
@@ -226,24 +307,32 @@ class MonitorApp:
         dialog.minsize(500, dialog.winfo_reqheight())
         dialog.geometry(f"500x{dialog.winfo_reqheight()}")
 
+    @property
+    def monitor_items(self):
+        """监控项列表（与列表中的行一一对应）"""
+        return self.engine.monitor_items
+
     def add_monitor_item(self, item):
         """添加监控项"""
-        self.monitor_items.append(item)
+        self.engine.add_item(item)
 
         # 添加到列表
+        self._insert_row(item, item["element_info"].get("value", "N/A"))
+
+    def _insert_row(self, item, current, index=tk.END):
+        """在列表中插入监控项对应的行"""
         element_info = item["element_info"]
         name = element_info.get("name", "") or element_info.get("automation_id", "") or "未命名"
 
-        self.tree.insert("", tk.END, values=(
+        item_id = self.tree.insert("", index, values=(
             name,
             item["condition"],
             item["target_value"],
             os.path.basename(item["sound_file"]),
             "监控中",
-            element_info.get("value", "N/A")
+            current
         ))
-
-        self.save_config()
+        self._row_ids[id(item)] = item_id
 
     def remove_selected(self):
         """删除选中的监控项"""
@@ -255,203 +344,127 @@ class MonitorApp:
         index = self.tree.index(selected[0])
         self.tree.delete(selected[0])
 
-        if 0 <= index < len(self.monitor_items):
-            del self.monitor_items[index]
+        item = self.engine.remove_item(index)
+        if item is not None:
+            self._row_ids.pop(id(item), None)
 
-        self.save_config()
+    def toggle_event_mode(self):
+        """切换事件驱动模式"""
+        self.engine.set_event_mode(self.event_mode_var.get())
 
     def stop_sound(self):
         """停止音效"""
-        self.sound_player.stop()
-
-    def monitor_loop(self):
-        """监控循环"""
-        import time
-        import ctypes
+        self.engine.stop_sound()
 
-        # 在线程中初始化COM
-        ctypes.windll.ole32.CoInitialize(None)
+    def _on_engine_update(self, item, column, value):
+        """引擎发布的显示变化（在监控线程中调用），交给Tk主线程刷新"""
+        self._ui_updates.put((item, column, value))
 
+    def _drain_ui_updates(self):
+        """在Tk主线程中批量刷新列表，同一单元格只保留最新的值"""
+        start = time.perf_counter()
+        changes = {}
         try:
-            self._do_monitor_loop()
-        finally:
-            ctypes.windll.ole32.CoUninitialize()
-
-    def _do_monitor_loop(self):
-        """实际的监控循环"""
-        import time
-
-        while self.monitoring:
-            for i, item in enumerate(self.monitor_items):
-                if not item.get("enabled", True):
-                    continue
+            while True:
+                item, column, value = self._ui_updates.get_nowait()
+                changes[(id(item), column)] = (item, value)
+        except queue.Empty:
+            pass
 
-                try:
-                    # 获取当前值
-                    current_value = self.monitor_manager.get_element_value(item["element_info"])
+        for (key, column), (item, value) in changes.items():
+            item_id = self._row_ids.get(key)
+            if item_id is None:
+                # 启动时行可能还没插入，下次再刷新；已删除的直接丢弃
+                if self.engine.contains(item):
+                    self._ui_updates.put((item, column, value))
+                continue
+            try:
+                self.tree.set(item_id, column, value)
+            except tk.TclError:
+                pass
 
-                    # 应用提取方式
-                    extract_mode = item.get("extract_mode", "原始值")
-                    extracted_value = self.extract_value(current_value, extract_mode)
+        if changes:
+            self.stats.incr("ui.cells", len(changes))
+            self.stats.record("ui.drain", time.perf_counter() - start)
 
-                    # 更新显示
-                    self.update_tree_item(i, extracted_value)
+        if self.engine.monitoring:
+            self.root.after(UI_REFRESH_MS, self._drain_ui_updates)
 
-                    # 检查条件
-                    if self.check_condition(extracted_value, item["condition"], item["target_value"]):
-                        # 触发音效
-                        if not self.sound_player.is_playing():
-                            self.sound_player.play(item["sound_file"])
-                            self.update_tree_status(i, "已触发")
-                    else:
-                        self.update_tree_status(i, "监控中")
+    def show_stats(self):
+        """显示性能统计面板（每秒刷新）"""
+        if self.stats_window is not None and self.stats_window.winfo_exists():
+            self.stats_window.lift()
+            return
 
-                except Exception as e:
-                    self.update_tree_status(i, f"错误")
+        window = tk.Toplevel(self.root)
+        window.title("性能统计")
+        window.geometry("760x520")
+        self.stats_window = window
 
-            time.sleep(0.5)
+        text = tk.Text(window, wrap=tk.NONE, font=("Consolas", 9))
+        scrollbar = ttk.Scrollbar(window, orient=tk.VERTICAL, command=text.yview)
+        text.configure(yscrollcommand=scrollbar.set)
 
-    def update_tree_item(self, index, current_value):
-        """更新列表项的当前值"""
-        try:
-            items = self.tree.get_children()
-            if 0 <= index < len(items):
-                item_id = items[index]
-                values = list(self.tree.item(item_id, "values"))
-                values[5] = str(current_value)
-                self.tree.item(item_id, values=values)
-        except:
-            pass
+        btn_frame = ttk.Frame(window)
+        btn_frame.pack(side=tk.BOTTOM, fill=tk.X, padx=10, pady=5)
+        scrollbar.pack(side=tk.RIGHT, fill=tk.Y)
+        text.pack(side=tk.LEFT, fill=tk.BOTH, expand=True)
+
+        def export():
+            file_path = filedialog.asksaveasfilename(
+                parent=window,
+                title="导出性能统计",
+                defaultextension=".json",
+                filetypes=[("JSON文件", "*.json")]
+            )
+            if file_path:
+                self.engine.dump_stats(file_path)
 
-    def update_tree_status(self, index, status):
-        """更新列表项的状态"""
-        try:
-            items = self.tree.get_children()
-            if 0 <= index < len(items):
-                item_id = items[index]
-                values = list(self.tree.item(item_id, "values"))
-                values[4] = status
-                self.tree.item(item_id, values=values)
-        except:
-            pass
+        def refresh():
+            if not window.winfo_exists():
+                return
+            position = text.yview()[0]
+            text.delete("1.0", tk.END)
+            text.insert(tk.END, format_snapshot(self.engine.stats_snapshot()))
+            text.yview_moveto(position)
+            window.after(STATS_REFRESH_MS, refresh)
 
-    def extract_value(self, value, mode):
-        """根据提取方式处理值"""
-        import re
-
-        if value is None:
-            return ""
-
-        value_str = str(value)
-
-        if mode == "原始值":
-            return value_str
-
-        elif mode == "提取数字":
-            # 提取所有数字（包括小数点和负号）
-            numbers = re.findall(r'-?\d+\.?\d*', value_str)
-            if numbers:
-                return numbers[0]  # 返回第一个匹配的数字
-            return ""
-
-        elif mode == "提取整数":
-            # 只提取整数部分
-            numbers = re.findall(r'-?\d+', value_str)
-            if numbers:
-                return numbers[0]
-            return ""
-
-        elif mode == "提取小数":
-            # 提取小数
-            numbers = re.findall(r'-?\d+\.\d+', value_str)
-            if numbers:
-                return numbers[0]
-            # 如果没有小数，尝试提取整数
-            numbers = re.findall(r'-?\d+', value_str)
-            if numbers:
-                return numbers[0]
-            return ""
-
-        elif mode == "去除空格":
-            return value_str.replace(" ", "").replace("\t", "").replace("\n", "")
-
-        elif mode == "取长度":
-            return str(len(value_str))
-
-        return value_str
-
-    def check_condition(self, current, condition, target):
-        """检查条件是否满足"""
-        try:
-            # 尝试数值比较
-            current_num = float(current) if current else 0
-            target_num = float(target) if target else 0
-
-            if condition == ">":
-                return current_num > target_num
-            elif condition == "<":
-                return current_num < target_num
-            elif condition == "=":
-                return current_num == target_num
-            elif condition == ">=":
-                return current_num >= target_num
-            elif condition == "<=":
-                return current_num <= target_num
-            elif condition == "!=":
-                return current_num != target_num
-        except (ValueError, TypeError):
-            pass
+        ttk.Button(btn_frame, text="导出JSON", command=export).pack(side=tk.RIGHT, padx=5)
+        ttk.Button(btn_frame, text="清零", command=self.stats.reset).pack(side=tk.RIGHT, padx=5)
 
-        # 字符串比较
-        current_str = str(current) if current else ""
-        target_str = str(target) if target else ""
+        refresh()
 
-        if condition == "=":
-            return current_str == target_str
-        elif condition == "!=":
-            return current_str != target_str
-        elif condition == "包含":
-            return target_str in current_str
-        elif condition == "不包含":
-            return target_str not in current_str
+    def save_config(self):
+        """保存配置（有未合并的变更时合并为新快照）"""
+        self.engine.save()
 
-        return False
+    def _startup(self):
+        """窗口显示后再加载配置"""
+        self.root.update_idletasks()
+        self.engine.mark_startup("first_paint")
 
-    def save_config(self):
-        """保存配置"""
-        try:
-            with open(self.config_file, "w", encoding="utf-8") as f:
-                json.dump(self.monitor_items, f, ensure_ascii=False, indent=2)
-        except Exception as e:
-            print(f"保存配置失败: {e}")
+        self.load_config()
 
     def load_config(self):
-        """加载配置"""
-        try:
-            if os.path.exists(self.config_file):
-                with open(self.config_file, "r", encoding="utf-8") as f:
-                    self.monitor_items = json.load(f)
-
-                # 添加到列表
-                for item in self.monitor_items:
-                    element_info = item["element_info"]
-                    name = element_info.get("name", "") or element_info.get("automation_id", "") or "未命名"
-
-                    self.tree.insert("", tk.END, values=(
-                        name,
-                        item["condition"],
-                        item["target_value"],
-                        os.path.basename(item["sound_file"]),
-                        "监控中",
-                        "N/A"
-                    ))
-        except Exception as e:
-            print(f"加载配置失败: {e}")
+        """加载配置：引擎先按定位开销调度，行在后台分批插入"""
+        self.engine.load()
+        self._insert_pending_rows()
+
+    def _insert_pending_rows(self):
+        """分批为还没有行的监控项插入行，每批之后让出主线程"""
+        count = 0
+        for index, item in enumerate(self.monitor_items):
+            if id(item) in self._row_ids:
+                continue
+            self._insert_row(item, "N/A", index)
+            count += 1
+            if count >= LOAD_CHUNK:
+                self.root.after(1, self._insert_pending_rows)
+                return
 
     def on_closing(self):
         """窗口关闭"""
-        self.monitoring = False
-        self.sound_player.stop()
+        self.engine.stop()
         self.save_config()
         self.root.destroy()
 
@@ -3,27 +3,285 @@
 监控管理器 - 负责定位和获取UI元素的值
 """
 
-import uiautomation as auto
+import threading
 import time
+from element_cache import ElementCache, locator_fingerprint
+from stats import get_stats
+from ui_backend import get_backend
+from window_index import WindowIndex
+
+
+# 同一进程的元素达到这个数量时，改为一次取回公共祖先子树的快照
+BULK_READ_MIN = 4
 
 
 class MonitorManager:
-    def __init__(self):
-        self.element_cache = {}  # 缓存已定位的元素
+    def __init__(self, backend=None, cache_size=1024, cache_ttl=30.0, stats=None):
+        """
+        backend: UI自动化后端，默认使用 ui_backend.get_backend()
+        stats: 性能统计，默认使用 stats.get_stats()
+        """
+        self.backend = backend or get_backend()
+        self.stats = stats if stats is not None else get_stats()
+
+        # 缓存已定位的元素
+        self.element_cache = ElementCache(
+            max_size=cache_size,
+            ttl=cache_ttl,
+            validator=self.backend.is_alive,
+            process_checker=self.backend.process_exists
+        )
+
+        # 按进程索引的顶层窗口，所有定位方式共用
+        self.window_index = WindowIndex(self.backend, stats=self.stats)
+
+        # 路径定位的祖先链缓存：locator指纹 -> [元素]
+        self._path_chains = {}
+
+        # 值变化事件订阅：locator指纹 -> _Watch
+        self._watches = {}
+        self._watch_lock = threading.RLock()
+
+    def begin_tick(self):
+        """每轮监控开始时调用，让本轮的定位共用一次桌面枚举"""
+        self.window_index.begin_tick()
 
     def get_element_value(self, element_info):
         """
         获取元素的当前值
         element_info: 元素信息字典（由UISelector生成）
         """
-        # 尝试重新定位元素
-        element = self._find_element(element_info)
+        label = element_label(element_info)
+
+        start = time.perf_counter()
+        element = self.resolve_element(element_info)
+        resolved = time.perf_counter()
+        self.stats.record("resolve", resolved - start, label)
 
         if element is None:
+            self.stats.incr("resolve.not_found")
             return None
 
         # 获取值
-        return self._get_value(element)
+        value = self._get_value(element, locator_fingerprint(element_info.get("locator", {})))
+        self.stats.record("read", time.perf_counter() - resolved, label)
+        return value
+
+    def get_element_values(self, element_infos):
+        """
+        批量获取多个元素的当前值（通常属于同一进程）
+        元素较多时先一次取回公共祖先子树的快照，快照中取不到的再逐个读取
+        返回与element_infos对应的列表，单个元素失败的位置为对应的异常对象
+        """
+        values = [None] * len(element_infos)
+        pending = range(len(element_infos))
+
+        if len(element_infos) >= BULK_READ_MIN:
+            try:
+                with self.stats.timer("read.snapshot"):
+                    pending = self._read_from_snapshot(element_infos, values)
+            except Exception as e:
+                self.stats.exception("read_snapshot", e)
+                pending = range(len(element_infos))
+
+        for i in pending:
+            try:
+                values[i] = self.get_element_value(element_infos[i])
+            except Exception as e:
+                self.stats.exception("read", e)
+                values[i] = e
+
+        return values
+
+    def _read_from_snapshot(self, element_infos, values):
+        """
+        按顶层窗口分组，每个窗口取回一次公共祖先子树的快照，按runtime_id匹配已缓存的元素
+        快照中存在即说明元素仍然有效，不再单独校验（缓存的过期和进程退出检查照常进行）
+        返回未能从快照取值的下标
+        """
+        by_window = {}
+        pending = []
+        for i, element_info in enumerate(element_infos):
+            window = window_key(element_info)
+            cached = self.element_cache.peek(locator_fingerprint(element_info.get("locator", {})))
+            field = _SNAPSHOT_FIELDS.get(cached[2]) if cached else None
+            if field is None or not cached[1] or window is None:
+                pending.append(i)
+            else:
+                by_window.setdefault(window, []).append((i, tuple(cached[1]), field))
+
+        hits = 0
+        misses = 0
+        for candidates in by_window.values():
+            snapshot = None
+            if len(candidates) >= BULK_READ_MIN:
+                ancestor = self._snapshot_root([element_infos[i] for i, _, _ in candidates])
+                if ancestor is not None:
+                    snapshot = self.backend.get_subtree_values(ancestor)
+
+            if snapshot is None:
+                pending.extend(i for i, _, _ in candidates)
+                continue
+
+            for i, runtime_id, field in candidates:
+                value = snapshot.get(runtime_id, {}).get(field)
+                if value:
+                    values[i] = value
+                    hits += 1
+                else:
+                    pending.append(i)
+                    misses += 1
+
+        self.stats.incr("snapshot.hits", hits)
+        self.stats.incr("snapshot.misses", misses)
+        return pending
+
+    def _snapshot_root(self, element_infos):
+        """定位同一顶层窗口中这些元素路径的公共祖先（至少到顶层窗口），路径不一致时返回None"""
+        paths = [element_info.get("locator", {}).get("path") or [] for element_info in element_infos]
+
+        prefix = []
+        for items in zip(*paths):
+            if any(item != items[0] for item in items[1:]):
+                break
+            prefix.append(items[0])
+
+        # 路径第一级是桌面，第二级是顶层窗口
+        if len(prefix) < 2:
+            return None
+
+        locator = {
+            "path": prefix,
+            "process_id": element_infos[0].get("locator", {}).get("process_id", 0),
+        }
+        return self.resolve_element({"locator": locator})
+
+    def resolve_element(self, element_info):
+        """定位元素，优先使用缓存"""
+        locator = element_info.get("locator", {})
+        key = locator_fingerprint(locator)
+
+        element = self.element_cache.get(key)
+        if element is not None:
+            return element
+
+        # 缓存未命中，重新定位元素
+        element = self._find_element(element_info)
+        if element is None:
+            return None
+
+        try:
+            runtime_id = element.GetRuntimeId()
+        except Exception as e:
+            self.stats.exception("resolve", e)
+            runtime_id = None
+
+        try:
+            process_id = element.ProcessId
+        except Exception as e:
+            self.stats.exception("resolve", e)
+            process_id = locator.get("process_id", 0)
+
+        self.element_cache.put(key, element, process_id=process_id, runtime_id=runtime_id)
+
+        # 元素重新定位后，事件订阅需要转移到新元素上
+        with self._watch_lock:
+            if key in self._watches:
+                self._subscribe(key, element)
+
+        return element
+
+    def get_process_id(self, element_info):
+        """元素所属的进程ID，优先使用已定位元素的进程，用于按进程隔离并发调用"""
+        locator = element_info.get("locator", {})
+        process_id = self.element_cache.process_of(locator_fingerprint(locator))
+        if process_id is None:
+            process_id = locator.get("process_id", 0)
+        return process_id
+
+    def resolve_cost(self, element_info):
+        """
+        估计定位元素的开销（越小越快），用于启动时先定位快的元素
+        已缓存 < AutomationId（一次原生搜索）< 路径（每层一次）< 组合属性（遍历）
+        """
+        locator = element_info.get("locator", {})
+        if locator_fingerprint(locator) in self.element_cache:
+            return 0
+        if locator.get("automation_id"):
+            return 1
+        if locator.get("path"):
+            return 1 + len(locator["path"])
+        return 100
+
+    def invalidate(self, element_info):
+        """使元素缓存失效（如删除监控项时）"""
+        key = locator_fingerprint(element_info.get("locator", {}))
+        self.element_cache.invalidate(key)
+        self._path_chains.pop(key, None)
+
+    def watch(self, element_info, callback):
+        """
+        订阅元素的值变化事件，事件发生时调用 callback()
+        不在调用线程中定位元素，只使用读取时已定位并缓存的元素
+        返回 True 表示已订阅，False 表示元素不支持事件（需继续轮询），
+        None 表示元素还没有定位到（稍后重试）
+        """
+        key = locator_fingerprint(element_info.get("locator", {}))
+
+        cached = self.element_cache.peek(key)
+        if cached is None:
+            return None
+        element = cached[0]
+
+        with self._watch_lock:
+            watch = self._watches.get(key)
+            if watch is None:
+                watch = self._watches[key] = _Watch()
+            if callback not in watch.callbacks:
+                watch.callbacks.append(callback)
+
+            if watch.element is not element:
+                self._subscribe(key, element)
+
+            return watch.handle is not None
+
+    def unwatch(self, element_info, callback):
+        """取消 watch 注册的回调"""
+        key = locator_fingerprint(element_info.get("locator", {}))
+
+        with self._watch_lock:
+            watch = self._watches.get(key)
+            if watch is None:
+                return
+
+            if callback in watch.callbacks:
+                watch.callbacks.remove(callback)
+
+            if not watch.callbacks:
+                del self._watches[key]
+                self.backend.unsubscribe(watch.handle)
+
+    def _subscribe(self, key, element):
+        """为元素注册值变化事件，替换旧的订阅"""
+        watch = self._watches[key]
+
+        if watch.handle is not None:
+            self.backend.unsubscribe(watch.handle)
+
+        watch.element = element
+        watch.handle = self.backend.subscribe_changes(element, lambda: self._notify(key))
+
+    def _notify(self, key):
+        """分发值变化事件（可能在后端的事件线程中调用）"""
+        watch = self._watches.get(key)
+        if watch is None:
+            return
+
+        for callback in list(watch.callbacks):
+            try:
+                callback()
+            except Exception as e:
+                self.stats.exception("notify", e)
 
     def _find_element(self, element_info):
         """根据元素信息定位元素"""
@@ -31,23 +289,31 @@ class MonitorManager:
 
         # 方法1: 通过AutomationId定位（最可靠）
         if locator.get("automation_id"):
-            element = self._find_by_automation_id(locator)
+            element = self._find_with("automation_id", self._find_by_automation_id, locator)
             if element:
                 return element
 
         # 方法2: 通过路径定位
         if locator.get("path"):
-            element = self._find_by_path(locator)
+            element = self._find_with("path", self._find_by_path, locator)
             if element:
                 return element
 
         # 方法3: 通过组合属性定位
-        element = self._find_by_properties(locator)
+        element = self._find_with("properties", self._find_by_properties, locator)
         if element:
             return element
 
         return None
 
+    def _find_with(self, strategy, find, locator):
+        """使用一种定位方式，统计耗时和命中次数"""
+        start = time.perf_counter()
+        element = find(locator)
+        self.stats.record(f"find.{strategy}", time.perf_counter() - start)
+        self.stats.incr(f"lookup.{strategy}.{'hit' if element else 'miss'}")
+        return element
+
     def _find_by_automation_id(self, locator):
         """通过AutomationId定位"""
         try:
@@ -59,89 +325,90 @@ class MonitorManager:
 
             # 先找到进程的窗口
             if process_id:
-                windows = auto.GetRootControl().GetChildren()
-                for win in windows:
+                for win in self.window_index.windows_for(process_id):
                     try:
-                        if win.ProcessId == process_id:
-                            # 在窗口中搜索
-                            element = win.Control(AutomationId=automation_id)
-                            if element.Exists(0, 0):
-                                return element
-                    except:
+                        # 在窗口中搜索
+                        element = self.backend.find_control(win, automation_id=automation_id)
+                        if element:
+                            return element
+                    except Exception as e:
+                        self.stats.exception("find_by_automation_id", e)
                         continue
 
             # 全局搜索
-            element = auto.Control(AutomationId=automation_id)
-            if element.Exists(0, 0):
+            element = self.backend.find_control(automation_id=automation_id)
+            if element:
                 return element
 
         except Exception as e:
-            pass
+            self.stats.exception("find_by_automation_id", e)
 
         return None
 
     def _find_by_path(self, locator):
-        """通过路径定位"""
+        """
+        通过路径定位
+        缓存已解析的祖先链，叶子失效时从仍然有效的最深祖先继续向下查找
+        """
         try:
             path = locator.get("path", [])
             if not path:
                 return None
 
-            # 从根开始
-            current = auto.GetRootControl()
+            key = locator_fingerprint(locator)
 
-            # 跳过第一个（通常是Desktop）
-            for i, path_item in enumerate(path[1:], 1):
-                found = False
-                children = current.GetChildren()
+            # 找到仍然有效的最深祖先（chain[j] 对应 path[j + 1]）
+            chain = self._path_chains.get(key, [])
+            start = 0
+            current = self.backend.get_root()
+            for j in range(len(chain) - 1, -1, -1):
+                if self.backend.is_alive(chain[j]):
+                    start = j + 1
+                    current = chain[j]
+                    break
+            chain = chain[:start]
 
-                for child in children:
-                    try:
-                        # 匹配属性
-                        match = True
-
-                        if path_item.get("automation_id"):
-                            if child.AutomationId != path_item["automation_id"]:
-                                match = False
-
-                        if match and path_item.get("class_name"):
-                            if child.ClassName != path_item["class_name"]:
-                                match = False
-
-                        if match and path_item.get("control_type"):
-                            if child.ControlTypeName != path_item["control_type"]:
-                                match = False
-
-                        if match and path_item.get("name"):
-                            if child.Name != path_item["name"]:
-                                match = False
-
-                        if match:
-                            current = child
-                            found = True
-                            break
-                    except:
-                        continue
-
-                if not found:
-                    # 尝试只匹配control_type和class_name
-                    for child in children:
-                        try:
-                            if (child.ControlTypeName == path_item.get("control_type", "") and
-                                child.ClassName == path_item.get("class_name", "")):
-                                current = child
-                                found = True
-                                break
-                        except:
-                            continue
-
-                if not found:
+            # 跳过第一个（通常是Desktop）
+            for path_item in path[start + 1:]:
+                # 原生条件搜索：一次调用完成这一层的匹配
+                child = self.backend.find_child(
+                    current,
+                    automation_id=path_item.get("automation_id", ""),
+                    class_name=path_item.get("class_name", ""),
+                    control_type=path_item.get("control_type", ""),
+                    name=path_item.get("name", "")
+                )
+
+                if child is None:
+                    # 属性已变化（如名称），枚举子元素（一次取回定位属性）并放宽条件再试
+                    child = self._match_child(self.backend.get_children_info(current), path_item)
+
+                if child is None:
+                    self._path_chains[key] = chain
                     return None
 
+                chain.append(child)
+                current = child
+
+            self._path_chains[key] = chain
             return current
 
         except Exception as e:
-            pass
+            self.stats.exception("find_by_path", e)
+
+        return None
+
+    def _match_child(self, children, path_item):
+        """
+        在子元素列表 [(元素, automation_id, class_name, control_type, name)] 中查找control_type和class_name相同的元素
+        精确匹配已由find_child完成，这里只处理名称等属性变化的情况
+        """
+        class_name = path_item.get("class_name", "")
+        control_type = path_item.get("control_type", "")
+
+        for child, _, child_class_name, child_control_type, _ in children:
+            if child_control_type == control_type and child_class_name == class_name:
+                return child
 
         return None
 
@@ -154,102 +421,171 @@ class MonitorManager:
             name = locator.get("name", "")
 
             # 构建搜索条件
-            search_props = {}
-
-            if control_type:
-                search_props["ControlType"] = getattr(auto.ControlType, control_type.replace("Control", ""), None)
+            search_props = {
+                "control_type": control_type,
+                "class_name": class_name,
+                "name": name
+            }
 
-            if class_name:
-                search_props["ClassName"] = class_name
-
-            if name:
-                search_props["Name"] = name
-
-            if not search_props:
+            if not any(search_props.values()):
                 return None
 
             # 在特定进程中搜索
             if process_id:
-                windows = auto.GetRootControl().GetChildren()
-                for win in windows:
+                for win in self.window_index.windows_for(process_id):
                     try:
-                        if win.ProcessId == process_id:
-                            element = win.Control(**search_props)
-                            if element.Exists(0, 0):
-                                return element
-                    except:
+                        element = self.backend.find_control(win, **search_props)
+                        if element:
+                            return element
+                    except Exception as e:
+                        self.stats.exception("find_by_properties", e)
                         continue
 
             # 全局搜索
-            element = auto.Control(**search_props)
-            if element.Exists(0, 0):
+            element = self.backend.find_control(**search_props)
+            if element:
                 return element
 
         except Exception as e:
-            pass
+            self.stats.exception("find_by_properties", e)
 
         return None
 
-    def _get_value(self, element):
-        """获取元素的值"""
-        value = ""
+    def _get_value(self, element, key=None):
+        """
+        获取元素的值
+        key: 元素的locator指纹，提供时记住元素支持的读取方式（第一个支持的模式，即使值为空），
+             下次直接使用，元素不再支持该模式时才重新探测
+        """
+        memoized = None
+        if key is not None:
+            reader = self.element_cache.reader_of(key)
+            if reader is not None:
+                try:
+                    value = reader(element)
+                except Exception as e:
+                    self.stats.exception("read_value", e)
+                    value = None
 
-        # 尝试ValuePattern
-        try:
-            pattern = element.GetValuePattern()
-            if pattern:
-                value = pattern.Value
                 if value:
                     return value
-        except:
-            pass
+                if value is not None:
+                    # 仍支持但值为空：保留记住的方式，本次和探测一样用后面的方式取值
+                    memoized = reader
+
+        # 按顺序探测各种模式
+        self.stats.incr("read.probe")
+        supported = None
+        result = ""
+        for reader in _VALUE_READERS:
+            try:
+                value = reader(element)
+            except Exception as e:
+                self.stats.exception("read_value", e)
+                continue
+
+            # 返回None表示元素不支持该模式，记住第一个支持的（Name只在没有任何模式时才被记住）
+            if value is not None and supported is None:
+                supported = reader
+
+            if value:
+                result = value
+                break
+
+        if key is not None and memoized is None and supported is not None:
+            self.element_cache.set_reader(key, supported)
+
+        return result
+
+
+def _read_value_pattern(element):
+    """ValuePattern"""
+    pattern = element.GetValuePattern()
+    if pattern:
+        return pattern.Value
+    return None
+
+
+def _read_text_pattern(element):
+    """TextPattern"""
+    pattern = element.GetTextPattern()
+    if pattern:
+        return pattern.DocumentRange.GetText(-1)
+    return None
+
+
+def _read_range_value_pattern(element):
+    """RangeValuePattern"""
+    pattern = element.GetRangeValuePattern()
+    if pattern:
+        return str(pattern.Value)
+    return None
+
+
+def _read_selection_pattern(element):
+    """SelectionPattern"""
+    pattern = element.GetSelectionPattern()
+    if pattern:
+        selection = pattern.GetSelection()
+        if selection:
+            names = [s.Name for s in selection if s.Name]
+            if names:
+                return ", ".join(names)
+        return ""
+    return None
+
+
+def _read_toggle_pattern(element):
+    """TogglePattern (复选框等)"""
+    pattern = element.GetTogglePattern()
+    if pattern:
+        return str(pattern.ToggleState)
+    return None
+
+
+def _read_name(element):
+    """最后尝试Name"""
+    return element.Name or ""
+
+
+def window_key(element_info):
+    """元素所在顶层窗口的标识（路径的第二级），没有路径时返回None"""
+    path = element_info.get("locator", {}).get("path") or []
+    if len(path) < 2:
+        return None
+    return tuple(sorted(path[1].items()))
 
-        # 尝试TextPattern
-        try:
-            pattern = element.GetTextPattern()
-            if pattern:
-                value = pattern.DocumentRange.GetText(-1)
-                if value:
-                    return value
-        except:
-            pass
 
-        # 尝试RangeValuePattern
-        try:
-            pattern = element.GetRangeValuePattern()
-            if pattern:
-                value = str(pattern.Value)
-                if value:
-                    return value
-        except:
-            pass
+def element_label(element_info):
+    """元素在统计和日志中显示的名称"""
+    locator = element_info.get("locator", {})
+    name = element_info.get("name", "") or locator.get("automation_id", "") or "未命名"
+    return f"{name}@{locator.get('process_id', 0)}"
 
-        # 尝试SelectionPattern
-        try:
-            pattern = element.GetSelectionPattern()
-            if pattern:
-                selection = pattern.GetSelection()
-                if selection:
-                    names = [s.Name for s in selection if s.Name]
-                    if names:
-                        return ", ".join(names)
-        except:
-            pass
-
-        # 尝试TogglePattern (复选框等)
-        try:
-            pattern = element.GetTogglePattern()
-            if pattern:
-                state = pattern.ToggleState
-                return str(state)
-        except:
-            pass
-
-        # 最后尝试Name
-        try:
-            if element.Name:
-                return element.Name
-        except:
-            pass
 
-        return value
+# 值的读取方式，按探测顺序排列
+_VALUE_READERS = (
+    _read_value_pattern,
+    _read_text_pattern,
+    _read_range_value_pattern,
+    _read_selection_pattern,
+    _read_toggle_pattern,
+    _read_name,
+)
+
+# 可以从批量快照中取得的读取方式：读取方式 -> 快照字段
+_SNAPSHOT_FIELDS = {
+    _read_value_pattern: "value",
+    _read_range_value_pattern: "range",
+    _read_toggle_pattern: "toggle",
+    _read_name: "name",
+}
+
+
+class _Watch:
+    __slots__ = ("element", "handle", "callbacks")
+
+    def __init__(self):
+        self.element = None
+        self.handle = None
+        self.callbacks = []
@@ -0,0 +1,301 @@
+# -*- coding: utf-8 -*-
+"""
+高亮覆盖层 - 常驻的置顶、鼠标穿透的分层窗口，高亮时只移动和调整窗口，不在桌面上绘制
+"""
+
+import ctypes
+import threading
+from ctypes import wintypes
+
+
+# 边框宽度（像素）和颜色（COLORREF，0x00BBGGRR）
+BORDER_WIDTH = 3
+BORDER_COLOR = 0x0000FF
+
+CLASS_NAME = "UiListeningHighlight"
+
+# Win32 常量
+WS_POPUP = 0x80000000
+WS_EX_TOPMOST = 0x00000008
+WS_EX_TRANSPARENT = 0x00000020
+WS_EX_TOOLWINDOW = 0x00000080
+WS_EX_LAYERED = 0x00080000
+WS_EX_NOACTIVATE = 0x08000000
+LWA_ALPHA = 0x2
+SW_HIDE = 0
+SWP_NOACTIVATE = 0x0010
+SWP_SHOWWINDOW = 0x0040
+HWND_TOPMOST = -1
+WM_NCHITTEST = 0x0084
+WM_QUIT = 0x0012
+WM_APP_UPDATE = 0x8000 + 1
+HTTRANSPARENT = -1
+ERROR_CLASS_ALREADY_EXISTS = 1410
+DPI_AWARENESS_CONTEXT_PER_MONITOR_AWARE_V2 = -4
+
+LRESULT = ctypes.c_ssize_t
+# 非Windows系统上没有 WINFUNCTYPE，只为模块能导入，窗口创建时会失败
+WNDPROC = getattr(ctypes, "WINFUNCTYPE", ctypes.CFUNCTYPE)(LRESULT, wintypes.HWND, wintypes.UINT, wintypes.WPARAM, wintypes.LPARAM)
+
+
+class WNDCLASSEXW(ctypes.Structure):
+    _fields_ = [
+        ("cbSize", wintypes.UINT),
+        ("style", wintypes.UINT),
+        ("lpfnWndProc", WNDPROC),
+        ("cbClsExtra", ctypes.c_int),
+        ("cbWndExtra", ctypes.c_int),
+        ("hInstance", wintypes.HINSTANCE),
+        ("hIcon", wintypes.HICON),
+        ("hCursor", wintypes.HANDLE),
+        ("hbrBackground", wintypes.HBRUSH),
+        ("lpszMenuName", wintypes.LPCWSTR),
+        ("lpszClassName", wintypes.LPCWSTR),
+        ("hIconSm", wintypes.HICON),
+    ]
+
+
+def _load_user32():
+    """加载 user32/gdi32 并声明用到的函数签名（64位下句柄不能按int传递）"""
+    user32 = ctypes.WinDLL("user32", use_last_error=True)
+    gdi32 = ctypes.WinDLL("gdi32", use_last_error=True)
+    kernel32 = ctypes.WinDLL("kernel32", use_last_error=True)
+
+    user32.DefWindowProcW.argtypes = [wintypes.HWND, wintypes.UINT, wintypes.WPARAM, wintypes.LPARAM]
+    user32.DefWindowProcW.restype = LRESULT
+    user32.RegisterClassExW.argtypes = [ctypes.POINTER(WNDCLASSEXW)]
+    user32.RegisterClassExW.restype = wintypes.ATOM
+    user32.CreateWindowExW.argtypes = [
+        wintypes.DWORD, wintypes.LPCWSTR, wintypes.LPCWSTR, wintypes.DWORD,
+        ctypes.c_int, ctypes.c_int, ctypes.c_int, ctypes.c_int,
+        wintypes.HWND, wintypes.HMENU, wintypes.HINSTANCE, wintypes.LPVOID
+    ]
+    user32.CreateWindowExW.restype = wintypes.HWND
+    user32.SetLayeredWindowAttributes.argtypes = [wintypes.HWND, wintypes.COLORREF, wintypes.BYTE, wintypes.DWORD]
+    user32.ShowWindow.argtypes = [wintypes.HWND, ctypes.c_int]
+    user32.DestroyWindow.argtypes = [wintypes.HWND]
+    user32.BeginDeferWindowPos.argtypes = [ctypes.c_int]
+    user32.BeginDeferWindowPos.restype = wintypes.HANDLE
+    user32.DeferWindowPos.argtypes = [
+        wintypes.HANDLE, wintypes.HWND, wintypes.HWND,
+        ctypes.c_int, ctypes.c_int, ctypes.c_int, ctypes.c_int, wintypes.UINT
+    ]
+    user32.DeferWindowPos.restype = wintypes.HANDLE
+    user32.EndDeferWindowPos.argtypes = [wintypes.HANDLE]
+    user32.GetMessageW.argtypes = [ctypes.POINTER(wintypes.MSG), wintypes.HWND, wintypes.UINT, wintypes.UINT]
+    user32.TranslateMessage.argtypes = [ctypes.POINTER(wintypes.MSG)]
+    user32.DispatchMessageW.argtypes = [ctypes.POINTER(wintypes.MSG)]
+    user32.PostThreadMessageW.argtypes = [wintypes.DWORD, wintypes.UINT, wintypes.WPARAM, wintypes.LPARAM]
+    user32.UnregisterClassW.argtypes = [wintypes.LPCWSTR, wintypes.HINSTANCE]
+    gdi32.CreateSolidBrush.argtypes = [wintypes.COLORREF]
+    gdi32.CreateSolidBrush.restype = wintypes.HBRUSH
+    gdi32.DeleteObject.argtypes = [wintypes.HGDIOBJ]
+    kernel32.GetModuleHandleW.argtypes = [wintypes.LPCWSTR]
+    kernel32.GetModuleHandleW.restype = wintypes.HMODULE
+    kernel32.GetCurrentThreadId.restype = wintypes.DWORD
+
+    return user32, gdi32, kernel32
+
+
+class HighlightOverlay:
+    """
+    由四条边框窗口组成的高亮框
+    窗口在自己的线程中创建一次并运行消息循环，之后只移动、调整大小和隐藏，
+    不在桌面DC上绘制，也不让下面的窗口重绘；调用方线程只记录最新的矩形并投递一条消息
+    """
+
+    def __init__(self, border_width=BORDER_WIDTH, color=BORDER_COLOR):
+        self.border_width = border_width
+        self.color = color
+
+        self._rect = None  # 待显示的矩形，None表示隐藏
+        self._shown = None  # 当前显示的矩形
+        self._posted = False  # 是否已投递还未处理的更新消息
+        self._lock = threading.Lock()
+
+        self._thread = None
+        self._thread_id = None
+        self._ready = threading.Event()
+        self._failed = False
+        self._start_lock = threading.Lock()
+
+        self._user32 = None
+        self._bars = []
+        self._brush = None
+        self._wndproc = None  # 保留回调的引用，防止被回收
+
+    def show(self, left, top, right, bottom):
+        """把高亮框移动到矩形 (left, top, right, bottom) 外侧"""
+        self._update((left, top, right, bottom))
+
+    def hide(self):
+        """隐藏高亮框（窗口保留，下次直接移动）"""
+        self._update(None)
+
+    def close(self):
+        """销毁窗口并结束消息循环"""
+        if self._thread_id is not None and self._user32 is not None:
+            self._user32.PostThreadMessageW(self._thread_id, WM_QUIT, 0, 0)
+
+    def _update(self, rect):
+        if not self._ensure_started():
+            return
+
+        with self._lock:
+            self._rect = rect
+            if self._posted:
+                return  # 消息循环处理时会取最新的矩形
+            self._posted = True
+
+        self._user32.PostThreadMessageW(self._thread_id, WM_APP_UPDATE, 0, 0)
+
+    def _ensure_started(self):
+        """第一次使用时创建窗口线程，创建失败（如非Windows系统）后不再尝试"""
+        if self._failed:
+            return False
+
+        with self._start_lock:
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, daemon=True)
+                self._thread.start()
+                self._ready.wait(2.0)
+
+        return self._ready.is_set() and not self._failed
+
+    def _run(self):
+        """窗口线程：创建边框窗口，然后运行消息循环"""
+        try:
+            self._create_windows()
+        except Exception as e:
+            print(f"创建高亮窗口失败: {e}")
+            self._failed = True
+            self._ready.set()
+            return
+
+        self._ready.set()
+
+        user32 = self._user32
+        msg = wintypes.MSG()
+        try:
+            while user32.GetMessageW(ctypes.byref(msg), None, 0, 0) > 0:
+                if msg.hwnd is None and msg.message == WM_APP_UPDATE:
+                    self._apply()
+                    continue
+                user32.TranslateMessage(ctypes.byref(msg))
+                user32.DispatchMessageW(ctypes.byref(msg))
+        finally:
+            self._destroy_windows()
+
+    def _create_windows(self):
+        user32, gdi32, kernel32 = _load_user32()
+        self._user32 = user32
+        self._gdi32 = gdi32
+
+        # 与UI自动化返回的物理像素坐标一致
+        try:
+            user32.SetThreadDpiAwarenessContext(ctypes.c_void_p(DPI_AWARENESS_CONTEXT_PER_MONITOR_AWARE_V2))
+        except Exception:
+            pass
+
+        instance = kernel32.GetModuleHandleW(None)
+        self._instance = instance
+        self._brush = gdi32.CreateSolidBrush(self.color)
+
+        def wndproc(hwnd, message, wparam, lparam):
+            # 鼠标穿透：命中测试交给下面的窗口
+            if message == WM_NCHITTEST:
+                return HTTRANSPARENT
+            return user32.DefWindowProcW(hwnd, message, wparam, lparam)
+
+        self._wndproc = WNDPROC(wndproc)
+
+        window_class = WNDCLASSEXW()
+        window_class.cbSize = ctypes.sizeof(WNDCLASSEXW)
+        window_class.lpfnWndProc = self._wndproc
+        window_class.hInstance = instance
+        window_class.hbrBackground = self._brush
+        window_class.lpszClassName = CLASS_NAME
+        if not user32.RegisterClassExW(ctypes.byref(window_class)):
+            error = ctypes.get_last_error()
+            if error != ERROR_CLASS_ALREADY_EXISTS:
+                raise ctypes.WinError(error)
+
+        ex_style = WS_EX_LAYERED | WS_EX_TRANSPARENT | WS_EX_TOPMOST | WS_EX_TOOLWINDOW | WS_EX_NOACTIVATE
+        for _ in range(4):
+            hwnd = user32.CreateWindowExW(ex_style, CLASS_NAME, None, WS_POPUP,
+                                          0, 0, 0, 0, None, None, instance, None)
+            if not hwnd:
+                raise ctypes.WinError(ctypes.get_last_error())
+            user32.SetLayeredWindowAttributes(hwnd, 0, 255, LWA_ALPHA)
+            self._bars.append(hwnd)
+
+        self._thread_id = kernel32.GetCurrentThreadId()
+
+    def _apply(self):
+        """在窗口线程中把边框移动到最新的矩形，多次更新只处理最后一次"""
+        with self._lock:
+            rect = self._rect
+            self._posted = False
+
+        if rect == self._shown:
+            return
+        self._shown = rect
+
+        user32 = self._user32
+        if rect is None:
+            for hwnd in self._bars:
+                user32.ShowWindow(hwnd, SW_HIDE)
+            return
+
+        border = self.border_width
+        left, top, right, bottom = rect
+        left -= border
+        top -= border
+        right += border
+        bottom += border
+        width = right - left
+        height = bottom - top
+
+        positions = (
+            (left, top, width, border),  # 上
+            (left, bottom - border, width, border),  # 下
+            (left, top, border, height),  # 左
+            (right - border, top, border, height),  # 右
+        )
+
+        # 四条边一次移动，避免中间状态
+        defer = user32.BeginDeferWindowPos(len(self._bars))
+        for hwnd, (x, y, cx, cy) in zip(self._bars, positions):
+            if defer:
+                defer = user32.DeferWindowPos(defer, hwnd, HWND_TOPMOST, x, y, cx, cy,
+                                              SWP_NOACTIVATE | SWP_SHOWWINDOW)
+        if defer:
+            user32.EndDeferWindowPos(defer)
+
+    def _destroy_windows(self):
+        for hwnd in self._bars:
+            self._user32.DestroyWindow(hwnd)
+        self._bars = []
+        self._user32.UnregisterClassW(CLASS_NAME, self._instance)
+        if self._brush:
+            self._gdi32.DeleteObject(self._brush)
+            self._brush = None
+
+        self._thread = None
+        self._thread_id = None
+        self._shown = None
+        self._ready.clear()
+
+
+_default_overlay = None
+_default_overlay_lock = threading.Lock()
+
+
+def get_overlay():
+    """获取进程内共享的高亮覆盖层（窗口在第一次显示时创建，之后一直保留）"""
+    global _default_overlay
+
+    with _default_overlay_lock:
+        if _default_overlay is None:
+            _default_overlay = HighlightOverlay()
+        return _default_overlay
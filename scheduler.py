@@ -0,0 +1,240 @@
+# -*- coding: utf-8 -*-
+"""
+监控调度器 - 基于优先队列，每个监控项按自己的检测间隔运行
+"""
+
+import heapq
+import itertools
+import random
+import threading
+import time
+
+
+class MonitorScheduler:
+    def __init__(self, jitter=0.1, min_interval=0.05, clock=time.monotonic):
+        """
+        初始化调度器
+        jitter: 随机抖动比例（相对间隔），避免大量监控项在同一时刻触发
+        min_interval: 允许的最小检测间隔（秒）
+        clock: 时钟函数（便于测试）
+        """
+        self.jitter = jitter
+        self.min_interval = min_interval
+        self.clock = clock
+
+        self._heap = []  # [deadline, seq, entry]
+        self._entries = {}  # id(payload) -> _Entry
+        self._counter = itertools.count()
+        self._random = random.Random()
+        self._lock = threading.Lock()
+        self._wakeup = threading.Event()
+
+    def __len__(self):
+        return len(self._entries)
+
+    def __contains__(self, payload):
+        return id(payload) in self._entries
+
+    def add(self, payload, interval, delay=0.0):
+        """
+        添加调度项（已存在时更新间隔）
+        payload: 调度对象（如监控项字典），按对象身份区分
+        interval: 检测间隔（秒）
+        delay: 首次运行前的延迟（秒），首次运行不加抖动，保持调用方安排的先后顺序
+        """
+        interval = self._clamp(interval)
+
+        with self._lock:
+            self._discard(id(payload))
+            nominal = self.clock() + delay
+            entry = _Entry(payload, interval, nominal)
+            self._entries[id(payload)] = entry
+            self._push(entry, nominal, jitter=False)
+
+        self.wake()
+
+    def remove(self, payload):
+        """移除调度项"""
+        with self._lock:
+            self._discard(id(payload))
+
+    def set_interval(self, payload, interval):
+        """修改调度项的间隔，下一次运行时间按新间隔重新计算"""
+        interval = self._clamp(interval)
+
+        with self._lock:
+            entry = self._entries.get(id(payload))
+            if entry is None:
+                return
+
+            nominal = entry.nominal - entry.interval + interval
+            entry.interval = interval
+            entry.nominal = nominal
+            self._push(entry, nominal)
+
+        self.wake()
+
+    def run_now(self, payload):
+        """让调度项立即运行一次"""
+        with self._lock:
+            entry = self._entries.get(id(payload))
+            if entry is None:
+                return
+
+            entry.nominal = self.clock()
+            self._push(entry, entry.nominal, jitter=False)
+
+        self.wake()
+
+    def pull(self, payload, within, now=None):
+        """
+        调度项在 within 秒内就会到期时提前到现在运行，下一次运行从现在起算
+        用于把相关的调度项对齐到同一轮，返回是否已提前（调用方负责本轮运行它）
+        """
+        with self._lock:
+            entry = self._entries.get(id(payload))
+            if entry is None:
+                return False
+
+            if now is None:
+                now = self.clock()
+            if entry.deadline > now + within:
+                return False
+
+            entry.nominal = now + entry.interval
+            self._push(entry, entry.nominal)
+
+        return True
+
+    def clear(self):
+        """清空所有调度项"""
+        with self._lock:
+            self._heap.clear()
+            self._entries.clear()
+
+        self.wake()
+
+    def pop_due(self, now=None):
+        """
+        取出所有到期的调度项并安排下一次运行
+        返回到期的payload列表，按到期时间排序
+        """
+        due = []
+
+        with self._lock:
+            if now is None:
+                now = self.clock()
+
+            while self._heap and self._heap[0][0] <= now:
+                deadline, seq, entry = heapq.heappop(self._heap)
+                if entry.seq != seq:
+                    continue  # 已被移除或重新调度
+
+                due.append(entry.payload)
+
+                # 按名义时间推进，落后超过一个间隔时不再追赶
+                entry.nominal += entry.interval
+                if entry.nominal < now:
+                    entry.nominal = now + entry.interval
+                self._push(entry, entry.nominal)
+
+        return due
+
+    def next_deadline(self):
+        """下一次到期时间，没有调度项时返回None"""
+        with self._lock:
+            while self._heap and self._heap[0][2].seq != self._heap[0][1]:
+                heapq.heappop(self._heap)
+            return self._heap[0][0] if self._heap else None
+
+    def wait(self, timeout=None):
+        """
+        睡眠到下一次到期时间，或被 wake() 唤醒
+        timeout: 最长等待时间（秒），None表示不限
+        """
+        # 先清除唤醒标志再计算到期时间，避免丢失期间的唤醒
+        self._wakeup.clear()
+        deadline = self.next_deadline()
+
+        if deadline is not None:
+            delay = max(0.0, deadline - self.clock())
+            timeout = delay if timeout is None else min(timeout, delay)
+
+        if timeout is None or timeout > 0:
+            self._wakeup.wait(timeout)
+
+    def wake(self):
+        """唤醒正在等待的线程（调度项变化或需要退出时）"""
+        self._wakeup.set()
+
+    def _clamp(self, interval):
+        try:
+            interval = float(interval)
+        except (TypeError, ValueError):
+            interval = 1.0
+        return max(self.min_interval, interval)
+
+    def _discard(self, key):
+        entry = self._entries.pop(key, None)
+        if entry is not None:
+            entry.seq = None
+
+    def _push(self, entry, nominal, jitter=True):
+        deadline = nominal
+        if jitter and self.jitter:
+            deadline += entry.interval * self._random.uniform(-self.jitter, self.jitter)
+
+        entry.deadline = deadline
+        entry.seq = next(self._counter)
+        heapq.heappush(self._heap, [deadline, entry.seq, entry])
+
+
+class _Entry:
+    __slots__ = ("payload", "interval", "nominal", "deadline", "seq")
+
+    def __init__(self, payload, interval, nominal):
+        self.payload = payload
+        self.interval = interval
+        self.nominal = nominal
+        self.deadline = nominal  # 含抖动的实际到期时间
+        self.seq = None
+
+
+# 自适应轮询：连续多少次读到相同的值后放慢一档，每档间隔乘以的倍数
+STABLE_READS = 3
+BACKOFF_FACTOR = 2.0
+
+
+class AdaptiveRate:
+    """单个调度项的自适应间隔：值变化时恢复最快，值稳定或读取失败时指数退避"""
+
+    __slots__ = ("min_interval", "max_interval", "interval", "stable_reads")
+
+    def __init__(self, min_interval, max_interval=None):
+        """
+        min_interval: 最短间隔（全速轮询）
+        max_interval: 退避后的最长间隔，None表示不退避
+        """
+        self.min_interval = min_interval
+        self.max_interval = max(min_interval, max_interval if max_interval is not None else min_interval)
+        self.interval = min_interval
+        self.stable_reads = 0
+
+    def observe(self, changed=False, failed=False):
+        """
+        记录一次读取的结果，返回下一次的间隔
+        changed: 值发生了变化（或需要保持全速）
+        failed: 读取失败（如找不到元素）
+        """
+        if changed:
+            self.stable_reads = 0
+            self.interval = self.min_interval
+        elif failed:
+            self.stable_reads = 0
+            self.interval = min(self.max_interval, self.interval * BACKOFF_FACTOR)
+        else:
+            self.stable_reads += 1
+            if self.stable_reads >= STABLE_READS:
+                self.stable_reads = 0
+                self.interval = min(self.max_interval, self.interval * BACKOFF_FACTOR)
+        return self.interval
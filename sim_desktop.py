@@ -0,0 +1,459 @@
+# -*- coding: utf-8 -*-
+"""
+模拟桌面 - 纯Python实现的UI树后端，可在Linux上对定位、缓存和轮询做基准和回归测试
+"""
+
+import random
+import threading
+import time
+
+from ui_backend import UIBackend
+
+
+CONTROL_TYPES = [
+    "TextControl",
+    "EditControl",
+    "ButtonControl",
+    "CheckBoxControl",
+    "ProgressBarControl",
+]
+
+
+class ElementNotAvailableError(Exception):
+    """元素已失效（对应 UIA_E_ELEMENTNOTAVAILABLE）"""
+    pass
+
+
+class SimRect:
+    def __init__(self, left, top, right, bottom):
+        self.left = left
+        self.top = top
+        self.right = right
+        self.bottom = bottom
+
+    def width(self):
+        return self.right - self.left
+
+    def height(self):
+        return self.bottom - self.top
+
+    def contains(self, x, y):
+        return self.left <= x < self.right and self.top <= y < self.bottom
+
+
+class _SimValuePattern:
+    def __init__(self, control):
+        self._control = control
+
+    @property
+    def Value(self):
+        self._control._call()
+        return str(self._control.value)
+
+
+class _SimTextRange:
+    def __init__(self, control):
+        self._control = control
+
+    def GetText(self, max_length=-1):
+        self._control._call()
+        text = str(self._control.value)
+        return text if max_length < 0 else text[:max_length]
+
+
+class _SimTextPattern:
+    def __init__(self, control):
+        self.DocumentRange = _SimTextRange(control)
+
+
+class _SimRangeValuePattern:
+    def __init__(self, control):
+        self._control = control
+
+    @property
+    def Value(self):
+        self._control._call()
+        return float(self._control.value)
+
+
+class _SimTogglePattern:
+    def __init__(self, control):
+        self._control = control
+
+    @property
+    def ToggleState(self):
+        self._control._call()
+        return int(self._control.value)
+
+
+class SimControl:
+    """模拟的UI元素，接口与 uiautomation.Control 一致"""
+
+    def __init__(self, desktop, parent, name="", automation_id="", class_name="",
+                 control_type="PaneControl", process_id=0, rect=None, value="", pattern=None):
+        self._desktop = desktop
+        self._parent = parent
+        self._children = []
+        self._name = name
+        self._automation_id = automation_id
+        self._class_name = class_name
+        self._control_type = control_type
+        self._process_id = process_id
+        self._rect = rect or SimRect(0, 0, 0, 0)
+        self._runtime_id = desktop._next_runtime_id(process_id)
+        self.value = value
+        self.pattern = pattern  # "value" / "text" / "range" / "toggle" / None（值在Name中）
+        self.raises_events = True  # 值变化时是否触发事件
+        self.alive = True
+
+        if parent is not None:
+            parent._children.append(self)
+
+    def _call(self):
+        """模拟一次跨进程调用"""
+        self._desktop._charge()
+        if not self.alive:
+            raise ElementNotAvailableError("元素已失效")
+
+    def __repr__(self):
+        return f"SimControl({self._control_type}, name={self._name!r}, automation_id={self._automation_id!r})"
+
+    def _display_name(self):
+        """Name属性的值：没有值模式的控件（如标签）把值显示在Name中"""
+        if self.pattern is None:
+            return str(self.value) if self.value != "" else self._name
+        return self._name
+
+    @property
+    def Name(self):
+        self._call()
+        return self._display_name()
+
+    @property
+    def AutomationId(self):
+        self._call()
+        return self._automation_id
+
+    @property
+    def ClassName(self):
+        self._call()
+        return self._class_name
+
+    @property
+    def ControlTypeName(self):
+        self._call()
+        return self._control_type
+
+    @property
+    def ProcessId(self):
+        self._call()
+        return self._process_id
+
+    @property
+    def BoundingRectangle(self):
+        self._call()
+        return self._rect
+
+    def GetRuntimeId(self):
+        self._call()
+        return list(self._runtime_id)
+
+    def GetChildren(self):
+        self._call()
+        return list(self._children)
+
+    def GetParentControl(self):
+        self._call()
+        return self._parent
+
+    def Exists(self, maxSearchSeconds=0, searchIntervalSeconds=0):
+        self._desktop._charge()
+        return self.alive
+
+    def _get_pattern(self, kind, factory):
+        self._call()
+        if self.pattern == kind:
+            return factory(self)
+        return None
+
+    def GetValuePattern(self):
+        return self._get_pattern("value", _SimValuePattern)
+
+    def GetTextPattern(self):
+        return self._get_pattern("text", _SimTextPattern)
+
+    def GetRangeValuePattern(self):
+        return self._get_pattern("range", _SimRangeValuePattern)
+
+    def GetSelectionPattern(self):
+        return self._get_pattern("selection", lambda control: None)
+
+    def GetTogglePattern(self):
+        return self._get_pattern("toggle", _SimTogglePattern)
+
+
+class SimulatedDesktop(UIBackend):
+    """
+    模拟桌面后端
+    windows: 顶层窗口数（每个窗口属于一个独立进程）
+    width: 每层子元素个数
+    depth: 每个窗口下的层数
+    latency: 每次跨进程调用的模拟延迟（秒）
+    seed: 随机种子，相同参数生成相同的树
+    """
+
+    name = "sim"
+
+    def __init__(self, windows=4, width=5, depth=4, latency=0.0, seed=0):
+        self.latency = latency
+        self.calls = 0
+        self.cursor = (0, 0)
+
+        self._lock = threading.Lock()
+        self._serial = 0
+        self._random = random.Random(seed)
+        self._processes = set()
+        self._subscriptions = {}  # id(control) -> [(control, callback)]
+        self._window_subscribers = []
+
+        self.root = SimControl(self, None, name="桌面 1", class_name="#32769",
+                               control_type="PaneControl", rect=SimRect(0, 0, 1920 * windows, 1080))
+
+        for i in range(windows):
+            self.add_window(width=width, depth=depth, rect=SimRect(1920 * i, 0, 1920 * (i + 1), 1080))
+
+    def _next_runtime_id(self, process_id):
+        self._serial += 1
+        return (42, process_id, self._serial)
+
+    def _charge(self):
+        with self._lock:
+            self.calls += 1
+        if self.latency:
+            time.sleep(self.latency)
+
+    def reset_stats(self):
+        """清零调用计数"""
+        with self._lock:
+            self.calls = 0
+
+    # ---- 构建和修改模拟树 ----
+
+    def add_window(self, width=5, depth=4, rect=None, process_id=None, title=None):
+        """添加一个顶层窗口及其子树，返回窗口元素"""
+        if process_id is None:
+            process_id = 1000 + len(self._processes)
+        self._processes.add(process_id)
+
+        rect = rect or SimRect(0, 0, 1920, 1080)
+        window = SimControl(self, self.root, name=title or f"窗口 {process_id}",
+                            class_name="SimWindow", control_type="WindowControl",
+                            process_id=process_id, rect=rect)
+        self._build_children(window, width, depth, process_id, "")
+        self._fire_window_event()
+        return window
+
+    def _build_children(self, parent, width, depth, process_id, prefix):
+        if depth <= 0 or width <= 0:
+            return
+
+        rect = parent._rect
+        step = max(1, rect.width() // width)
+
+        for i in range(width):
+            label = f"{prefix}{i}"
+            child_rect = SimRect(rect.left + step * i, rect.top + 1,
+                                 rect.left + step * (i + 1), rect.bottom - 1)
+
+            if depth == 1:
+                control_type = self._random.choice(CONTROL_TYPES)
+                pattern = {
+                    "EditControl": "value",
+                    "TextControl": None,
+                    "ButtonControl": None,
+                    "CheckBoxControl": "toggle",
+                    "ProgressBarControl": "range",
+                }[control_type]
+                value = "1" if pattern == "toggle" else f"{self._random.uniform(0, 1000):.2f}"
+            else:
+                control_type = "PaneControl"
+                pattern = None
+                value = ""
+
+            automation_id = f"sim_{process_id}_{label}" if self._random.random() < 0.7 else ""
+            child = SimControl(self, parent, name=f"节点 {label}", automation_id=automation_id,
+                               class_name=f"Sim{control_type[:-7]}", control_type=control_type,
+                               process_id=process_id, rect=child_rect, value=value, pattern=pattern)
+            self._build_children(child, width, depth - 1, process_id, label + ".")
+
+    def set_value(self, control, value):
+        """修改元素的值，并向订阅者触发变化事件"""
+        changed = control.value != value
+        control.value = value
+
+        if changed and control.raises_events:
+            for _, callback in list(self._subscriptions.get(id(control), [])):
+                try:
+                    callback()
+                except Exception:
+                    pass
+
+    def kill_process(self, process_id):
+        """模拟进程退出：该进程的所有元素失效，顶层窗口被移除"""
+        self._processes.discard(process_id)
+        for window in list(self.root._children):
+            if window._process_id == process_id:
+                self.root._children.remove(window)
+                for control in self._walk(window):
+                    control.alive = False
+        self._fire_window_event()
+
+    def _fire_window_event(self):
+        for callback in list(self._window_subscribers):
+            try:
+                callback()
+            except Exception:
+                pass
+
+    def controls(self, root=None):
+        """遍历所有元素（不计入调用次数）"""
+        return list(self._walk(root or self.root))
+
+    def leaves(self, root=None):
+        """遍历所有叶子元素（不计入调用次数）"""
+        return [control for control in self._walk(root or self.root) if not control._children]
+
+    def _walk(self, control):
+        stack = [control]
+        while stack:
+            current = stack.pop()
+            yield current
+            stack.extend(reversed(current._children))
+
+    # ---- UIBackend 接口 ----
+
+    def get_root(self):
+        return self.root
+
+    def find_control(self, parent=None, automation_id="", class_name="", control_type="", name=""):
+        if not (automation_id or class_name or control_type or name):
+            return None
+
+        # 一次查找视为一次跨进程调用
+        self._charge()
+
+        start = parent if parent is not None else self.root
+        if not start.alive:
+            return None
+
+        for control in self._walk(start):
+            if control is start:
+                continue
+            if automation_id and control._automation_id != automation_id:
+                continue
+            if class_name and control._class_name != class_name:
+                continue
+            if control_type and control._control_type != control_type:
+                continue
+            if name and control._display_name() != name:
+                continue
+            return control
+
+        return None
+
+    def find_child(self, parent, automation_id="", class_name="", control_type="", name=""):
+        # 原生条件搜索视为一次跨进程调用
+        self._charge()
+        if not parent.alive:
+            return None
+
+        for child in parent._children:
+            if automation_id and child._automation_id != automation_id:
+                continue
+            if class_name and child._class_name != class_name:
+                continue
+            if control_type and child._control_type != control_type:
+                continue
+            if name and child._display_name() != name:
+                continue
+            return child
+
+        return None
+
+    def get_children_info(self, parent):
+        # 带缓存请求的枚举视为一次跨进程调用
+        self._charge()
+        if not parent.alive:
+            return []
+
+        return [
+            (child, child._automation_id, child._class_name, child._control_type, child._display_name())
+            for child in parent._children
+        ]
+
+    def get_subtree_values(self, element):
+        # 带缓存请求的子树快照视为一次跨进程调用
+        self._charge()
+        if not element.alive:
+            return {}
+
+        result = {}
+        for control in self._walk(element):
+            fields = {"name": control._display_name()}
+            if control.pattern == "value":
+                fields["value"] = str(control.value)
+            elif control.pattern == "range":
+                fields["range"] = str(float(control.value))
+            elif control.pattern == "toggle":
+                fields["toggle"] = str(int(control.value))
+            result[control._runtime_id] = fields
+        return result
+
+    def control_from_point(self, x, y):
+        self._charge()
+
+        current = self.root
+        while True:
+            for child in current._children:
+                if child._rect.contains(x, y):
+                    current = child
+                    break
+            else:
+                return current
+
+    def get_cursor_pos(self):
+        return self.cursor
+
+    def subscribe_changes(self, element, callback):
+        # 一次注册视为一次跨进程调用
+        self._charge()
+        if not element.alive:
+            return None
+
+        handle = (element, callback)
+        self._subscriptions.setdefault(id(element), []).append(handle)
+        return handle
+
+    def subscribe_window_events(self, callback):
+        self._window_subscribers.append(callback)
+        return callback
+
+    def unsubscribe(self, handle):
+        if handle is None:
+            return
+
+        if handle in self._window_subscribers:
+            self._window_subscribers.remove(handle)
+            return
+
+        element = handle[0]
+        handles = self._subscriptions.get(id(element), [])
+        if handle in handles:
+            handles.remove(handle)
+        if not handles:
+            self._subscriptions.pop(id(element), None)
+
+    def process_exists(self, process_id):
+        if not process_id:
+            return True
+        return process_id in self._processes
@@ -0,0 +1,112 @@
+# -*- coding: utf-8 -*-
+"""
+音效库 - 加载配置时把音效解码到内存，报警时直接在预留的混音通道上播放
+"""
+
+import os
+import threading
+
+
+# 混音器参数：较小的缓冲区让触发到出声的延迟保持在几毫秒
+MIXER_FREQUENCY = 44100
+MIXER_SIZE = -16
+MIXER_CHANNELS = 2
+MIXER_BUFFER = 512
+
+# 预留给报警的混音通道数（可同时播放的报警数）
+ALERT_CHANNELS = 4
+
+
+class SoundBank:
+    def __init__(self, driver=None, channels=ALERT_CHANNELS):
+        """
+        初始化音效库（pygame在第一次使用时才导入）
+        driver: SDL音频驱动，如 "dummy" 可在没有声卡的环境中测试，None表示使用默认驱动
+        channels: 预留给报警的混音通道数
+        """
+        self.driver = driver
+        self.channels = max(1, channels)
+
+        self._pygame = None
+        self._channels = []
+        self._init_failed = False
+        self._sounds = {}  # 绝对路径 -> pygame.mixer.Sound，解码失败为None
+        self._lock = threading.RLock()
+
+    def init(self):
+        """初始化混音器并预留报警通道，返回是否可用"""
+        with self._lock:
+            if self._pygame is not None:
+                return True
+            if self._init_failed:
+                return False
+
+            try:
+                if self.driver:
+                    os.environ["SDL_AUDIODRIVER"] = self.driver
+
+                import pygame
+                pygame.mixer.pre_init(MIXER_FREQUENCY, MIXER_SIZE, MIXER_CHANNELS, MIXER_BUFFER)
+                pygame.mixer.init()
+
+                # 预留前几个通道给报警，不会被其他声音抢占
+                if pygame.mixer.get_num_channels() < self.channels:
+                    pygame.mixer.set_num_channels(self.channels)
+                pygame.mixer.set_reserved(self.channels)
+                self._channels = [pygame.mixer.Channel(i) for i in range(self.channels)]
+                self._pygame = pygame
+            except Exception as e:
+                print(f"pygame初始化失败: {e}")
+                self._init_failed = True
+                return False
+
+        return True
+
+    def preload(self, sound_files):
+        """把音效解码到内存，已加载的跳过（可在后台线程中调用）"""
+        for sound_file in sound_files:
+            self.get(sound_file)
+
+    def get(self, sound_file):
+        """获取已解码的音效，未加载时立即加载，无法加载时返回None"""
+        if not sound_file:
+            return None
+
+        key = os.path.abspath(sound_file)
+        with self._lock:
+            if key in self._sounds:
+                return self._sounds[key]
+
+            if not self.init():
+                return None
+
+            try:
+                sound = self._pygame.mixer.Sound(key)
+            except Exception as e:
+                print(f"音效加载失败: {sound_file} {e}")
+                sound = None
+
+            self._sounds[key] = sound
+            return sound
+
+    def play(self, sound_file, channel=0, loops=-1):
+        """
+        在第channel个报警通道上播放音效（替换该通道正在播放的声音），没有磁盘读取也不创建线程
+        loops: 重复次数，-1表示循环播放直到stop()
+        返回是否已开始播放
+        """
+        sound = self.get(sound_file)
+        if sound is None:
+            return False
+
+        self._channels[channel].play(sound, loops=loops)
+        return True
+
+    def stop(self, channel=None):
+        """停止某个报警通道，channel为None时停止所有报警通道"""
+        channels = self._channels if channel is None else self._channels[channel:channel + 1]
+        for mixer_channel in channels:
+            mixer_channel.stop()
+
+    def __len__(self):
+        return len(self._sounds)
@@ -1,96 +1,177 @@
 # -*- coding: utf-8 -*-
 """
-音效播放器 - 循环播放音效，鼠标移动时停止
+音效播放器 - 多通道循环播放报警音效，按优先级抢占和排队，鼠标移动时确认
 """
 
 import threading
 import time
 import os
+from sound_bank import SoundBank
+from input_activity import get_input_activity
 
 
-class SoundPlayer:
-    def __init__(self):
-        self.playing = False
-        self.play_thread = None
-        self.mouse_listener = None
-        self.last_mouse_pos = None
-        self.sound_file = None
+# 等待空闲通道的报警最多保留的个数
+ALERT_QUEUE_SIZE = 32
 
-        # pygame初始化标志
-        self._pygame_initialized = False
-        self._mixer = None
+# 确认后排队中的报警开始播放时，这段时间（秒）内的鼠标移动仍属于同一次确认，之后从新位置开始计算
+ACK_GRACE = 0.5
 
-    def _init_pygame(self):
-        """延迟初始化pygame"""
-        if not self._pygame_initialized:
-            try:
-                import pygame
-                pygame.mixer.init()
-                self._mixer = pygame.mixer
-                self._pygame_initialized = True
-            except Exception as e:
-                print(f"pygame初始化失败: {e}")
-                return False
-        return True
 
-    def play(self, sound_file):
-        """开始播放音效（循环）"""
-        if self.playing:
-            return
+class _Alert:
+    """一次报警：同一个key（监控项）同时只有一个报警"""
 
-        if not os.path.exists(sound_file):
-            print(f"音效文件不存在: {sound_file}")
-            return
+    __slots__ = ("key", "sound_file", "priority", "seq")
 
+    def __init__(self, key, sound_file, priority, seq):
+        self.key = key
         self.sound_file = sound_file
-        self.playing = True
+        self.priority = priority
+        self.seq = seq
 
-        # 记录初始鼠标位置
-        self._record_mouse_position()
 
-        # 启动播放线程
-        self.play_thread = threading.Thread(target=self._play_loop, daemon=True)
-        self.play_thread.start()
+class SoundPlayer:
+    def __init__(self, sound_bank=None, max_pending=ALERT_QUEUE_SIZE, input_activity=None, ack_grace=ACK_GRACE):
+        """
+        sound_bank: 已解码音效的缓存，默认新建一个 SoundBank
+        max_pending: 通道都被占用时最多排队的报警数，超出时丢弃优先级最低的
+        input_activity: 鼠标移动的通知服务，默认使用进程内共享的服务
+        ack_grace: 排队中的报警开始播放后，需要停顿这么久（秒）再移动鼠标才能确认它们
+        """
+        self.play_thread = None
+        self.sound_file = None
+        self.input_activity = input_activity
+        self.ack_grace = ack_grace
+        self._input_handle = None
+        self._rewatch_timer = None  # 停顿结束后重新订阅鼠标移动的定时器
+
+        self.sound_bank = sound_bank if sound_bank is not None else SoundBank()
+        self.max_pending = max_pending
+
+        self._active = {}  # 通道 -> 正在播放的 _Alert
+        self._pending = []  # 等待空闲通道的 _Alert
+        self._seq = 0
+        self._lock = threading.RLock()
+
+        # 统计
+        self.preempted = 0
+        self.dropped = 0
+
+    @property
+    def playing(self):
+        """是否有报警正在播放"""
+        return bool(self._active)
+
+    def preload(self, sound_files):
+        """预先解码音效，报警时不再读取磁盘（可在后台线程中调用）"""
+        self.sound_bank.preload(sound_files)
+
+    def play(self, sound_file, priority=0, key=None):
+        """
+        开始播放报警音效（循环）
+        priority: 优先级，通道都被占用时抢占优先级更低的报警，被抢占的报警回到队列
+        key: 报警来源（如监控项），同一来源正在播放或排队时不重复报警，默认为音效文件
+        返回报警是否已播放或排队
+        """
+        if not os.path.exists(sound_file):
+            print(f"音效文件不存在: {sound_file}")
+            return False
 
-        # 启动鼠标监听
-        self._start_mouse_listener()
+        if key is None:
+            key = sound_file
 
-    def _record_mouse_position(self):
-        """记录当前鼠标位置"""
-        try:
-            from pynput import mouse
-            # 获取当前鼠标位置
-            import ctypes
+        with self._lock:
+            alert = self._find(key)
+            if alert is not None:
+                alert.priority = max(alert.priority, priority)
+                return True
 
-            class POINT(ctypes.Structure):
-                _fields_ = [("x", ctypes.c_long), ("y", ctypes.c_long)]
+            self._seq += 1
+            alert = _Alert(key, sound_file, priority, self._seq)
 
-            pt = POINT()
-            ctypes.windll.user32.GetCursorPos(ctypes.byref(pt))
-            self.last_mouse_pos = (pt.x, pt.y)
-        except:
-            self.last_mouse_pos = None
+            channel = self._free_channel()
+            if channel is None:
+                channel = self._preemptable_channel(priority)
+                if channel is not None:
+                    self._enqueue(self._active.pop(channel))
+                    self.preempted += 1
 
-    def _play_loop(self):
-        """播放循环"""
-        if not self._init_pygame():
-            # 如果pygame失败，使用winsound
-            self._play_loop_winsound()
-            return
+            if channel is None:
+                self._enqueue(alert)
+                return True
 
-        try:
-            # 加载音效
-            self._mixer.music.load(self.sound_file)
-            self._mixer.music.play(-1)  # -1表示循环播放
+            self._start(channel, alert)
 
-            while self.playing:
-                time.sleep(0.1)
+            # 从当前鼠标位置开始，移动超过阈值时确认报警
+            self._watch_input()
 
-            self._mixer.music.stop()
-        except Exception as e:
-            print(f"播放失败: {e}")
-            # 尝试使用winsound
-            self._play_loop_winsound()
+        return True
+
+    def acknowledge(self):
+        """确认正在播放的报警（如移动鼠标），停止它们并播放排队中的报警，返回是否仍在播放"""
+        with self._lock:
+            self._active.clear()
+            try:
+                self.sound_bank.stop()
+            except:
+                pass
+
+            for channel in range(self._channel_count()):
+                if not self._pending:
+                    break
+                alert = max(self._pending, key=lambda alert: (alert.priority, -alert.seq))
+                self._pending.remove(alert)
+                self._start(channel, alert)
+
+            return self.playing
+
+    def pending_count(self):
+        """排队中的报警数"""
+        return len(self._pending)
+
+    def _find(self, key):
+        """正在播放或排队中的同一来源的报警"""
+        for alert in self._active.values():
+            if alert.key == key:
+                return alert
+        for alert in self._pending:
+            if alert.key == key:
+                return alert
+        return None
+
+    def _channel_count(self):
+        """可同时播放的报警数，pygame不可用时只有winsound一路"""
+        return self.sound_bank.channels if self.sound_bank.init() else 1
+
+    def _free_channel(self):
+        for channel in range(self._channel_count()):
+            if channel not in self._active:
+                return channel
+        return None
+
+    def _preemptable_channel(self, priority):
+        """优先级低于priority的报警中最低的一个所在的通道"""
+        lowest = None
+        for channel, alert in self._active.items():
+            if alert.priority < priority and (lowest is None or alert.priority < self._active[lowest].priority):
+                lowest = channel
+        return lowest
+
+    def _enqueue(self, alert):
+        """报警排队，队列已满时丢弃优先级最低、最早的报警"""
+        self._pending.append(alert)
+        if len(self._pending) > self.max_pending:
+            self._pending.remove(min(self._pending, key=lambda alert: (alert.priority, alert.seq)))
+            self.dropped += 1
+
+    def _start(self, channel, alert):
+        """在通道上播放报警，pygame不可用时才使用winsound线程"""
+        self._active[channel] = alert
+
+        if not self.sound_bank.play(alert.sound_file, channel):
+            self.sound_file = alert.sound_file
+            if self.play_thread is None or not self.play_thread.is_alive():
+                self.play_thread = threading.Thread(target=self._play_loop_winsound, daemon=True)
+                self.play_thread.start()
 
     def _play_loop_winsound(self):
         """使用winsound播放（备用方案，仅支持wav）"""
@@ -114,40 +195,52 @@ class SoundPlayer:
         except Exception as e:
             print(f"winsound播放失败: {e}")
 
-    def _start_mouse_listener(self):
-        """启动鼠标移动监听"""
-        try:
-            from pynput import mouse
-
-            def on_move(x, y):
-                if not self.playing:
-                    return False  # 停止监听
-
-                if self.last_mouse_pos:
-                    # 计算移动距离
-                    dx = abs(x - self.last_mouse_pos[0])
-                    dy = abs(y - self.last_mouse_pos[1])
-
-                    # 如果移动超过阈值，停止播放
-                    if dx > 10 or dy > 10:
-                        self.stop()
-                        return False  # 停止监听
-
-                return True
-
-            self.mouse_listener = mouse.Listener(on_move=on_move)
-            self.mouse_listener.start()
-        except Exception as e:
-            print(f"鼠标监听启动失败: {e}")
+    def _watch_input(self):
+        """订阅鼠标移动（监听由输入活动服务常驻，无法启动时不再重试），停顿期间由定时器稍后订阅"""
+        if self._input_handle is not None or self._rewatch_timer is not None:
+            return
+        if self.input_activity is None:
+            self.input_activity = get_input_activity()
+        self._input_handle = self.input_activity.subscribe(self._on_mouse_moved)
+
+    def _unwatch_input(self):
+        with self._lock:
+            if self._input_handle is not None:
+                self.input_activity.unsubscribe(self._input_handle)
+                self._input_handle = None
+
+    def _on_mouse_moved(self, x, y):
+        """
+        鼠标移动超过阈值：确认当前报警，排队中的报警接着播放
+        同一次移动不能连带确认刚开始播放的报警，停顿 ack_grace 后从当时的位置重新计算
+        """
+        with self._lock:
+            playing = self.acknowledge()
+            self._unwatch_input()
+            if playing:
+                self._rewatch_timer = threading.Timer(self.ack_grace, self._rewatch)
+                self._rewatch_timer.daemon = True
+                self._rewatch_timer.start()
+
+    def _rewatch(self):
+        """停顿结束：还有报警在播放时重新订阅，新的起点为当前鼠标位置"""
+        with self._lock:
+            self._rewatch_timer = None
+            if self.playing:
+                self._watch_input()
 
     def stop(self):
-        """停止播放"""
-        self.playing = False
+        """停止播放，并清空排队中的报警"""
+        with self._lock:
+            self._active.clear()
+            self._pending.clear()
+            if self._rewatch_timer is not None:
+                self._rewatch_timer.cancel()
+                self._rewatch_timer = None
 
         # 停止pygame
         try:
-            if self._mixer:
-                self._mixer.music.stop()
+            self.sound_bank.stop()
         except:
             pass
 
@@ -158,13 +251,8 @@ class SoundPlayer:
         except:
             pass
 
-        # 停止鼠标监听
-        if self.mouse_listener:
-            try:
-                self.mouse_listener.stop()
-            except:
-                pass
-            self.mouse_listener = None
+        # 不再需要鼠标移动通知
+        self._unwatch_input()
 
     def is_playing(self):
         """是否正在播放"""
@@ -0,0 +1,236 @@
+# -*- coding: utf-8 -*-
+"""
+性能统计 - 计数器和耗时直方图（按阶段和按监控项），可导出为JSON
+"""
+
+import bisect
+import json
+import os
+import threading
+import time
+
+
+# 直方图的桶上限（秒），最后一个桶收纳更大的值
+BUCKETS = (
+    0.0001, 0.00025, 0.0005,
+    0.001, 0.0025, 0.005,
+    0.01, 0.025, 0.05,
+    0.1, 0.25, 0.5,
+    1.0, 2.5, 5.0,
+)
+
+# 按监控项统计时最多保留的监控项数
+MAX_MONITORS = 2048
+
+
+class Histogram:
+    """固定桶的耗时直方图"""
+
+    __slots__ = ("counts", "count", "total", "max")
+
+    def __init__(self):
+        self.counts = [0] * (len(BUCKETS) + 1)
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+
+    def record(self, seconds):
+        self.counts[bisect.bisect_left(BUCKETS, seconds)] += 1
+        self.count += 1
+        self.total += seconds
+        if seconds > self.max:
+            self.max = seconds
+
+    def percentile(self, p):
+        """按桶估计的百分位数（返回所在桶的上限，最后一个桶返回最大值）"""
+        if not self.count:
+            return 0.0
+
+        rank = p / 100.0 * self.count
+        seen = 0
+        for index, bucket_count in enumerate(self.counts):
+            seen += bucket_count
+            if seen >= rank and bucket_count:
+                return min(BUCKETS[index], self.max) if index < len(BUCKETS) else self.max
+        return self.max
+
+    def to_dict(self):
+        return {
+            "count": self.count,
+            "total": self.total,
+            "mean": self.total / self.count if self.count else 0.0,
+            "p50": self.percentile(50),
+            "p95": self.percentile(95),
+            "p99": self.percentile(99),
+            "max": self.max,
+            "buckets": list(self.counts),
+        }
+
+
+class _Timer:
+    __slots__ = ("stats", "name", "monitor", "start")
+
+    def __init__(self, stats, name, monitor):
+        self.stats = stats
+        self.name = name
+        self.monitor = monitor
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.stats.record(self.name, time.perf_counter() - self.start, self.monitor)
+        return False
+
+
+class Stats:
+    def __init__(self, enabled=True):
+        """
+        enabled: 为False时所有记录都直接返回（用于对比统计本身的开销）
+        """
+        self.enabled = enabled
+        self.started = time.time()
+
+        self._counters = {}  # 名称 -> 次数
+        self._histograms = {}  # 阶段名称 -> Histogram
+        self._monitors = {}  # 监控项名称 -> {阶段名称: Histogram}
+        self._lock = threading.Lock()
+
+    def incr(self, name, count=1):
+        """计数器加count"""
+        if not self.enabled:
+            return
+        with self._lock:
+            self._counters[name] = self._counters.get(name, 0) + count
+
+    def record(self, name, seconds, monitor=None):
+        """
+        记录一次耗时
+        name: 阶段名称
+        monitor: 监控项名称，提供时同时计入该监控项的直方图
+        """
+        if not self.enabled:
+            return
+        with self._lock:
+            histogram = self._histograms.get(name)
+            if histogram is None:
+                histogram = self._histograms[name] = Histogram()
+            histogram.record(seconds)
+
+            if monitor is not None:
+                stages = self._monitors.get(monitor)
+                if stages is None:
+                    if len(self._monitors) >= MAX_MONITORS:
+                        return
+                    stages = self._monitors[monitor] = {}
+                histogram = stages.get(name)
+                if histogram is None:
+                    histogram = stages[name] = Histogram()
+                histogram.record(seconds)
+
+    def timer(self, name, monitor=None):
+        """计时的上下文管理器：with stats.timer("阶段"): ..."""
+        return _Timer(self, name, monitor)
+
+    def exception(self, where, error):
+        """按位置和异常类型计数"""
+        self.incr(f"exceptions.{where}.{type(error).__name__}")
+
+    def counter(self, name):
+        """计数器的当前值"""
+        return self._counters.get(name, 0)
+
+    def histogram(self, name):
+        """阶段的直方图，没有记录时返回None"""
+        return self._histograms.get(name)
+
+    def snapshot(self, extra=None):
+        """
+        当前统计的快照（可直接序列化为JSON）
+        extra: 附加的数据（如缓存和线程池的状态）
+        """
+        with self._lock:
+            data = {
+                "time": time.time(),
+                "uptime": time.time() - self.started,
+                "counters": dict(self._counters),
+                "stages": {name: histogram.to_dict() for name, histogram in self._histograms.items()},
+                "monitors": {
+                    monitor: {name: histogram.to_dict() for name, histogram in stages.items()}
+                    for monitor, stages in self._monitors.items()
+                },
+            }
+        if extra:
+            data.update(extra)
+        return data
+
+    def dump(self, path, extra=None):
+        """把快照原子地写入JSON文件"""
+        temp_path = path + ".tmp"
+        with open(temp_path, "w", encoding="utf-8") as f:
+            json.dump(self.snapshot(extra), f, ensure_ascii=False)
+        os.replace(temp_path, path)
+
+    def reset(self):
+        """清空所有统计"""
+        with self._lock:
+            self._counters.clear()
+            self._histograms.clear()
+            self._monitors.clear()
+            self.started = time.time()
+
+
+def format_snapshot(data, limit=10):
+    """把 Stats.snapshot() 的结果格式化为便于阅读的文本"""
+    lines = [f"运行时间: {data.get('uptime', 0):.0f}s"]
+
+    lines.append("")
+    lines.append(f"{'阶段':<24}{'次数':>10}{'平均ms':>10}{'p50ms':>10}{'p95ms':>10}{'最大ms':>10}")
+    for name, stage in sorted(data.get("stages", {}).items()):
+        lines.append(
+            f"{name:<24}{stage['count']:>10}{stage['mean'] * 1000:>10.2f}"
+            f"{stage['p50'] * 1000:>10.2f}{stage['p95'] * 1000:>10.2f}{stage['max'] * 1000:>10.2f}"
+        )
+
+    lines.append("")
+    lines.append("计数器:")
+    for name, count in sorted(data.get("counters", {}).items()):
+        lines.append(f"  {name}: {count}")
+
+    # 按所有阶段的总耗时排序
+    monitors = sorted(
+        data.get("monitors", {}).items(),
+        key=lambda pair: sum(stage["total"] for stage in pair[1].values()),
+        reverse=True
+    )
+    if monitors:
+        lines.append("")
+        lines.append(f"最慢的监控项（前{limit}个）:")
+        for name, stages in monitors[:limit]:
+            parts = [
+                f"{stage_name} {stage['mean'] * 1000:.2f}/{stage['max'] * 1000:.2f}ms"
+                for stage_name, stage in sorted(stages.items())
+            ]
+            lines.append(f"  {name}: " + ", ".join(parts))
+
+    for key in ("element_cache", "read_pool", "window_index", "sound", "startup"):
+        if data.get(key):
+            lines.append("")
+            lines.append(f"{key}: " + ", ".join(f"{name}={value}" for name, value in data[key].items()))
+
+    return "\n".join(lines)
+
+
+_default_stats = None
+_default_stats_lock = threading.Lock()
+
+
+def get_stats():
+    """获取进程内共享的统计"""
+    global _default_stats
+
+    with _default_stats_lock:
+        if _default_stats is None:
+            _default_stats = Stats()
+        return _default_stats
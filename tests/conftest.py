@@ -0,0 +1,50 @@
+# -*- coding: utf-8 -*-
+"""
+测试公共设置 - 让测试能导入仓库根目录下的模块，并提供模拟桌面
+"""
+
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from sim_desktop import SimulatedDesktop
+from stats import Stats
+from ui_selector import UISelector
+
+
+class FakeClock:
+    """可手动推进的时钟"""
+
+    def __init__(self, now=0.0):
+        self.now = now
+
+    def __call__(self):
+        return self.now
+
+    def advance(self, seconds):
+        self.now += seconds
+
+
+@pytest.fixture
+def clock():
+    return FakeClock()
+
+
+@pytest.fixture
+def desktop():
+    return SimulatedDesktop(windows=2, width=3, depth=3)
+
+
+@pytest.fixture
+def stats():
+    return Stats()
+
+
+@pytest.fixture
+def element_info(desktop):
+    """按UISelector的方式生成元素信息（不创建高亮窗口）"""
+    selector = UISelector(None, backend=desktop, overlay=object())
+    return selector._get_element_info
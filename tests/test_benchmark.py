@@ -0,0 +1,17 @@
+# -*- coding: utf-8 -*-
+"""
+基准测试套件的测试 - 监控循环的测量必须完整执行所有读取
+"""
+
+from benchmark import Benchmark
+
+
+def test_loop_benchmark_has_no_dropped_reads():
+    benchmark = Benchmark(windows=2, width=4, depth=3, repeat=2, ticks=5)
+    results = benchmark.run(["loop.10"])
+
+    assert benchmark.errors == []
+    assert set(results) == {"loop.10.cold", "loop.10"}
+    for result in results.values():
+        assert result["timeouts"] == 0
+        assert result["rejected"] == 0
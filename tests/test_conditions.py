@@ -0,0 +1,134 @@
+# -*- coding: utf-8 -*-
+"""
+条件编译测试 - 编译后的提取和条件检查与原来逐次解析的实现结果一致
+"""
+
+import itertools
+import re
+
+import pytest
+
+from conditions import EXTRACT_MODES, OPERATORS, CompiledMonitor, get_checker, get_extractor, get_release_checker
+
+
+def baseline_extract_value(value, mode):
+    """原 main.py 中的 extract_value"""
+    if value is None:
+        return ""
+
+    value_str = str(value)
+
+    if mode == "原始值":
+        return value_str
+
+    elif mode == "提取数字":
+        numbers = re.findall(r'-?\d+\.?\d*', value_str)
+        if numbers:
+            return numbers[0]
+        return ""
+
+    elif mode == "提取整数":
+        numbers = re.findall(r'-?\d+', value_str)
+        if numbers:
+            return numbers[0]
+        return ""
+
+    elif mode == "提取小数":
+        numbers = re.findall(r'-?\d+\.\d+', value_str)
+        if numbers:
+            return numbers[0]
+        numbers = re.findall(r'-?\d+', value_str)
+        if numbers:
+            return numbers[0]
+        return ""
+
+    elif mode == "去除空格":
+        return value_str.replace(" ", "").replace("\t", "").replace("\n", "")
+
+    elif mode == "取长度":
+        return str(len(value_str))
+
+    return value_str
+
+
+def baseline_check_condition(current, condition, target):
+    """原 main.py 中的 check_condition"""
+    try:
+        current_num = float(current) if current else 0
+        target_num = float(target) if target else 0
+
+        if condition == ">":
+            return current_num > target_num
+        elif condition == "<":
+            return current_num < target_num
+        elif condition == "=":
+            return current_num == target_num
+        elif condition == ">=":
+            return current_num >= target_num
+        elif condition == "<=":
+            return current_num <= target_num
+        elif condition == "!=":
+            return current_num != target_num
+    except (ValueError, TypeError):
+        pass
+
+    current_str = str(current) if current else ""
+    target_str = str(target) if target else ""
+
+    if condition == "=":
+        return current_str == target_str
+    elif condition == "!=":
+        return current_str != target_str
+    elif condition == "包含":
+        return target_str in current_str
+    elif condition == "不包含":
+        return target_str not in current_str
+
+    return False
+
+
+VALUES = [
+    None, "", "0", "5", "-5", "5.0", "05", "12.50", " 7 ", "1e3", "inf", "nan",
+    "abc", "ABC", "ab c", "温度 36.5℃", "-3.2 kg", "a1b2", "1.2.3", "\t4\n", 5, 0, 2.5, True,
+]
+TARGETS = ["", "0", "5", "5.0", "-5", "12.5", "abc", "b", " ", "1e3", 5, 0, None]
+CONDITIONS = list(OPERATORS) + ["未知"]
+MODES = list(EXTRACT_MODES) + ["未知"]
+
+
+@pytest.mark.parametrize("mode", MODES)
+def test_extract_matches_baseline(mode):
+    extract = get_extractor(mode)
+    for value in VALUES:
+        assert extract(value) == baseline_extract_value(value, mode), (value, mode)
+
+
+@pytest.mark.parametrize("condition", CONDITIONS)
+def test_check_matches_baseline(condition):
+    for target in TARGETS:
+        check = get_checker(condition, target)
+        for value in VALUES:
+            expected = baseline_check_condition(value, condition, target)
+            assert check(value) == expected, (value, condition, target)
+
+
+def test_compiled_monitor_matches_baseline():
+    for mode, condition, target in itertools.product(MODES, CONDITIONS, TARGETS):
+        monitor = CompiledMonitor({"extract_mode": mode, "condition": condition, "target_value": target})
+        for value in VALUES:
+            extracted = baseline_extract_value(value, mode)
+            expected = baseline_check_condition(extracted, condition, target)
+            assert monitor.evaluate(value) == (extracted, expected), (value, mode, condition, target)
+
+
+def test_release_checker_without_hysteresis_matches_check():
+    for condition, target in itertools.product(CONDITIONS, TARGETS):
+        check = get_checker(condition, target)
+        hold = get_release_checker(condition, target, 0)
+        for value in VALUES:
+            assert hold(value) == check(value)
+
+
+def test_release_checker_ignores_non_numeric_target():
+    hold = get_release_checker(">", "abc", 5)
+    assert hold("abc") == baseline_check_condition("abc", ">", "abc")
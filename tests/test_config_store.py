@@ -0,0 +1,124 @@
+# -*- coding: utf-8 -*-
+"""
+配置存储测试 - 日志重放、崩溃留下的不完整行和快照合并
+"""
+
+import json
+
+from config_store import ConfigStore
+
+
+def _item(n):
+    return {"element_info": {"name": f"元素 {n}"}, "condition": ">", "target_value": str(n)}
+
+
+def _journal_lines(store):
+    with open(store.journal_path, "r", encoding="utf-8") as f:
+        return f.read().splitlines()
+
+
+def test_load_missing_files(tmp_path):
+    store = ConfigStore(str(tmp_path / "monitors.json"))
+    assert store.load() == []
+    assert not store.dirty
+
+
+def test_replay_add_remove(tmp_path):
+    path = str(tmp_path / "monitors.json")
+    store = ConfigStore(path)
+    store.load()
+    store.add(_item(1))
+    store.add(_item(2))
+    store.add(_item(3))
+    store.remove(0)
+    assert store.dirty
+    assert len(_journal_lines(store)) == 4
+
+    items = ConfigStore(path).load()
+    assert items == [_item(2), _item(3)]
+
+
+def test_load_compacts_replayed_journal(tmp_path):
+    path = str(tmp_path / "monitors.json")
+    store = ConfigStore(path)
+    store.add(_item(1))
+
+    reloaded = ConfigStore(path)
+    assert reloaded.load() == [_item(1)]
+    assert not reloaded.dirty
+    assert _journal_lines(reloaded) == []
+
+    with open(path, "r", encoding="utf-8") as f:
+        assert json.load(f)["items"] == [_item(1)]
+
+
+def test_crash_tail_is_ignored(tmp_path):
+    path = str(tmp_path / "monitors.json")
+    store = ConfigStore(path)
+    store.add(_item(1))
+    store.add(_item(2))
+
+    # 写入第三条时崩溃，只留下半行
+    with open(store.journal_path, "a", encoding="utf-8") as f:
+        f.write('{"op":"add","item":{"element_info"')
+
+    reloaded = ConfigStore(path)
+    assert reloaded.load() == [_item(1), _item(2)]
+
+    # 损坏的日志已合并掉，之后的变更正常追加
+    reloaded.add(_item(3))
+    assert ConfigStore(path).load() == [_item(1), _item(2), _item(3)]
+
+
+def test_entries_already_in_snapshot_are_skipped(tmp_path):
+    path = str(tmp_path / "monitors.json")
+    store = ConfigStore(path)
+    store.add(_item(1))
+    journal = _journal_lines(store)
+
+    store.compact([_item(1)])
+
+    # 模拟快照写入后、清空日志前崩溃
+    with open(store.journal_path, "w", encoding="utf-8") as f:
+        f.write("\n".join(journal) + "\n")
+
+    assert ConfigStore(path).load() == [_item(1)]
+
+
+def test_sequence_continues_after_reload(tmp_path):
+    path = str(tmp_path / "monitors.json")
+    store = ConfigStore(path)
+    store.add(_item(1))
+
+    reloaded = ConfigStore(path)
+    reloaded.load()
+    reloaded.add(_item(2))
+    assert json.loads(_journal_lines(reloaded)[0])["seq"] == 2
+
+    assert ConfigStore(path).load() == [_item(1), _item(2)]
+
+
+def test_legacy_list_format(tmp_path):
+    path = tmp_path / "monitors.json"
+    path.write_text(json.dumps([_item(1), _item(2)], ensure_ascii=False), encoding="utf-8")
+
+    store = ConfigStore(str(path))
+    assert store.load() == [_item(1), _item(2)]
+
+    store.remove(0)
+    assert ConfigStore(str(path)).load() == [_item(2)]
+
+
+def test_needs_compaction(tmp_path):
+    store = ConfigStore(str(tmp_path / "monitors.json"), compact_every=3)
+    store.load()
+    store.add(_item(1))
+    store.add(_item(2))
+    assert not store.needs_compaction
+
+    store.add(_item(3))
+    assert store.needs_compaction
+
+    store.compact([_item(1), _item(2), _item(3)])
+    assert not store.needs_compaction
+    assert not store.dirty
@@ -0,0 +1,161 @@
+# -*- coding: utf-8 -*-
+"""
+元素缓存测试 - TTL、LRU淘汰、进程退出和校验
+"""
+
+from element_cache import ElementCache, locator_fingerprint
+from monitor import MonitorManager
+
+
+def test_fingerprint_ignores_key_order():
+    a = {"automation_id": "ok", "process_id": 5, "path": [{"name": "窗口", "class_name": "W"}]}
+    b = {"path": [{"class_name": "W", "name": "窗口"}], "process_id": 5, "automation_id": "ok"}
+    assert locator_fingerprint(a) == locator_fingerprint(b)
+    assert locator_fingerprint(a) != locator_fingerprint(dict(a, process_id=6))
+
+
+def test_ttl_expires_entry(clock):
+    cache = ElementCache(ttl=10.0, clock=clock)
+    cache.put("a", "element")
+
+    clock.advance(9.0)
+    assert cache.get("a") == "element"
+
+    clock.advance(2.0)
+    assert cache.get("a") is None
+    assert "a" not in cache
+    assert cache.hits == 1
+    assert cache.misses == 1
+
+
+def test_ttl_none_never_expires(clock):
+    cache = ElementCache(ttl=None, clock=clock)
+    cache.put("a", "element")
+    clock.advance(1e6)
+    assert cache.get("a") == "element"
+
+
+def test_lru_evicts_least_recently_used():
+    cache = ElementCache(max_size=2)
+    cache.put("a", 1)
+    cache.put("b", 2)
+    assert cache.get("a") == 1  # a成为最近使用
+
+    cache.put("c", 3)
+    assert "b" not in cache
+    assert cache.get("a") == 1
+    assert cache.get("c") == 3
+    assert cache.evictions == 1
+
+
+def test_put_replaces_entry_and_clears_reader():
+    cache = ElementCache()
+    cache.put("a", 1)
+    cache.set_reader("a", "value")
+    cache.put("a", 2)
+    assert cache.get("a") == 2
+    assert cache.reader_of("a") is None
+    assert len(cache) == 1
+
+
+def test_validator_failure_drops_entry():
+    alive = {"a": True}
+    cache = ElementCache(validator=lambda element, runtime_id: alive[element])
+    cache.put("key", "a", runtime_id=(1, 2))
+    assert cache.get("key") == "a"
+
+    alive["a"] = False
+    assert cache.get("key") is None
+    assert "key" not in cache
+
+
+def test_validator_exception_counts_as_dead():
+    def validator(element, runtime_id):
+        raise RuntimeError("元素已失效")
+
+    cache = ElementCache(validator=validator)
+    cache.put("key", "a")
+    assert cache.get("key") is None
+
+
+def test_process_exit_drops_all_entries_of_process(clock):
+    running = {100, 200}
+    cache = ElementCache(process_checker=lambda pid: pid in running, process_check_interval=1.0, clock=clock)
+    cache.put("a", 1, process_id=100)
+    cache.put("b", 2, process_id=100)
+    cache.put("c", 3, process_id=200)
+    assert cache.get("a") == 1
+
+    running.discard(100)
+
+    # 检查结果在间隔内复用
+    assert cache.get("a") == 1
+
+    clock.advance(1.5)
+    assert cache.get("a") is None
+    assert "b" not in cache
+    assert cache.get("c") == 3
+
+
+def test_process_checker_exception_keeps_entry(clock):
+    def checker(pid):
+        raise OSError("无法查询")
+
+    cache = ElementCache(process_checker=checker, clock=clock)
+    cache.put("a", 1, process_id=100)
+    assert cache.get("a") == 1
+
+
+def test_invalidate_process():
+    cache = ElementCache()
+    cache.put("a", 1, process_id=100)
+    cache.put("b", 2, process_id=200)
+    cache.invalidate_process(100)
+    assert "a" not in cache
+    assert "b" in cache
+
+
+def test_peek_skips_validator_but_honours_ttl(clock):
+    calls = []
+    cache = ElementCache(ttl=5.0, validator=lambda element, runtime_id: calls.append(element) or True, clock=clock)
+    cache.put("a", "element", runtime_id=(1, 2))
+    cache.set_reader("a", "value")
+
+    assert cache.peek("a") == ("element", (1, 2), "value")
+    assert calls == []
+
+    clock.advance(6.0)
+    assert cache.peek("a") is None
+    assert "a" not in cache
+
+
+def test_peek_honours_process_exit(clock):
+    running = {100}
+    cache = ElementCache(process_checker=lambda pid: pid in running, process_check_interval=0, clock=clock)
+    cache.put("a", "element", process_id=100)
+    running.clear()
+    assert cache.peek("a") is None
+
+
+def test_manager_reuses_cached_element(desktop, element_info, stats):
+    manager = MonitorManager(backend=desktop, stats=stats)
+    leaf = desktop.leaves()[0]
+    info = element_info(leaf)
+
+    assert manager.resolve_element(info) is leaf
+    assert manager.resolve_element(info) is leaf
+    assert manager.element_cache.hits == 1
+
+
+def test_manager_relocates_after_process_exit(desktop, element_info, stats):
+    manager = MonitorManager(backend=desktop, stats=stats)
+    manager.element_cache.process_check_interval = 0
+    leaf = desktop.leaves()[0]
+    info = element_info(leaf)
+    assert manager.get_element_value(info) is not None
+
+    desktop.kill_process(leaf.ProcessId)
+    manager.begin_tick()
+
+    assert manager.get_element_value(info) is None
+    assert len(manager.element_cache) == 0
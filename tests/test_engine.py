@@ -0,0 +1,193 @@
+# -*- coding: utf-8 -*-
+"""
+监控引擎测试 - 在模拟桌面上运行监控循环
+"""
+
+import threading
+import time
+
+import pytest
+
+from engine import MonitorEngine, EVENT_FALLBACK_INTERVAL, READ_WORKERS
+from monitor import MonitorManager
+from scheduler import MonitorScheduler
+from sim_desktop import SimulatedDesktop
+from sound_bank import SoundBank
+from sound_player import SoundPlayer
+from ui_selector import UISelector
+from worker_pool import WorkerPool
+
+
+@pytest.fixture
+def make_engine(desktop, stats, tmp_path):
+    engines = []
+
+    def make_engine(event_mode=False):
+        updates = []
+        engine = MonitorEngine(
+            backend=desktop,
+            sound_player=SoundPlayer(SoundBank(driver="dummy")),
+            config_file=str(tmp_path / "monitors.json"),
+            on_update=lambda item, column, value: updates.append((item, column, value)),
+            stats=stats
+        )
+        engine.updates = updates
+        engine.set_event_mode(event_mode)
+        engines.append(engine)
+        return engine
+
+    yield make_engine
+
+    for engine in engines:
+        engine.stop()
+
+
+def _item(info, condition, target, **extra):
+    item = {
+        "element_info": info,
+        "condition": condition,
+        "target_value": target,
+        "extract_mode": "提取数字",
+        "sound_file": "",
+        "interval": 0.1,
+        "enabled": True,
+    }
+    item.update(extra)
+    return item
+
+
+def _wait_for_status(engine, item, status, timeout):
+    """等待监控项进入某个状态，返回用时（秒），超时返回None"""
+    start = time.monotonic()
+    while time.monotonic() - start < timeout:
+        if engine._published.get((id(item), "status")) == status:
+            return time.monotonic() - start
+        time.sleep(0.02)
+    return None
+
+
+@pytest.mark.parametrize("event_mode", [False, True])
+def test_hold_time_fires_in_both_modes(make_engine, desktop, element_info, event_mode):
+    engine = make_engine(event_mode)
+    control = next(control for control in desktop.leaves() if control.pattern == "value")
+    item = _item(element_info(control), ">", "-1", hold_time=0.3)
+    engine.schedule_item(item)
+    engine.start()
+
+    elapsed = _wait_for_status(engine, item, "已触发", 3.0)
+    assert elapsed is not None
+    assert elapsed >= 0.3
+
+    if event_mode:
+        # 报警后不再等待，回到事件加兜底轮询
+        group, = engine._groups.values()
+        deadline = time.monotonic() + 1.0
+        while group.interval != EVENT_FALLBACK_INTERVAL and time.monotonic() < deadline:
+            time.sleep(0.02)
+        assert group.event_watched
+        assert group.interval == EVENT_FALLBACK_INTERVAL
+
+
+def test_event_mode_reacts_to_value_change(make_engine, desktop, element_info):
+    engine = make_engine(event_mode=True)
+    control = next(control for control in desktop.leaves() if control.pattern == "value")
+    desktop.set_value(control, "10")
+    item = _item(element_info(control), ">", "100")
+    engine.schedule_item(item)
+    engine.start()
+
+    assert _wait_for_status(engine, item, "监控中", 2.0) is not None
+    group, = engine._groups.values()
+    assert group.event_watched
+    assert group.interval == EVENT_FALLBACK_INTERVAL
+
+    # 兜底轮询要30秒后才会运行，报警只能来自值变化事件
+    desktop.set_value(control, "500")
+    assert _wait_for_status(engine, item, "已触发", 1.0) is not None
+
+
+def test_event_mode_elements_without_events_keep_polling(make_engine, desktop, element_info):
+    engine = make_engine(event_mode=True)
+    control = next(control for control in desktop.leaves() if control.pattern == "value")
+    desktop.set_value(control, "10")
+    desktop.subscribe_changes = lambda element, callback: None
+    item = _item(element_info(control), ">", "100")
+    engine.schedule_item(item)
+    engine.start()
+
+    assert _wait_for_status(engine, item, "监控中", 2.0) is not None
+    group, = engine._groups.values()
+    assert group.event_watched is False
+
+    desktop.set_value(control, "500")
+    assert _wait_for_status(engine, item, "已触发", 1.0) is not None
+
+
+def test_event_mode_does_not_search_on_monitor_thread(make_engine, desktop, element_info):
+    engine = make_engine(event_mode=True)
+    manager = engine.monitor_manager
+    control = next(control for control in desktop.leaves() if control.pattern == "value")
+    found = dict(element_info(control))
+    missing = dict(found, locator=dict(found["locator"], automation_id="不存在", path=[], process_id=0,
+                                       name="不存在"))
+    engine.schedule_item(_item(found, ">", "100"))
+    engine.schedule_item(_item(missing, ">", "100"))
+
+    threads = []
+    find_element = manager._find_element
+
+    def record_find(element_info):
+        threads.append(threading.current_thread())
+        return find_element(element_info)
+
+    manager._find_element = record_find
+
+    for _ in range(3):
+        for group in list(engine._groups.values()):
+            engine.scheduler.run_now(group)
+        engine.run_once()
+
+    # 定位只在读取线程中进行，找不到的元素不订阅
+    assert threads
+    assert threading.current_thread() not in threads
+    watched = {group.element_info["locator"]["automation_id"]: group.event_watched
+               for group in engine._groups.values()}
+    assert watched == {found["locator"]["automation_id"]: True, "不存在": None}
+
+
+def test_run_once_reads_one_window_with_one_snapshot(make_engine, clock, element_info):
+    desktop = SimulatedDesktop(windows=1, width=8, depth=2)
+    engine = make_engine()
+    engine.monitor_manager = MonitorManager(desktop, stats=engine.stats)
+    engine.read_pool = WorkerPool(desktop, max_workers=READ_WORKERS)
+    engine.scheduler = MonitorScheduler(clock=clock)
+    selector = UISelector(None, backend=desktop, overlay=object())
+
+    cells = [control for control in desktop.leaves() if control.pattern in ("value", "range")]
+    assert len(cells) >= 20
+    for rank, control in enumerate(cells):
+        # 首次运行错开，模拟抖动和自适应间隔造成的分散
+        item = _item(selector._get_element_info(control), ">", "1e12", interval=1)
+        engine.schedule_item(item, delay=rank * 0.03)
+
+    def run(seconds):
+        ticks = []
+        for _ in range(int(seconds / 0.05)):
+            clock.advance(0.05)
+            processed = engine.run_once()
+            if processed:
+                ticks.append(processed)
+        return ticks
+
+    # 几轮之后同一窗口的组对齐到同一轮
+    run(3.0)
+    desktop.reset_stats()
+    engine.stats.reset()
+    ticks = run(4.0)
+
+    counters = engine.stats.snapshot()["counters"]
+    assert ticks == [len(cells)] * len(ticks)
+    assert len(ticks) <= 5
+    assert counters["snapshot.hits"] == len(ticks) * len(cells)
+    assert counters.get("snapshot.misses", 0) == 0
+    assert desktop.calls <= len(ticks) * 4
@@ -0,0 +1,112 @@
+# -*- coding: utf-8 -*-
+"""
+输入活动服务测试 - 常驻的输入源、移动阈值和频率限制
+"""
+
+import time
+
+from input_activity import InputActivity, ManualSource
+
+
+class CountingSource(ManualSource):
+    """记录启动和停止次数的手动输入源"""
+
+    def __init__(self, fail=False):
+        super().__init__()
+        self.fail = fail
+        self.starts = 0
+        self.stops = 0
+
+    def start(self, handler):
+        self.starts += 1
+        if self.fail:
+            raise ImportError("No module named 'pynput'")
+        super().start(handler)
+
+    def stop(self):
+        self.stops += 1
+        super().stop()
+
+
+def _wait_until(condition, timeout=1.0):
+    deadline = time.monotonic() + timeout
+    while not condition() and time.monotonic() < deadline:
+        time.sleep(0.005)
+    return condition()
+
+
+def test_source_starts_once_and_stays_running():
+    source = CountingSource()
+    activity = InputActivity(source=source, min_interval=0)
+    moves = []
+
+    for _ in range(5):
+        handle = activity.subscribe(lambda x, y: moves.append((x, y)))
+        source.move(100, 0)
+        activity.unsubscribe(handle)
+        source.move(0, 0)  # 没有订阅者，不处理
+
+    assert source.starts == 1
+    assert source.stops == 0
+    assert moves == [(100, 0)] * 5
+    assert activity.events == 5
+
+    activity.shutdown()
+    assert source.stops == 1
+
+
+def test_threshold_is_measured_from_last_notification():
+    source = CountingSource()
+    activity = InputActivity(source=source, threshold=10, min_interval=0)
+    moves = []
+    activity.subscribe(lambda x, y: moves.append((x, y)))
+
+    source.move(5, 5)
+    assert moves == []
+    source.move(11, 0)
+    assert moves == [(11, 0)]
+    source.move(20, 0)
+    assert moves == [(11, 0)]
+    source.move(22, 0)
+    assert moves == [(11, 0), (22, 0)]
+
+
+def test_per_subscription_threshold():
+    source = CountingSource()
+    activity = InputActivity(source=source, min_interval=0)
+    small, large = [], []
+    activity.subscribe(lambda x, y: small.append((x, y)), threshold=2)
+    activity.subscribe(lambda x, y: large.append((x, y)), threshold=50)
+
+    source.move(3, 0)
+    assert small == [(3, 0)]
+    assert large == []
+
+
+def test_moves_inside_min_interval_are_coalesced():
+    source = CountingSource()
+    activity = InputActivity(source=source, threshold=10, min_interval=0.05)
+    moves = []
+    activity.subscribe(lambda x, y: moves.append((x, y)))
+
+    # 小幅移动后紧接着一次快速甩动：甩动落在间隔内，间隔结束时按最新位置处理
+    source.move(2, 0)
+    time.sleep(0.02)
+    source.move(42, 0)
+    source.move(40, 3)
+    assert moves == []
+
+    assert _wait_until(lambda: moves)
+    assert moves == [(40, 3)]
+    assert activity.events == 2
+
+
+def test_failed_source_is_not_retried(capsys):
+    source = CountingSource(fail=True)
+    activity = InputActivity(source=source)
+
+    assert activity.subscribe(lambda x, y: None) is None
+    assert activity.subscribe(lambda x, y: None) is None
+    assert source.starts == 1
+    assert not activity.available
+    assert capsys.readouterr().out.count("鼠标监听启动失败") == 1
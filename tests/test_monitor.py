@@ -0,0 +1,97 @@
+# -*- coding: utf-8 -*-
+"""
+元素定位和读取测试 - 在模拟桌面上验证取值方式、批量快照和路径定位
+"""
+
+from monitor import MonitorManager
+
+
+def _leaves_with(desktop, pattern):
+    return [control for control in desktop.leaves() if control.pattern == pattern]
+
+
+def test_reads_each_pattern(desktop, element_info, stats):
+    manager = MonitorManager(backend=desktop, stats=stats)
+    for pattern in ("value", "range", "toggle", None):
+        control = _leaves_with(desktop, pattern)[0]
+        value = manager.get_element_value(element_info(control))
+        assert value, pattern
+
+
+def test_reader_memo_survives_empty_value(desktop, element_info, stats):
+    manager = MonitorManager(backend=desktop, stats=stats)
+    control = _leaves_with(desktop, "value")[0]
+    info = element_info(control)
+
+    # 值为空时退回到名称，但记住的取值方式仍是ValuePattern
+    desktop.set_value(control, "")
+    assert manager.get_element_value(info) == control.Name
+
+    desktop.set_value(control, "123.45")
+    assert manager.get_element_value(info) == "123.45"
+
+
+def test_bulk_read_matches_single_reads(desktop, element_info, stats):
+    manager = MonitorManager(backend=desktop, stats=stats)
+    controls = [control for control in desktop.leaves() if control.pattern in ("value", "range")]
+    infos = [element_info(control) for control in controls]
+    manager.get_element_values(infos)
+
+    for control in controls[:3]:
+        desktop.set_value(control, "42")
+
+    values = manager.get_element_values(infos)
+    assert stats.snapshot()["counters"]["snapshot.hits"] > 0
+
+    single = MonitorManager(backend=desktop, stats=stats)
+    assert values == [single.get_element_value(info) for info in infos]
+
+
+def test_bulk_read_after_process_exit(desktop, element_info, stats):
+    manager = MonitorManager(backend=desktop, stats=stats)
+    manager.element_cache.process_check_interval = 0
+    controls = [control for control in desktop.leaves() if control.pattern == "value"]
+    infos = [element_info(control) for control in controls]
+    manager.get_element_values(infos)
+
+    desktop.kill_process(controls[0]._process_id)
+    manager.begin_tick()
+    values = manager.get_element_values(infos)
+
+    # 已退出进程的元素不再被读取，其他进程的元素照常读取
+    for control, info, value in zip(controls, infos, values):
+        assert not isinstance(value, Exception)
+        element = manager.resolve_element(info)
+        assert element is None or element.alive
+        if control.alive:
+            assert value == control.value
+
+
+def test_path_falls_back_when_name_changes(desktop, element_info, stats):
+    manager = MonitorManager(backend=desktop, stats=stats)
+    control = next(control for control in desktop.leaves() if not control._automation_id)
+    info = element_info(control)
+    info["locator"].pop("automation_id", None)
+    assert manager.resolve_element(info) is control
+
+    # 父元素改名后，按control_type和class_name在重新枚举的子元素中匹配
+    parent = control.GetParentControl()
+    manager.invalidate(info)
+    parent._name = "改名后"
+    parent._automation_id = ""
+    found = manager.resolve_element(info)
+    assert found is not None
+    assert found.ControlTypeName == control.ControlTypeName
+
+
+def test_invalidate_drops_path_chain(desktop, element_info, stats):
+    manager = MonitorManager(backend=desktop, stats=stats)
+    control = desktop.leaves()[0]
+    info = element_info(control)
+    info["locator"].pop("automation_id", None)
+    info["locator"]["process_id"] = 0
+    assert manager.resolve_element(info) is control
+    assert manager._path_chains
+
+    manager.invalidate(info)
+    assert manager._path_chains == {}
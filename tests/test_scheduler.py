@@ -0,0 +1,165 @@
+# -*- coding: utf-8 -*-
+"""
+调度器测试 - 到期顺序、首次运行顺序、间隔修改和自适应间隔
+"""
+
+from scheduler import MonitorScheduler, AdaptiveRate, STABLE_READS, BACKOFF_FACTOR
+
+
+def _payloads(n):
+    return [{"n": i} for i in range(n)]
+
+
+def test_items_run_at_their_own_interval(clock):
+    scheduler = MonitorScheduler(jitter=0, clock=clock)
+    fast, slow = _payloads(2)
+    scheduler.add(fast, 1.0)
+    scheduler.add(slow, 3.0)
+
+    runs = []
+    for _ in range(6):
+        runs.append(sorted(item["n"] for item in scheduler.pop_due()))
+        clock.advance(1.0)
+
+    assert runs == [[0, 1], [0], [0], [0, 1], [0], [0]]
+
+
+def test_first_run_keeps_delay_order(clock):
+    scheduler = MonitorScheduler(jitter=0.5, clock=clock)
+    items = _payloads(50)
+    for rank, item in enumerate(items):
+        scheduler.add(item, 1.0, delay=rank * 0.001)
+
+    # 第二次运行带抖动，最早在0.5秒后
+    clock.advance(0.1)
+    assert scheduler.pop_due() == items
+
+
+def test_min_interval_and_bad_interval(clock):
+    scheduler = MonitorScheduler(jitter=0, min_interval=0.05, clock=clock)
+    item, other = _payloads(2)
+    scheduler.add(item, 0.001)
+    scheduler.add(other, "abc")
+    scheduler.pop_due()
+
+    clock.advance(0.05)
+    assert scheduler.pop_due() == [item]
+
+    clock.advance(0.95)
+    assert scheduler.pop_due() == [item, other]
+
+
+def test_remove_and_contains(clock):
+    scheduler = MonitorScheduler(jitter=0, clock=clock)
+    item, = _payloads(1)
+    scheduler.add(item, 1.0)
+    assert item in scheduler
+    assert len(scheduler) == 1
+
+    scheduler.remove(item)
+    assert item not in scheduler
+    assert scheduler.pop_due() == []
+    assert scheduler.next_deadline() is None
+
+
+def test_set_interval_reschedules(clock):
+    scheduler = MonitorScheduler(jitter=0, clock=clock)
+    item, = _payloads(1)
+    scheduler.add(item, 1.0)
+    assert scheduler.pop_due() == [item]
+
+    scheduler.set_interval(item, 4.0)
+    assert scheduler.next_deadline() == 4.0
+
+    clock.advance(3.9)
+    assert scheduler.pop_due() == []
+    clock.advance(0.1)
+    assert scheduler.pop_due() == [item]
+
+
+def test_run_now(clock):
+    scheduler = MonitorScheduler(jitter=0, clock=clock)
+    item, = _payloads(1)
+    scheduler.add(item, 10.0)
+    scheduler.pop_due()
+
+    clock.advance(1.0)
+    scheduler.run_now(item)
+    assert scheduler.pop_due() == [item]
+    assert scheduler.next_deadline() == 11.0
+
+
+def test_does_not_catch_up_after_stall(clock):
+    scheduler = MonitorScheduler(jitter=0, clock=clock)
+    item, = _payloads(1)
+    scheduler.add(item, 1.0)
+    scheduler.pop_due()
+
+    clock.advance(10.0)
+    assert scheduler.pop_due() == [item]
+    assert scheduler.pop_due() == []
+    assert scheduler.next_deadline() == 11.0
+
+
+def test_jitter_stays_within_bounds(clock):
+    scheduler = MonitorScheduler(jitter=0.1, clock=clock)
+    items = _payloads(200)
+    for item in items:
+        scheduler.add(item, 1.0)
+    scheduler.pop_due()
+
+    clock.advance(0.899)
+    assert scheduler.pop_due() == []
+    clock.advance(0.202)
+    assert len(scheduler.pop_due()) == len(items)
+
+
+def test_pull_runs_item_due_soon(clock):
+    scheduler = MonitorScheduler(jitter=0, clock=clock)
+    soon, later = _payloads(2)
+    scheduler.add(soon, 1.0, delay=0.4)
+    scheduler.add(later, 1.0, delay=0.9)
+
+    assert scheduler.pull(soon, 0.5)
+    assert not scheduler.pull(later, 0.5)
+    assert not scheduler.pull({"n": -1}, 0.5)
+
+    # 提前运行后，下一次从现在起算
+    assert scheduler.next_deadline() == 0.9
+    clock.advance(0.9)
+    assert scheduler.pop_due() == [later]
+    clock.advance(0.1)
+    assert scheduler.pop_due() == [soon]
+
+
+def test_adaptive_rate_backs_off_when_stable():
+    rate = AdaptiveRate(0.5, 4.0)
+    intervals = [rate.observe() for _ in range(STABLE_READS * 4)]
+
+    assert intervals[STABLE_READS - 2] == 0.5
+    assert intervals[STABLE_READS - 1] == 0.5 * BACKOFF_FACTOR
+    assert intervals[-1] == 4.0
+
+
+def test_adaptive_rate_resets_on_change():
+    rate = AdaptiveRate(0.5, 4.0)
+    for _ in range(STABLE_READS * 2):
+        rate.observe()
+    assert rate.interval > 0.5
+
+    assert rate.observe(changed=True) == 0.5
+    assert rate.stable_reads == 0
+
+
+def test_adaptive_rate_backs_off_on_failure():
+    rate = AdaptiveRate(0.5, 1.5)
+    assert rate.observe(failed=True) == 1.0
+    assert rate.observe(failed=True) == 1.5
+    assert rate.observe(failed=True) == 1.5
+
+
+def test_adaptive_rate_without_max_never_backs_off():
+    rate = AdaptiveRate(0.5)
+    for _ in range(STABLE_READS * 3):
+        assert rate.observe() == 0.5
+    assert rate.observe(failed=True) == 0.5
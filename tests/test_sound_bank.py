@@ -0,0 +1,61 @@
+# -*- coding: utf-8 -*-
+"""
+音效库测试 - 预先解码、缓存和报警通道（使用SDL的dummy音频驱动）
+"""
+
+import wave
+
+import pytest
+
+from sound_bank import SoundBank
+
+
+@pytest.fixture
+def sound_file(tmp_path):
+    """生成一段很短的静音wav"""
+    path = tmp_path / "alert.wav"
+    with wave.open(str(path), "wb") as f:
+        f.setnchannels(1)
+        f.setsampwidth(2)
+        f.setframerate(8000)
+        f.writeframes(b"\0\0" * 800)
+    return str(path)
+
+
+@pytest.fixture
+def bank():
+    bank = SoundBank(driver="dummy", channels=2)
+    if not bank.init():
+        pytest.skip("pygame不可用")
+    yield bank
+    bank.stop()
+
+
+def test_preload_decodes_once(bank, sound_file):
+    bank.preload([sound_file, sound_file])
+    assert len(bank) == 1
+
+    sound = bank.get(sound_file)
+    assert sound is not None
+    assert bank.get(sound_file) is sound
+
+
+def test_missing_file_is_remembered(bank, tmp_path):
+    missing = str(tmp_path / "missing.wav")
+    assert bank.get(missing) is None
+    assert bank.get("") is None
+    assert len(bank) == 1
+    assert not bank.play(missing)
+
+
+def test_play_and_stop_channels(bank, sound_file):
+    channels = bank._channels
+    assert bank.play(sound_file, channel=0)
+    assert [channel.get_busy() for channel in channels] == [True, False]
+
+    assert bank.play(sound_file, channel=1)
+    bank.stop(0)
+    assert [channel.get_busy() for channel in channels] == [False, True]
+
+    bank.stop()
+    assert not any(channel.get_busy() for channel in channels)
@@ -0,0 +1,119 @@
+# -*- coding: utf-8 -*-
+"""
+报警播放器测试 - 多通道、优先级、排队和鼠标确认（使用SDL的dummy音频驱动）
+"""
+
+import time
+import wave
+
+import pytest
+
+from input_activity import InputActivity, ManualSource
+from sound_bank import SoundBank
+from sound_player import SoundPlayer
+
+
+@pytest.fixture
+def sound_file(tmp_path):
+    """生成一段很短的静音wav"""
+    path = tmp_path / "alert.wav"
+    with wave.open(str(path), "wb") as f:
+        f.setnchannels(1)
+        f.setsampwidth(2)
+        f.setframerate(8000)
+        f.writeframes(b"\0\0" * 800)
+    return str(path)
+
+
+@pytest.fixture
+def source():
+    return ManualSource()
+
+
+@pytest.fixture
+def player(source):
+    bank = SoundBank(driver="dummy", channels=2)
+    if not bank.init():
+        pytest.skip("pygame不可用")
+    player = SoundPlayer(bank, input_activity=InputActivity(source=source, min_interval=0))
+    yield player
+    player.stop()
+
+
+def _gesture(source, start, distance, duration=0.3, steps=15):
+    """从start开始在duration秒内水平移动distance像素"""
+    x, y = start
+    for step in range(1, steps + 1):
+        source.move(x + distance * step // steps, y)
+        time.sleep(duration / steps)
+    return x + distance, y
+
+
+def test_alerts_share_channels_and_queue(player, sound_file):
+    for key in range(5):
+        assert player.play(sound_file, key=key)
+
+    assert len(player._active) == 2
+    assert player.pending_count() == 3
+
+    # 同一来源不重复报警
+    assert player.play(sound_file, key=0)
+    assert player.pending_count() == 3
+
+
+def test_higher_priority_preempts(player, sound_file):
+    player.play(sound_file, priority=0, key="low")
+    player.play(sound_file, priority=1, key="mid")
+    player.play(sound_file, priority=5, key="high")
+
+    active = sorted(alert.key for alert in player._active.values())
+    assert active == ["high", "mid"]
+    assert player.preempted == 1
+    assert [alert.key for alert in player._pending] == ["low"]
+
+
+def test_queue_drops_lowest_priority(source, sound_file):
+    bank = SoundBank(driver="dummy", channels=1)
+    if not bank.init():
+        pytest.skip("pygame不可用")
+    player = SoundPlayer(bank, max_pending=2, input_activity=InputActivity(source=source, min_interval=0))
+    try:
+        player.play(sound_file, priority=5, key="playing")
+        player.play(sound_file, priority=0, key="a")
+        player.play(sound_file, priority=2, key="b")
+        player.play(sound_file, priority=1, key="c")
+        assert sorted(alert.key for alert in player._pending) == ["b", "c"]
+        assert player.dropped == 1
+    finally:
+        player.stop()
+
+
+def test_one_gesture_acknowledges_only_sounding_alerts(player, source, sound_file):
+    for key in range(8):
+        player.play(sound_file, key=key)
+    assert player.pending_count() == 6
+
+    # 一次持续300毫秒的移动只确认正在播放的两个报警
+    position = _gesture(source, (0, 0), 300)
+    assert player.playing
+    assert player.pending_count() == 4
+
+    # 停顿之后的新移动确认下一批
+    time.sleep(player.ack_grace + 0.1)
+    position = _gesture(source, position, 100)
+    assert player.pending_count() == 2
+
+    time.sleep(player.ack_grace + 0.1)
+    position = _gesture(source, position, 100)
+    time.sleep(player.ack_grace + 0.1)
+    _gesture(source, position, 100)
+    assert not player.playing
+    assert player.pending_count() == 0
+
+
+def test_stop_clears_queue(player, sound_file):
+    for key in range(4):
+        player.play(sound_file, key=key)
+    player.stop()
+    assert not player.playing
+    assert player.pending_count() == 0
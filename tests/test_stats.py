@@ -0,0 +1,62 @@
+# -*- coding: utf-8 -*-
+"""
+性能统计测试 - 直方图、按监控项记录和文本格式化
+"""
+
+import json
+
+import stats as stats_module
+from stats import Histogram, Stats, format_snapshot
+
+
+def test_histogram_percentiles():
+    histogram = Histogram()
+    for _ in range(90):
+        histogram.record(0.0005)
+    for _ in range(10):
+        histogram.record(0.2)
+
+    assert histogram.count == 100
+    assert histogram.percentile(50) <= 0.001
+    assert histogram.percentile(95) >= 0.1
+    assert histogram.percentile(100) == histogram.max == 0.2
+    assert Histogram().percentile(50) == 0.0
+
+
+def test_records_per_monitor_and_serializes():
+    stats = Stats()
+    with stats.timer("read", "快的"):
+        pass
+    stats.record("read", 0.5, "慢的")
+    stats.incr("snapshot.hits", 3)
+    stats.exception("read", ValueError("坏值"))
+
+    data = json.loads(json.dumps(stats.snapshot(extra={"sound": {"channels": 4}})))
+    assert data["stages"]["read"]["count"] == 2
+    assert set(data["monitors"]) == {"快的", "慢的"}
+    assert data["counters"] == {"snapshot.hits": 3, "exceptions.read.ValueError": 1}
+
+    # 最慢的监控项排在前面
+    text = format_snapshot(data)
+    assert text.index("慢的") < text.index("快的")
+    assert "sound: channels=4" in text
+
+
+def test_monitor_count_is_capped(monkeypatch):
+    monkeypatch.setattr(stats_module, "MAX_MONITORS", 2)
+    stats = Stats()
+    for name in ("a", "b", "c"):
+        stats.record("read", 0.001, name)
+
+    data = stats.snapshot()
+    assert set(data["monitors"]) == {"a", "b"}
+    assert data["stages"]["read"]["count"] == 3
+
+
+def test_disabled_stats_record_nothing():
+    stats = Stats(enabled=False)
+    stats.incr("a")
+    stats.record("read", 0.1, "a")
+    data = stats.snapshot()
+    assert data["counters"] == {}
+    assert data["stages"] == {}
@@ -0,0 +1,85 @@
+# -*- coding: utf-8 -*-
+"""
+触发状态机测试 - 边沿触发、保持时间、冷却时间和回差
+"""
+
+from conditions import CompiledMonitor
+from trigger import Trigger, FIRED, RELEASED, IDLE, PENDING, ACTIVE
+
+
+def test_fires_once_on_rising_edge():
+    trigger = Trigger()
+    assert trigger.update(False, False, 0.0) is None
+    assert trigger.update(True, True, 1.0) == FIRED
+    assert trigger.update(True, True, 2.0) is None
+    assert trigger.state == ACTIVE
+
+    assert trigger.update(False, False, 3.0) == RELEASED
+    assert trigger.state == IDLE
+    assert trigger.update(True, True, 4.0) == FIRED
+
+
+def test_hold_time_filters_bounce():
+    trigger = Trigger(hold_time=2.0)
+    assert trigger.update(True, True, 0.0) is None
+    assert trigger.pending
+
+    # 中途不满足，保持时间重新计算
+    assert trigger.update(False, False, 1.0) is None
+    assert trigger.update(True, True, 1.5) is None
+    assert trigger.update(True, True, 3.0) is None
+    assert trigger.update(True, True, 3.5) == FIRED
+
+
+def test_cooldown_delays_refire():
+    trigger = Trigger(cooldown=10.0)
+    assert trigger.update(True, True, 0.0) == FIRED
+    assert trigger.update(False, False, 1.0) == RELEASED
+
+    assert trigger.update(True, True, 2.0) is None
+    assert trigger.state == PENDING
+    assert trigger.update(True, True, 10.0) == FIRED
+
+
+def test_release_uses_held_condition():
+    trigger = Trigger()
+    assert trigger.update(True, True, 0.0) == FIRED
+
+    # 触发条件不再满足，但回差内仍保持
+    assert trigger.update(False, True, 1.0) is None
+    assert trigger.state == ACTIVE
+    assert trigger.update(False, False, 2.0) == RELEASED
+
+
+def test_seen_and_forget():
+    trigger = Trigger()
+    assert not trigger.seen("1")
+    assert trigger.seen("1")
+    assert not trigger.seen("2")
+
+    trigger.forget()
+    assert not trigger.seen("2")
+
+
+def test_hysteresis_with_compiled_monitor():
+    monitor = CompiledMonitor({"condition": ">", "target_value": "100", "hysteresis": "5",
+                               "extract_mode": "提取数字"})
+    trigger = Trigger()
+
+    def step(value, now):
+        extracted, met = monitor.evaluate(value)
+        return trigger.update(met, monitor.hold(extracted), now)
+
+    assert step("温度 99", 0.0) is None
+    assert step("温度 101", 1.0) == FIRED
+    assert step("温度 98", 2.0) is None  # 仍高于 100 - 5
+    assert step("温度 95", 3.0) == RELEASED
+    assert step("温度 101", 4.0) == FIRED
+
+
+def test_hysteresis_on_less_than():
+    monitor = CompiledMonitor({"condition": "<", "target_value": "10", "hysteresis": 2})
+    assert monitor.check("9")
+    assert not monitor.check("11")
+    assert monitor.hold("11")
+    assert not monitor.hold("12")
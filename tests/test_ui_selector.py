@@ -0,0 +1,86 @@
+# -*- coding: utf-8 -*-
+"""
+元素选择器测试 - 用手动输入在模拟桌面上悬停和确认
+"""
+
+import time
+
+import pytest
+
+from ui_selector import UISelector, ManualPickerInput
+
+
+class _Overlay:
+    """记录高亮框位置"""
+
+    def __init__(self):
+        self.shown = []
+
+    def show(self, left, top, right, bottom):
+        self.shown.append((left, top, right, bottom))
+
+    def hide(self):
+        pass
+
+
+def _center(control):
+    rect = control._rect
+    return ((rect.left + rect.right) // 2, (rect.top + rect.bottom) // 2)
+
+
+def _wait(predicate, timeout=2.0):
+    deadline = time.monotonic() + timeout
+    while not predicate() and time.monotonic() < deadline:
+        time.sleep(0.01)
+    return predicate()
+
+
+@pytest.fixture
+def picker(desktop):
+    results = []
+    picker = UISelector(results.append, backend=desktop, input_source=ManualPickerInput(), overlay=_Overlay())
+    picker.results = results
+    yield picker
+    picker.stop()
+
+
+def test_hover_and_confirm_selects_leaf(picker, desktop):
+    leaf = desktop.leaves()[0]
+    picker.start()
+    assert _wait(lambda: picker.input_source._handler is not None)
+
+    x, y = _center(leaf)
+    picker.input_source.move(x, y)
+    assert _wait(lambda: picker.current_element is leaf)
+    assert picker.overlay.shown[-1] == (leaf._rect.left, leaf._rect.top, leaf._rect.right, leaf._rect.bottom)
+
+    picker.input_source.confirm(x, y)
+    assert _wait(lambda: picker.results)
+    info, = picker.results
+    assert info == picker._get_element_info(leaf)
+
+
+def test_moves_inside_leaf_reuse_hit_test(picker, desktop):
+    leaf = desktop.leaves()[0]
+    picker.start()
+    assert _wait(lambda: picker.input_source._handler is not None)
+
+    x, y = _center(leaf)
+    picker.input_source.move(x, y)
+    assert _wait(lambda: picker.current_element is leaf)
+    hit_tests = picker.hit_tests
+
+    # 在同一个叶子元素内移动不再命中测试
+    for dx in range(1, 4):
+        picker.input_source.move(x + dx, y)
+    assert _wait(lambda: picker.cache_hits >= 1)
+    assert picker.hit_tests == hit_tests
+    assert picker.current_element is leaf
+
+
+def test_cancel_returns_none(picker):
+    picker.start()
+    assert _wait(lambda: picker.input_source._handler is not None)
+    picker.input_source.cancel()
+    assert _wait(lambda: picker.results)
+    assert picker.results == [None]
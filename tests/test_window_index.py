@@ -0,0 +1,66 @@
+# -*- coding: utf-8 -*-
+"""
+顶层窗口索引测试 - 按轮重建、窗口事件和兜底重建
+"""
+
+from window_index import WindowIndex, EVENT_MAX_AGE
+
+
+def _process_ids(desktop):
+    return sorted({window._process_id for window in desktop.root._children})
+
+
+def test_polling_rebuilds_once_per_tick(desktop, clock, stats):
+    desktop.subscribe_window_events = lambda callback: None
+    index = WindowIndex(desktop, clock=clock, stats=stats)
+    assert not index.event_driven
+
+    for _ in range(3):
+        index.begin_tick()
+        for process_id in _process_ids(desktop):
+            assert len(index.windows_for(process_id)) == 1
+    assert index.refreshes == 3
+
+
+def test_window_events_invalidate_index(desktop, clock, stats):
+    index = WindowIndex(desktop, clock=clock, stats=stats)
+    assert index.event_driven
+    first, second = _process_ids(desktop)
+    assert len(index.windows()) == 2
+
+    # 没有事件时跨轮复用
+    for _ in range(10):
+        index.begin_tick()
+        clock.advance(1.0)
+        index.windows()
+    assert index.refreshes == 1
+
+    desktop.kill_process(first)
+    assert index.windows_for(first) == []
+    assert len(index.windows_for(second)) == 1
+    assert index.refreshes == 2
+
+
+def test_event_driven_index_has_long_safety_net(desktop, clock, stats):
+    index = WindowIndex(desktop, clock=clock, stats=stats)
+    index.windows()
+
+    clock.advance(EVENT_MAX_AGE - 1)
+    index.windows()
+    assert index.refreshes == 1
+
+    clock.advance(1)
+    index.windows()
+    assert index.refreshes == 2
+
+
+def test_enumeration_errors_are_counted(desktop, clock, stats):
+    desktop.subscribe_window_events = lambda callback: None
+    index = WindowIndex(desktop, clock=clock, stats=stats)
+
+    def fail():
+        raise OSError("桌面不可用")
+
+    desktop.get_root = fail
+    assert index.windows() == []
+    assert stats.counter("exceptions.window_index.OSError") == 1
@@ -0,0 +1,104 @@
+# -*- coding: utf-8 -*-
+"""
+读取线程池测试 - 同一进程的连续调用、超时隔离和线程补充
+"""
+
+import threading
+import time
+
+import pytest
+
+import worker_pool
+from worker_pool import WorkerPool, ProcessBusyError
+
+
+@pytest.fixture
+def pool(desktop):
+    pool = WorkerPool(desktop, max_workers=2, timeout=0.5)
+    yield pool
+    pool.shutdown()
+
+
+def test_imap_back_to_back_on_same_process(pool, monkeypatch):
+    # 报告最后一个结果后工作线程稍晚才释放进程，放大两次imap之间的竞争窗口
+    run_stream = worker_pool._run_stream
+
+    def slow_run_stream(batch, report):
+        run_stream(batch, report)
+        time.sleep(0.01)
+
+    monkeypatch.setattr(worker_pool, "_run_stream", slow_run_stream)
+
+    calls = [(100, lambda n: n * 2, (n,)) for n in range(3)]
+    for _ in range(20):
+        results = dict(pool.imap(calls))
+        assert results == {0: 0, 1: 2, 2: 4}
+    assert pool.rejected == 0
+
+
+def test_map_back_to_back_on_many_processes(pool):
+    calls = [(pid, lambda pid: pid, (pid,)) for pid in range(8)]
+    for _ in range(100):
+        assert pool.map(calls) == list(range(8))
+    assert pool.rejected == 0
+
+
+def test_call_errors_are_results(pool):
+    def fail():
+        raise ValueError("读取失败")
+
+    results = pool.map([(1, fail, ()), (2, lambda: "ok", ())])
+    assert isinstance(results[0], ValueError)
+    assert results[1] == "ok"
+
+
+def test_busy_process_is_rejected(pool):
+    release = threading.Event()
+    future = pool.submit(100, release.wait)
+
+    busy = pool.submit(100, lambda: None)
+    with pytest.raises(ProcessBusyError):
+        busy.result()
+    assert pool.rejected == 1
+
+    release.set()
+    future.result(1.0)
+
+
+def test_hung_process_does_not_block_others(pool):
+    release = threading.Event()
+    hung = [(pid, release.wait, ()) for pid in (1, 2, 3)]
+    healthy = [(pid, lambda pid: pid, (pid,)) for pid in (10, 11)]
+
+    start = time.monotonic()
+    results = pool.map(hung + healthy, timeout=0.2)
+    assert time.monotonic() - start < 2.0
+
+    assert all(isinstance(result, TimeoutError) for result in results[:3])
+    assert results[3:] == [10, 11]
+    assert pool.stats()["stalled_processes"] == 3
+
+    # 挂起的进程仍被占用，其他进程继续可用
+    assert pool.map(healthy) == [10, 11]
+    assert isinstance(pool.map(hung[:1])[0], ProcessBusyError)
+
+    # 挂起的调用返回后，补充的线程退出
+    release.set()
+    deadline = time.monotonic() + 2.0
+    while pool.stats()["workers"] > pool.max_workers and time.monotonic() < deadline:
+        time.sleep(0.01)
+    stats = pool.stats()
+    assert stats["stalled_processes"] == 0
+    assert stats["workers"] <= pool.max_workers
+    assert pool.map(hung[:1]) == [True]
+
+
+def test_queued_calls_do_not_time_out(desktop):
+    pool = WorkerPool(desktop, max_workers=1, timeout=0.2)
+    try:
+        calls = [(pid, time.sleep, (0.1,)) for pid in range(5)]
+        results = pool.map(calls)
+        assert results == [None] * 5
+        assert pool.timeouts == 0
+    finally:
+        pool.shutdown()
@@ -0,0 +1,81 @@
+# -*- coding: utf-8 -*-
+"""
+触发状态机 - 只在条件由不满足变为满足时报警，支持回差、保持时间和冷却时间
+"""
+
+
+# 状态
+IDLE = 0  # 条件不满足
+PENDING = 1  # 条件满足，等待保持时间或冷却时间结束
+ACTIVE = 2  # 已报警，条件（含回差）仍然满足
+
+# update() 的结果
+FIRED = "fired"
+RELEASED = "released"
+
+_UNSET = object()
+
+
+class Trigger:
+    """单个监控项的触发状态"""
+
+    __slots__ = ("hold_time", "cooldown", "state", "since", "last_fired", "last_value")
+
+    def __init__(self, hold_time=0.0, cooldown=0.0):
+        """
+        hold_time: 条件需要持续满足的时间（秒）才报警，用于过滤抖动
+        cooldown: 两次报警之间的最短间隔（秒）
+        """
+        self.hold_time = hold_time
+        self.cooldown = cooldown
+        self.state = IDLE
+        self.since = 0.0  # 进入PENDING的时间
+        self.last_fired = None
+        self.last_value = _UNSET  # 上次处理的值，用于跳过没有变化的值
+
+    @property
+    def pending(self):
+        """条件已满足但还没有报警（值不变时也需要继续检查）"""
+        return self.state == PENDING
+
+    def seen(self, value):
+        """记录本次处理的值，返回值是否与上次相同"""
+        if self.last_value is not _UNSET and self.last_value == value:
+            return True
+        self.last_value = value
+        return False
+
+    def forget(self):
+        """忘记上次的值（读取失败后下次必须重新检查）"""
+        self.last_value = _UNSET
+
+    def update(self, met, held, now):
+        """
+        根据本次检查的结果推进状态
+        met: 触发条件是否满足
+        held: 放宽回差后的条件是否满足（已报警时用它判断是否解除）
+        now: 当前时间（秒）
+        返回 FIRED（需要报警）、RELEASED（报警解除）或None（状态对外没有变化）
+        """
+        if self.state == ACTIVE:
+            if held:
+                return None
+            self.state = IDLE
+            return RELEASED
+
+        if not met:
+            self.state = IDLE
+            return None
+
+        if self.state == IDLE:
+            self.state = PENDING
+            self.since = now
+
+        if now - self.since < self.hold_time:
+            return None
+        if self.last_fired is not None and now - self.last_fired < self.cooldown:
+            return None
+
+        self.state = ACTIVE
+        self.last_fired = now
+        return FIRED
@@ -0,0 +1,555 @@
+# -*- coding: utf-8 -*-
+"""
+UI自动化后端 - 隔离对 uiautomation 的直接调用，便于替换为模拟桌面
+"""
+
+import ctypes
+import os
+import queue
+import sys
+import threading
+
+
+class UIBackend:
+    """
+    UI自动化后端接口
+    返回的元素对象需提供与 uiautomation.Control 相同的属性和方法：
+    Name, AutomationId, ClassName, ControlTypeName, ProcessId, BoundingRectangle,
+    GetChildren(), GetParentControl(), GetRuntimeId(), GetValuePattern() 等
+    """
+
+    name = ""
+
+    def init_thread(self):
+        """在线程中初始化（如COM），每个访问UI的线程都需要调用"""
+        pass
+
+    def uninit_thread(self):
+        """线程退出前的清理"""
+        pass
+
+    def get_root(self):
+        """获取桌面根元素"""
+        raise NotImplementedError
+
+    def find_control(self, parent=None, automation_id="", class_name="", control_type="", name=""):
+        """
+        在parent的子树中查找第一个匹配的元素，parent为None时从桌面开始
+        找不到时返回None
+        """
+        raise NotImplementedError
+
+    def find_child(self, parent, automation_id="", class_name="", control_type="", name=""):
+        """
+        在parent的直接子元素中查找第一个匹配所有非空属性的元素
+        支持原生条件搜索的后端只需一次跨进程调用
+        """
+        for child, child_automation_id, child_class_name, child_control_type, child_name in self.get_children_info(parent):
+            if ((not automation_id or child_automation_id == automation_id) and
+                    (not class_name or child_class_name == class_name) and
+                    (not control_type or child_control_type == control_type) and
+                    (not name or child_name == name)):
+                return child
+        return None
+
+    def get_children_info(self, parent):
+        """
+        获取parent的子元素及其定位属性
+        返回 [(元素, automation_id, class_name, control_type, name)]
+        支持缓存请求的后端只需一次跨进程调用
+        """
+        result = []
+        for child in parent.GetChildren():
+            try:
+                result.append((child, child.AutomationId, child.ClassName, child.ControlTypeName, child.Name))
+            except:
+                continue
+        return result
+
+    def get_subtree_values(self, element):
+        """
+        一次取回element子树（含自身）中所有元素的值相关属性
+        返回 {tuple(runtime_id): {"value": ..., "range": ..., "toggle": ..., "name": ...}}，
+        字段分别对应 ValuePattern、RangeValuePattern、TogglePattern 和 Name，元素不支持的字段缺省
+        后端不支持批量读取时返回None
+        """
+        return None
+
+    def control_from_point(self, x, y):
+        """获取屏幕坐标处的元素"""
+        raise NotImplementedError
+
+    def get_cursor_pos(self):
+        """获取鼠标位置 (x, y)"""
+        raise NotImplementedError
+
+    def subscribe_changes(self, element, callback):
+        """
+        订阅元素的值变化事件（属性变化和文本变化），事件发生时调用 callback()
+        callback 可能在后端的事件线程中被调用
+        返回订阅句柄，后端或元素不支持事件时返回None
+        """
+        return None
+
+    def unsubscribe(self, handle):
+        """取消 subscribe_changes 返回的订阅"""
+        pass
+
+    def subscribe_window_events(self, callback):
+        """
+        订阅顶层窗口的打开和关闭事件，事件发生时调用 callback()
+        返回订阅句柄，不支持时返回None
+        """
+        return None
+
+    def is_alive(self, element, runtime_id=None):
+        """轻量校验元素是否仍然有效（一次跨进程调用）"""
+        try:
+            current_id = element.GetRuntimeId()
+        except:
+            return False
+
+        if runtime_id:
+            return list(current_id or []) == list(runtime_id)
+        return bool(current_id)
+
+    def process_exists(self, process_id):
+        """检查进程是否仍在运行"""
+        if not process_id:
+            return True
+
+        if sys.platform == "win32":
+            SYNCHRONIZE = 0x00100000
+            PROCESS_QUERY_LIMITED_INFORMATION = 0x1000
+            WAIT_TIMEOUT = 0x102
+            ERROR_ACCESS_DENIED = 5
+
+            kernel32 = ctypes.windll.kernel32
+            handle = kernel32.OpenProcess(SYNCHRONIZE | PROCESS_QUERY_LIMITED_INFORMATION, False, process_id)
+            if not handle:
+                # 权限不足说明进程存在（如以管理员身份运行的目标程序）
+                return kernel32.GetLastError() == ERROR_ACCESS_DENIED
+            try:
+                return kernel32.WaitForSingleObject(handle, 0) == WAIT_TIMEOUT
+            finally:
+                kernel32.CloseHandle(handle)
+
+        try:
+            os.kill(process_id, 0)
+        except ProcessLookupError:
+            return False
+        except PermissionError:
+            return True
+        return True
+
+
+# UIA 常量
+UIA_RuntimeIdPropertyId = 30000
+UIA_ControlTypePropertyId = 30003
+UIA_NamePropertyId = 30005
+UIA_AutomationIdPropertyId = 30011
+UIA_ClassNamePropertyId = 30012
+UIA_ProcessIdPropertyId = 30002
+UIA_IsRangeValuePatternAvailablePropertyId = 30033
+UIA_IsValuePatternAvailablePropertyId = 30043
+UIA_IsTogglePatternAvailablePropertyId = 30041
+UIA_ValueValuePropertyId = 30045
+UIA_RangeValueValuePropertyId = 30047
+UIA_ToggleToggleStatePropertyId = 30086
+UIA_Text_TextChangedEventId = 20015
+UIA_Window_WindowOpenedEventId = 20016
+UIA_Window_WindowClosedEventId = 20017
+TreeScope_Element = 0x1
+TreeScope_Children = 0x2
+TreeScope_Descendants = 0x4
+TreeScope_Subtree = 0x7
+
+# 定位时随搜索结果一并取回的属性
+LOCATOR_PROPERTY_IDS = [
+    UIA_RuntimeIdPropertyId,
+    UIA_ProcessIdPropertyId,
+    UIA_AutomationIdPropertyId,
+    UIA_ClassNamePropertyId,
+    UIA_ControlTypePropertyId,
+    UIA_NamePropertyId,
+]
+
+# 批量快照时取回的属性
+SNAPSHOT_PROPERTY_IDS = [
+    UIA_RuntimeIdPropertyId,
+    UIA_NamePropertyId,
+    UIA_IsValuePatternAvailablePropertyId,
+    UIA_ValueValuePropertyId,
+    UIA_IsRangeValuePatternAvailablePropertyId,
+    UIA_RangeValueValuePropertyId,
+    UIA_IsTogglePatternAvailablePropertyId,
+    UIA_ToggleToggleStatePropertyId,
+]
+
+# 订阅的属性：值可能出现在这些属性中
+VALUE_PROPERTY_IDS = [
+    UIA_ValueValuePropertyId,
+    UIA_NamePropertyId,
+    UIA_RangeValueValuePropertyId,
+    UIA_ToggleToggleStatePropertyId,
+]
+
+
+class _UIAEventThread:
+    """
+    UIA事件注册线程
+    事件处理器在MTA线程中注册，UIA可直接在其内部线程回调，无需消息循环
+    """
+
+    def __init__(self):
+        self._tasks = queue.Queue()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+
+    def call(self, func, timeout=5.0):
+        """在事件线程中执行func并返回结果"""
+        done = threading.Event()
+        result = {}
+
+        def task():
+            try:
+                result["value"] = func()
+            except Exception as e:
+                result["error"] = e
+            finally:
+                done.set()
+
+        self._tasks.put(task)
+        if not done.wait(timeout):
+            raise TimeoutError("UIA事件注册超时")
+        if "error" in result:
+            raise result["error"]
+        return result.get("value")
+
+    def _run(self):
+        COINIT_MULTITHREADED = 0x0
+        ctypes.windll.ole32.CoInitializeEx(None, COINIT_MULTITHREADED)
+        try:
+            while True:
+                self._tasks.get()()
+        finally:
+            ctypes.windll.ole32.CoUninitialize()
+
+
+class UIAutomationBackend(UIBackend):
+    """基于 uiautomation 的Windows后端"""
+
+    name = "uiautomation"
+
+    def __init__(self):
+        # uiautomation（及comtypes）导入较慢，推迟到第一次真正使用时
+        self._auto_module = None
+        self._import_lock = threading.Lock()
+        self._event_thread = None
+        self._handler_classes = None
+        self._event_lock = threading.Lock()
+        self._local = threading.local()  # 每个线程的缓存请求
+
+    @property
+    def _auto(self):
+        auto = self._auto_module
+        if auto is None:
+            with self._import_lock:
+                if self._auto_module is None:
+                    import uiautomation
+                    self._auto_module = uiautomation
+                auto = self._auto_module
+        return auto
+
+    def init_thread(self):
+        ctypes.windll.ole32.CoInitialize(None)
+
+    def uninit_thread(self):
+        ctypes.windll.ole32.CoUninitialize()
+
+    def get_root(self):
+        return self._auto.GetRootControl()
+
+    def find_control(self, parent=None, automation_id="", class_name="", control_type="", name=""):
+        condition = self._create_condition(automation_id, class_name, control_type, name)
+        if condition is None:
+            return None
+
+        # 原生条件在目标进程内匹配整棵子树，只需一次调用
+        return self._find_first(parent, TreeScope_Descendants, condition)
+
+    def find_child(self, parent, automation_id="", class_name="", control_type="", name=""):
+        condition = self._create_condition(automation_id, class_name, control_type, name)
+        if condition is None:
+            condition = self._uia().CreateTrueCondition()
+        return self._find_first(parent, TreeScope_Children, condition)
+
+    def get_children_info(self, parent):
+        uia = self._uia()
+        elements = self._raw(parent).FindAllBuildCache(TreeScope_Children, uia.CreateTrueCondition(),
+                                                       self._cache_request())
+        if not elements:
+            return []
+
+        result = []
+        for i in range(elements.Length):
+            element = elements.GetElement(i)
+            try:
+                result.append((
+                    self._auto.Control.CreateControlFromElement(element),
+                    element.CachedAutomationId or "",
+                    element.CachedClassName or "",
+                    self._auto.ControlTypeNames.get(element.CachedControlType, ""),
+                    element.CachedName or "",
+                ))
+            except:
+                continue
+        return result
+
+    def get_subtree_values(self, element):
+        uia = self._uia()
+        elements = self._raw(element).FindAllBuildCache(TreeScope_Subtree, uia.CreateTrueCondition(),
+                                                        self._snapshot_request())
+        if not elements:
+            return {}
+
+        result = {}
+        for i in range(elements.Length):
+            cached = elements.GetElement(i)
+            try:
+                runtime_id = cached.GetCachedPropertyValue(UIA_RuntimeIdPropertyId)
+                if not runtime_id:
+                    continue
+
+                fields = {"name": cached.CachedName or ""}
+                if cached.GetCachedPropertyValue(UIA_IsValuePatternAvailablePropertyId):
+                    fields["value"] = cached.GetCachedPropertyValue(UIA_ValueValuePropertyId) or ""
+                if cached.GetCachedPropertyValue(UIA_IsRangeValuePatternAvailablePropertyId):
+                    fields["range"] = str(cached.GetCachedPropertyValue(UIA_RangeValueValuePropertyId))
+                if cached.GetCachedPropertyValue(UIA_IsTogglePatternAvailablePropertyId):
+                    fields["toggle"] = str(cached.GetCachedPropertyValue(UIA_ToggleToggleStatePropertyId))
+
+                result[tuple(runtime_id)] = fields
+            except:
+                continue
+        return result
+
+    def _uia(self):
+        return self._auto._AutomationClient.instance().IUIAutomation
+
+    def _raw(self, parent):
+        """获取底层的 IUIAutomationElement，parent为None时为桌面"""
+        if parent is None:
+            return self._uia().GetRootElement()
+        return parent.Element
+
+    def _cache_request(self):
+        """随搜索结果一并取回定位属性的缓存请求（COM对象不跨线程共享）"""
+        cache_request = getattr(self._local, "cache_request", None)
+        if cache_request is None:
+            cache_request = self._uia().CreateCacheRequest()
+            for property_id in LOCATOR_PROPERTY_IDS:
+                cache_request.AddProperty(property_id)
+            self._local.cache_request = cache_request
+        return cache_request
+
+    def _snapshot_request(self):
+        """批量快照的缓存请求（COM对象不跨线程共享）"""
+        snapshot_request = getattr(self._local, "snapshot_request", None)
+        if snapshot_request is None:
+            snapshot_request = self._uia().CreateCacheRequest()
+            for property_id in SNAPSHOT_PROPERTY_IDS:
+                snapshot_request.AddProperty(property_id)
+            self._local.snapshot_request = snapshot_request
+        return snapshot_request
+
+    def _create_condition(self, automation_id, class_name, control_type, name):
+        """构建原生属性条件，没有任何属性时返回None"""
+        uia = self._uia()
+        conditions = []
+
+        if automation_id:
+            conditions.append(uia.CreatePropertyCondition(UIA_AutomationIdPropertyId, automation_id))
+
+        if control_type:
+            control_type_id = getattr(self._auto.ControlType, control_type, None)
+            if control_type_id is not None:
+                conditions.append(uia.CreatePropertyCondition(UIA_ControlTypePropertyId, control_type_id))
+
+        if class_name:
+            conditions.append(uia.CreatePropertyCondition(UIA_ClassNamePropertyId, class_name))
+
+        if name:
+            conditions.append(uia.CreatePropertyCondition(UIA_NamePropertyId, name))
+
+        if not conditions:
+            return None
+
+        condition = conditions[0]
+        for other in conditions[1:]:
+            condition = uia.CreateAndCondition(condition, other)
+        return condition
+
+    def _find_first(self, parent, scope, condition):
+        element = self._raw(parent).FindFirstBuildCache(scope, condition, self._cache_request())
+        if not element:
+            return None
+        return self._auto.Control.CreateControlFromElement(element)
+
+    def control_from_point(self, x, y):
+        return self._auto.ControlFromPoint(x, y)
+
+    def get_cursor_pos(self):
+        return self._auto.GetCursorPos()
+
+    def subscribe_changes(self, element, callback):
+        try:
+            with self._event_lock:
+                if self._event_thread is None:
+                    self._event_thread = _UIAEventThread()
+            return self._event_thread.call(lambda: self._add_handlers(element, callback))
+        except Exception as e:
+            print(f"UIA事件订阅失败: {e}")
+            return None
+
+    def unsubscribe(self, handle):
+        if handle is None or self._event_thread is None:
+            return
+        try:
+            self._event_thread.call(lambda: self._remove_handlers(handle))
+        except Exception as e:
+            print(f"UIA事件取消订阅失败: {e}")
+
+    def subscribe_window_events(self, callback):
+        try:
+            with self._event_lock:
+                if self._event_thread is None:
+                    self._event_thread = _UIAEventThread()
+            return self._event_thread.call(lambda: self._add_window_handlers(callback))
+        except Exception as e:
+            print(f"UIA窗口事件订阅失败: {e}")
+            return None
+
+    def _add_window_handlers(self, callback):
+        """在桌面上注册窗口打开和关闭事件"""
+        _, AutomationEventHandler = self._get_handler_classes()
+        uia = self._auto._AutomationClient.instance().IUIAutomation
+        root = uia.GetRootElement()
+
+        handlers = []
+        for event_id in (UIA_Window_WindowOpenedEventId, UIA_Window_WindowClosedEventId):
+            handler = AutomationEventHandler(callback)
+            uia.AddAutomationEventHandler(event_id, root, TreeScope_Subtree, None, handler)
+            handlers.append(handler)
+
+        return (root, handlers)
+
+    def _get_handler_classes(self):
+        """创建COM事件处理器类（依赖运行时生成的UIAutomationCore模块）"""
+        if self._handler_classes is None:
+            from comtypes import COMObject
+
+            core = self._auto._AutomationClient.instance().UIAutomationCore
+
+            class PropertyChangedHandler(COMObject):
+                _com_interfaces_ = [core.IUIAutomationPropertyChangedEventHandler]
+
+                def __init__(self, callback):
+                    super().__init__()
+                    self._callback = callback
+
+                def HandlePropertyChangedEvent(self, sender, propertyId, newValue):
+                    try:
+                        self._callback()
+                    except:
+                        pass
+                    return 0
+
+            class AutomationEventHandler(COMObject):
+                _com_interfaces_ = [core.IUIAutomationEventHandler]
+
+                def __init__(self, callback):
+                    super().__init__()
+                    self._callback = callback
+
+                def HandleAutomationEvent(self, sender, eventId):
+                    try:
+                        self._callback()
+                    except:
+                        pass
+                    return 0
+
+            self._handler_classes = (PropertyChangedHandler, AutomationEventHandler)
+
+        return self._handler_classes
+
+    def _add_handlers(self, element, callback):
+        """注册属性变化和文本变化事件，返回订阅句柄"""
+        PropertyChangedHandler, AutomationEventHandler = self._get_handler_classes()
+        uia = self._auto._AutomationClient.instance().IUIAutomation
+        raw = element.Element
+
+        property_handler = PropertyChangedHandler(callback)
+        uia.AddPropertyChangedEventHandler(raw, TreeScope_Element, None, property_handler, VALUE_PROPERTY_IDS)
+
+        # 不是所有控件都支持文本事件，失败时只保留属性事件
+        text_handler = AutomationEventHandler(callback)
+        try:
+            uia.AddAutomationEventHandler(UIA_Text_TextChangedEventId, raw, TreeScope_Element, None, text_handler)
+        except:
+            text_handler = None
+
+        return (raw, property_handler, text_handler)
+
+    def _remove_handlers(self, handle):
+        uia = self._auto._AutomationClient.instance().IUIAutomation
+        raw, property_handler, text_handler = handle
+
+        try:
+            uia.RemovePropertyChangedEventHandler(raw, property_handler)
+        except:
+            pass
+
+        if text_handler is not None:
+            try:
+                uia.RemoveAutomationEventHandler(UIA_Text_TextChangedEventId, raw, text_handler)
+            except:
+                pass
+
+_default_backend = None
+_default_backend_lock = threading.Lock()
+
+
+def create_backend(name=None):
+    """
+    按名称创建后端
+    name: "uiautomation" 或 "sim"，为None时读取环境变量 UILISTEN_BACKEND
+    """
+    name = name or os.environ.get("UILISTEN_BACKEND", "") or UIAutomationBackend.name
+
+    if name == UIAutomationBackend.name:
+        return UIAutomationBackend()
+
+    if name == "sim":
+        from sim_desktop import SimulatedDesktop
+        return SimulatedDesktop()
+
+    raise ValueError(f"未知的UI后端: {name}")
+
+
+def get_backend():
+    """获取进程内共享的默认后端"""
+    global _default_backend
+
+    with _default_backend_lock:
+        if _default_backend is None:
+            _default_backend = create_backend()
+        return _default_backend
+
+
+def set_backend(backend):
+    """替换默认后端（如在测试或基准中使用模拟桌面）"""
+    global _default_backend
+
+    with _default_backend_lock:
+        _default_backend = backend
@@ -3,20 +3,204 @@
 UI元素选择器 - 使用鼠标选择桌面UI元素
 """
 
-import uiautomation as auto
+import queue
 import threading
 import time
 import ctypes
-from ctypes import wintypes
+from collections import OrderedDict
+from overlay import get_overlay
+from ui_backend import get_backend
+
+
+# 命中测试结果的有效期（秒），过期后即使鼠标还在同一位置也重新测试
+HIT_CACHE_TTL = 1.0
+
+# 记住的命中测试位置数
+HIT_CACHE_SIZE = 256
+
+# 没有输入钩子时轮询鼠标和按键的间隔（秒）
+POLL_INTERVAL = 0.05
+
+# 输入事件
+MOVE = "move"
+CONFIRM = "confirm"
+CANCEL = "cancel"
+_STOP = "stop"
+
+
+class PynputPickerInput:
+    """基于 pynput 钩子的选择输入：鼠标移动、Ctrl+左键确认、ESC取消，没有输入时不占用CPU"""
+
+    def __init__(self):
+        self._mouse_listener = None
+        self._keyboard_listener = None
+        self._ctrl_keys = set()
+
+    def start(self, handler):
+        """启动钩子，输入事件发生时在钩子线程中调用 handler(事件, x, y)"""
+        from pynput import keyboard, mouse
+
+        ctrl_keys = {keyboard.Key.ctrl, keyboard.Key.ctrl_l, keyboard.Key.ctrl_r}
+
+        def on_press(key):
+            if key in ctrl_keys:
+                self._ctrl_keys.add(key)
+            elif key == keyboard.Key.esc:
+                handler(CANCEL, 0, 0)
+
+        def on_release(key):
+            self._ctrl_keys.discard(key)
+
+        def on_click(x, y, button, pressed):
+            if pressed and button == mouse.Button.left and self._ctrl_keys:
+                handler(CONFIRM, int(x), int(y))
+
+        self._keyboard_listener = keyboard.Listener(on_press=on_press, on_release=on_release)
+        self._mouse_listener = mouse.Listener(on_move=lambda x, y: handler(MOVE, int(x), int(y)), on_click=on_click)
+        self._keyboard_listener.daemon = True
+        self._mouse_listener.daemon = True
+        self._keyboard_listener.start()
+        self._mouse_listener.start()
+
+    def stop(self):
+        for listener in (self._mouse_listener, self._keyboard_listener):
+            if listener is not None:
+                listener.stop()
+        self._mouse_listener = None
+        self._keyboard_listener = None
+        self._ctrl_keys.clear()
+
+
+class PollingPickerInput:
+    """没有 pynput 时的选择输入：轮询鼠标位置和按键状态，只在位置变化时产生移动事件"""
+
+    VK_CONTROL = 0x11
+    VK_LBUTTON = 0x01
+    VK_ESCAPE = 0x1B
+
+    def __init__(self, backend, interval=POLL_INTERVAL):
+        self.backend = backend
+        self.interval = interval
+        self._stopped = threading.Event()
+        self._thread = None
+
+    def start(self, handler):
+        self._stopped.clear()
+        self._thread = threading.Thread(target=self._poll, args=(handler,), daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stopped.set()
+
+    def _poll(self, handler):
+        user32 = ctypes.windll.user32
+        last_point = None
+        confirm_was_pressed = False
+
+        while not self._stopped.wait(self.interval):
+            try:
+                if user32.GetAsyncKeyState(self.VK_ESCAPE) & 0x8000:
+                    handler(CANCEL, 0, 0)
+                    return
+
+                x, y = self.backend.get_cursor_pos()
+                if (x, y) != last_point:
+                    last_point = (x, y)
+                    handler(MOVE, x, y)
+
+                confirm_pressed = bool(user32.GetAsyncKeyState(self.VK_CONTROL) & 0x8000 and
+                                       user32.GetAsyncKeyState(self.VK_LBUTTON) & 0x8000)
+                if confirm_pressed and not confirm_was_pressed:
+                    handler(CONFIRM, x, y)
+                confirm_was_pressed = confirm_pressed
+            except Exception as e:
+                print(f"读取鼠标状态失败: {e}")
+
+
+class ManualPickerInput:
+    """手动驱动的选择输入，用于测试和模拟桌面"""
+
+    def __init__(self):
+        self._handler = None
+
+    def start(self, handler):
+        self._handler = handler
+
+    def stop(self):
+        self._handler = None
+
+    def move(self, x, y):
+        if self._handler is not None:
+            self._handler(MOVE, x, y)
+
+    def confirm(self, x, y):
+        if self._handler is not None:
+            self._handler(CONFIRM, x, y)
+
+    def cancel(self):
+        if self._handler is not None:
+            self._handler(CANCEL, 0, 0)
+
+
+class _HitCache:
+    """
+    记住命中测试的结果：同一位置直接复用；
+    鼠标在上次命中的叶子元素范围内移动时，命中的仍是这个元素，也无需重新测试
+    """
+
+    def __init__(self, ttl=HIT_CACHE_TTL, max_size=HIT_CACHE_SIZE, clock=time.monotonic):
+        self.ttl = ttl
+        self.max_size = max_size
+        self.clock = clock
+        self._points = OrderedDict()  # (x, y) -> (元素, 矩形, 时间)
+        self._leaf = None  # (元素, 矩形, 时间)
+
+    def get(self, x, y):
+        """返回 (元素, 矩形)，没有记住或已过期时返回None"""
+        now = self.clock()
+
+        if self._leaf is not None:
+            element, rect, created = self._leaf
+            if now - created < self.ttl and rect[0] <= x < rect[2] and rect[1] <= y < rect[3]:
+                return element, rect
+
+        cached = self._points.get((x, y))
+        if cached is not None:
+            element, rect, created = cached
+            if now - created < self.ttl:
+                self._points.move_to_end((x, y))
+                return element, rect
+            del self._points[(x, y)]
+
+        return None
+
+    def put(self, x, y, element, rect, leaf=False):
+        now = self.clock()
+        self._points[(x, y)] = (element, rect, now)
+        self._points.move_to_end((x, y))
+        while len(self._points) > self.max_size:
+            self._points.popitem(last=False)
+
+        self._leaf = (element, rect, now) if leaf and rect is not None else None
+
+    def clear(self):
+        self._points.clear()
+        self._leaf = None
 
 
 class UISelector:
-    def __init__(self, callback):
+    def __init__(self, callback, backend=None, input_source=None, overlay=None):
         """
         初始化UI选择器
         callback: 选择完成后的回调函数，参数为元素信息字典或None（取消）
+        backend: UI自动化后端，默认使用 ui_backend.get_backend()
+        input_source: 选择输入（start(handler)、stop()），默认使用 pynput 钩子，不可用时轮询
+        overlay: 高亮框（show(left, top, right, bottom)、hide()），默认使用共享的 HighlightOverlay
         """
         self.callback = callback
+        self.backend = backend or get_backend()
+        self.input_source = input_source
+        self.overlay = overlay if overlay is not None else get_overlay()
         self.running = False
         self.current_element = None
         self.select_thread = None
@@ -24,6 +208,14 @@ class UISelector:
         # 上一次高亮的矩形
         self.last_rect = None
 
+        # 钩子线程只把输入事件放入队列，由选择线程处理
+        self._events = queue.Queue()
+        self._hit_cache = _HitCache()
+
+        # 统计
+        self.hit_tests = 0
+        self.cache_hits = 0
+
     def start(self):
         """开始选择模式"""
         self.running = True
@@ -35,63 +227,107 @@ class UISelector:
     def stop(self):
         """停止选择模式"""
         self.running = False
+        self._events.put((_STOP, 0, 0))
+
+        if self.input_source is not None:
+            try:
+                self.input_source.stop()
+            except Exception as e:
+                print(f"停止输入监听失败: {e}")
+
         # 清除高亮
         self._clear_highlight()
 
     def _selection_loop(self):
         """选择循环 - 跟踪鼠标下的元素"""
         # 在线程中初始化COM
-        ctypes.windll.ole32.CoInitialize(None)
+        self.backend.init_thread()
 
         try:
             self._do_selection_loop()
         finally:
-            ctypes.windll.ole32.CoUninitialize()
+            self.backend.uninit_thread()
 
-    def _do_selection_loop(self):
-        """实际的选择循环"""
-        # 获取按键状态的常量
-        VK_CONTROL = 0x11
-        VK_LBUTTON = 0x01
-        VK_ESCAPE = 0x1B
+    def _start_input(self):
+        """启动选择输入，pynput 不可用时改为轮询"""
+        if self.input_source is None:
+            self.input_source = PynputPickerInput()
+            try:
+                self.input_source.start(self._on_input)
+                return
+            except Exception as e:
+                print(f"输入钩子启动失败，改为轮询: {e}")
+                self.input_source = PollingPickerInput(self.backend)
 
-        user32 = ctypes.windll.user32
+        self.input_source.start(self._on_input)
+
+    def _on_input(self, event, x, y):
+        """输入事件的回调（在钩子线程中调用），只入队，不做跨进程调用"""
+        self._events.put((event, x, y))
 
-        ctrl_was_pressed = False
+    def _do_selection_loop(self):
+        """实际的选择循环：阻塞等待输入事件，积压的移动只处理最后一个"""
+        self._start_input()
+
+        # 先高亮当前鼠标下的元素
+        try:
+            self._hover(*self.backend.get_cursor_pos())
+        except Exception as e:
+            print(f"获取鼠标位置失败: {e}")
 
         while self.running:
+            events = [self._events.get()]
             try:
-                # 检查ESC键 - 取消选择
-                if user32.GetAsyncKeyState(VK_ESCAPE) & 0x8000:
-                    self._cancel_selection()
-                    break
+                while True:
+                    events.append(self._events.get_nowait())
+            except queue.Empty:
+                pass
 
-                # 检查Ctrl+左键点击 - 确认选择
-                ctrl_pressed = user32.GetAsyncKeyState(VK_CONTROL) & 0x8000
-                lbutton_pressed = user32.GetAsyncKeyState(VK_LBUTTON) & 0x8000
+            point = None
+            for event, x, y in events:
+                if event == MOVE:
+                    point = (x, y)
+                    continue
 
-                if ctrl_pressed and lbutton_pressed and not ctrl_was_pressed:
-                    # Ctrl+点击，确认选择
+                if event == CONFIRM:
+                    # 以点击位置为准
+                    self._hover(x, y)
                     self._confirm_selection()
-                    break
-
-                ctrl_was_pressed = ctrl_pressed and lbutton_pressed
-
-                # 获取鼠标位置
-                point = auto.GetCursorPos()
-
-                # 获取鼠标下的元素
-                element = auto.ControlFromPoint(point[0], point[1])
+                elif event == CANCEL:
+                    self._cancel_selection()
+                return
 
-                if element:
-                    self.current_element = element
-                    # 显示高亮框
-                    self._show_highlight(element)
+            if point is not None:
+                self._hover(*point)
 
+    def _hover(self, x, y):
+        """高亮 (x, y) 处的元素：只在位置变化时命中测试，同一位置或同一叶子元素内复用结果"""
+        cached = self._hit_cache.get(x, y)
+        if cached is not None:
+            self.cache_hits += 1
+            element, rect = cached
+        else:
+            try:
+                self.hit_tests += 1
+                element = self.backend.control_from_point(x, y)
+                rect = self._element_rect(element) if element else None
+                leaf = rect is not None and self.backend.find_child(element) is None
+                self._hit_cache.put(x, y, element, rect, leaf)
             except Exception as e:
-                pass
+                print(f"获取鼠标下的元素失败: {e}")
+                return
 
-            time.sleep(0.05)
+        if element:
+            self.current_element = element
+            # 显示高亮框
+            self._show_highlight(rect)
+
+    def _element_rect(self, element):
+        """元素的矩形 (left, top, right, bottom)，无效时返回None"""
+        rect = element.BoundingRectangle
+        if rect.width() > 0 and rect.height() > 0:
+            return (rect.left, rect.top, rect.right, rect.bottom)
+        return None
 
     def _confirm_selection(self):
         """确认选择"""
@@ -268,53 +504,17 @@ class UISelector:
 
         return locator
 
-    def _show_highlight(self, element):
-        """显示高亮框"""
-        try:
-            rect = element.BoundingRectangle
-            if rect.width() > 0 and rect.height() > 0:
-                new_rect = (rect.left, rect.top, rect.right, rect.bottom)
-
-                # 只有矩形变化时才重绘
-                if new_rect != self.last_rect:
-                    self._clear_highlight()
-                    self._draw_highlight_rect(*new_rect)
-                    self.last_rect = new_rect
-        except:
-            pass
-
-    def _draw_highlight_rect(self, left, top, right, bottom):
-        """绘制高亮矩形"""
-        try:
-            user32 = ctypes.windll.user32
-            gdi32 = ctypes.windll.gdi32
-
-            hdc = user32.GetDC(0)
+    def _show_highlight(self, rect):
+        """显示高亮框，rect 为 (left, top, right, bottom)"""
+        # 只有矩形变化时才移动
+        if rect is None or rect == self.last_rect:
+            return
 
-            # 红色画笔，3像素宽
-            pen = gdi32.CreatePen(0, 3, 0x0000FF)
-            old_pen = gdi32.SelectObject(hdc, pen)
-            old_brush = gdi32.SelectObject(hdc, gdi32.GetStockObject(5))
-
-            gdi32.Rectangle(hdc, left, top, right, bottom)
-
-            gdi32.SelectObject(hdc, old_pen)
-            gdi32.SelectObject(hdc, old_brush)
-            gdi32.DeleteObject(pen)
-
-            user32.ReleaseDC(0, hdc)
-        except:
-            pass
+        self.overlay.show(*rect)
+        self.last_rect = rect
 
     def _clear_highlight(self):
-        """清除高亮框"""
-        try:
-            if self.last_rect:
-                # 只刷新上次高亮的区域
-                left, top, right, bottom = self.last_rect
-                # 扩大一点范围确保完全清除
-                rect = (ctypes.c_long * 4)(left - 5, top - 5, right + 5, bottom + 5)
-                ctypes.windll.user32.InvalidateRect(0, rect, True)
-                self.last_rect = None
-        except:
-            pass
+        """隐藏高亮框（覆盖层窗口保留，下次选择时直接复用）"""
+        if self.last_rect:
+            self.overlay.hide()
+            self.last_rect = None
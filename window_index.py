@@ -0,0 +1,121 @@
+# -*- coding: utf-8 -*-
+"""
+顶层窗口索引 - 按进程缓存桌面上的顶层窗口，所有定位方式共用一次枚举
+"""
+
+import threading
+import time
+from stats import get_stats
+
+
+# 没有窗口事件时索引的最长复用时间（秒）
+MAX_AGE = 1.0
+
+# 由窗口事件维护时的兜底重建周期（秒），只防止漏掉事件后一直使用旧索引
+EVENT_MAX_AGE = 30.0
+
+
+class WindowIndex:
+    def __init__(self, backend, max_age=MAX_AGE, event_max_age=EVENT_MAX_AGE, clock=time.monotonic, stats=None):
+        """
+        初始化窗口索引
+        backend: UI自动化后端
+        max_age: 没有窗口事件时索引的最长复用时间（秒）
+        event_max_age: 由窗口事件维护时的兜底重建周期（秒）
+        clock: 时钟函数（便于测试）
+        stats: 性能统计，默认使用 stats.get_stats()
+        """
+        self.backend = backend
+        self.max_age = max_age
+        self.event_max_age = event_max_age
+        self.clock = clock
+        self.stats = stats if stats is not None else get_stats()
+
+        self._windows = []  # [(窗口, 进程ID)]
+        self._by_process = {}  # 进程ID -> [窗口]
+        self._built_at = None
+        self._generation = 0  # 每次失效加一
+        self._built_generation = -1
+        self._lock = threading.Lock()
+
+        # 统计
+        self.refreshes = 0
+
+        # 后端支持窗口打开/关闭事件时，索引在事件发生后或超过event_max_age时重建
+        # 订阅推迟到第一次使用索引时，避免启动时就加载后端
+        self._event_driven = False
+        self._subscribed = False
+
+    @property
+    def event_driven(self):
+        """索引是否由窗口事件维护"""
+        self._ensure_subscribed()
+        return self._event_driven
+
+    def _ensure_subscribed(self):
+        """第一次使用时订阅窗口事件"""
+        if self._subscribed:
+            return
+        self._subscribed = True
+
+        try:
+            self._event_driven = self.backend.subscribe_window_events(self.invalidate) is not None
+        except Exception:
+            self._event_driven = False
+
+    def invalidate(self):
+        """标记索引过期，下次使用时重建（可在事件线程中调用）"""
+        self._generation += 1
+
+    def begin_tick(self):
+        """
+        调度器每一轮开始时调用
+        没有窗口事件时，每轮最多枚举一次桌面
+        """
+        self._ensure_subscribed()
+        if not self._event_driven:
+            self.invalidate()
+
+    def windows(self):
+        """所有顶层窗口"""
+        self._ensure_fresh()
+        return [window for window, _ in self._windows]
+
+    def windows_for(self, process_id):
+        """某个进程的顶层窗口"""
+        self._ensure_fresh()
+        return list(self._by_process.get(process_id, ()))
+
+    def _ensure_fresh(self):
+        self._ensure_subscribed()
+        with self._lock:
+            now = self.clock()
+            generation = self._generation
+            max_age = self.event_max_age if self._event_driven else self.max_age
+            if self._built_generation == generation and now - self._built_at < max_age:
+                return
+
+            windows = []
+            by_process = {}
+
+            try:
+                children = self.backend.get_root().GetChildren()
+            except Exception as e:
+                self.stats.exception("window_index", e)
+                children = []
+
+            for window in children:
+                try:
+                    process_id = window.ProcessId
+                except Exception as e:
+                    # 枚举后窗口已关闭
+                    self.stats.exception("window_index", e)
+                    continue
+                windows.append((window, process_id))
+                by_process.setdefault(process_id, []).append(window)
+
+            self._windows = windows
+            self._by_process = by_process
+            self._built_at = now
+            self._built_generation = generation
+            self.refreshes += 1
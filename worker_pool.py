@@ -0,0 +1,263 @@
+# -*- coding: utf-8 -*-
+"""
+读取线程池 - 并发获取多个监控项的值，每个线程按后端要求初始化COM，
+同一进程同时只允许一个调用，挂起的目标程序不会拖住其他监控项
+"""
+
+import concurrent.futures
+import queue
+import threading
+import time
+
+
+class ProcessBusyError(Exception):
+    """目标进程上一次调用尚未返回"""
+    pass
+
+
+class WorkerPool:
+    def __init__(self, backend, max_workers=4, timeout=2.0):
+        """
+        初始化线程池
+        backend: UI自动化后端，用于在每个工作线程中初始化/释放COM
+        max_workers: 最大工作线程数
+        timeout: 默认的单次调用超时（秒）
+        """
+        self.backend = backend
+        self.max_workers = max(1, max_workers)
+        self.timeout = timeout
+
+        self._tasks = queue.Queue()
+        self._threads = []
+        self._busy_processes = set()  # 有调用正在执行的进程
+        self._stalled_processes = set()  # 调用已超时但仍在执行的进程，各占一个额外的工作线程
+        self._lock = threading.Lock()
+        self._running = True
+
+        # 统计
+        self.submitted = 0
+        self.completed = 0
+        self.timeouts = 0
+        self.rejected = 0
+        self.replaced = 0
+
+    @property
+    def queue_depth(self):
+        """排队等待执行的调用数"""
+        return self._tasks.qsize()
+
+    @property
+    def busy_processes(self):
+        """有调用正在执行的进程数"""
+        with self._lock:
+            return len(self._busy_processes)
+
+    def stats(self):
+        """线程池状态"""
+        with self._lock:
+            return {
+                "workers": len(self._threads),
+                "queue_depth": self._tasks.qsize(),
+                "busy_processes": len(self._busy_processes),
+                "stalled_processes": len(self._stalled_processes),
+                "submitted": self.submitted,
+                "completed": self.completed,
+                "timeouts": self.timeouts,
+                "rejected": self.rejected,
+                "replaced": self.replaced,
+            }
+
+    def submit(self, process_id, func, *args):
+        """
+        提交一个调用，返回Future
+        同一进程上一次调用尚未结束时，Future直接以 ProcessBusyError 结束
+        """
+        future = concurrent.futures.Future()
+
+        with self._lock:
+            if not self._running:
+                raise RuntimeError("线程池已关闭")
+
+            if process_id in self._busy_processes:
+                self.rejected += 1
+                future.set_exception(ProcessBusyError(f"进程 {process_id} 忙"))
+                return future
+
+            self._busy_processes.add(process_id)
+            self.submitted += 1
+            self._ensure_worker()
+
+        self._tasks.put((future, process_id, func, args))
+        return future
+
+    def map(self, calls, timeout=None):
+        """
+        并发执行一组调用并等待全部结果
+        calls: [(process_id, func, args), ...]
+        返回与calls对应的结果列表，失败或超时的位置为对应的异常对象
+        """
+        results = [None] * len(calls)
+        for index, result in self.imap(calls, timeout):
+            results[index] = result
+        return results
+
+    def imap(self, calls, timeout=None):
+        """
+        并发执行一组调用，按完成顺序逐个产生 (下标, 结果)
+        calls: [(process_id, func, args), ...]
+        同一进程的调用在一个工作线程中依次执行，不同进程的调用并发执行
+        timeout: 单次调用的超时（秒），某个进程开始执行后超过这个时间没有完成任何调用时，
+                 它剩余的调用都以 TimeoutError 结束，并为仍被占用的线程补充一个新线程
+        失败或超时的调用，结果为对应的异常对象
+        """
+        if timeout is None:
+            timeout = self.timeout
+
+        # 按进程分组
+        groups = {}
+        for index, (process_id, func, args) in enumerate(calls):
+            groups.setdefault(process_id, []).append(index)
+
+        done = queue.Queue()
+        batches = {}  # process_id -> 整组调用的Future
+        remaining = {}  # process_id -> 尚未完成的下标
+        progress = {}  # process_id -> 开始执行或上次完成调用的时间，还在排队时为None
+
+        for process_id, indexes in groups.items():
+            batch = [(i, calls[i][1], calls[i][2]) for i in indexes]
+            future = self.submit(process_id, _run_stream, batch, done.put)
+            if future.done() and future.exception() is not None:
+                # 进程忙：整组直接失败
+                for i in indexes:
+                    yield i, future.exception()
+                continue
+            batches[process_id] = future
+            remaining[process_id] = set(indexes)
+            progress[process_id] = None
+
+        owner = {i: process_id for process_id, indexes in remaining.items() for i in indexes}
+
+        while remaining:
+            # 排队中的调用不计时（超时的线程已被补充，它们很快会开始执行）
+            started = [last for last in progress.values() if last is not None]
+            wait = max(0.0, min(started) + timeout - time.monotonic()) if started else timeout
+            try:
+                index, result = done.get(timeout=wait)
+            except queue.Empty:
+                now = time.monotonic()
+                for process_id in [p for p, last in progress.items() if last is not None and now - last >= timeout]:
+                    self._stall(process_id)
+                    for i in remaining.pop(process_id):
+                        yield i, TimeoutError(f"进程 {process_id} 调用超时")
+                    del progress[process_id]
+                    del batches[process_id]
+                continue
+
+            process_id = owner[index]
+            if process_id not in remaining:
+                continue  # 已判定超时后才完成的调用
+
+            if result is _STARTED:
+                progress[process_id] = time.monotonic()
+                continue
+
+            remaining[process_id].discard(index)
+            progress[process_id] = time.monotonic()
+            if not remaining[process_id]:
+                del remaining[process_id]
+                del progress[process_id]
+                # 最后一个结果在工作线程释放进程之前就已报告，等整组结束后再交给调用方，
+                # 否则调用方马上再次提交同一进程的调用会被当作进程忙拒绝
+                concurrent.futures.wait((batches.pop(process_id),))
+
+            yield index, result
+
+    def _stall(self, process_id):
+        """记录超时仍在执行的进程，补充一个工作线程，不让它拖住其他进程"""
+        with self._lock:
+            self.timeouts += 1
+            if process_id in self._busy_processes and process_id not in self._stalled_processes:
+                self._stalled_processes.add(process_id)
+                self.replaced += 1
+                self._ensure_worker()
+
+    def shutdown(self):
+        """关闭线程池（不等待挂起的调用）"""
+        with self._lock:
+            self._running = False
+            threads = list(self._threads)
+
+        for _ in threads:
+            self._tasks.put(None)
+
+    def _ensure_worker(self):
+        """按需创建工作线程（调用时已持有锁）"""
+        # 每个忙碌的进程对应一个排队或执行中的调用，超时的进程各自额外占用一个线程
+        pending = len(self._busy_processes)
+        if len(self._threads) >= min(pending, self.max_workers + len(self._stalled_processes)):
+            return
+
+        thread = threading.Thread(target=self._worker, daemon=True)
+        self._threads.append(thread)
+        thread.start()
+
+    def _worker(self):
+        """工作线程：初始化COM后循环执行调用"""
+        self.backend.init_thread()
+
+        try:
+            while True:
+                task = self._tasks.get()
+                if task is None:
+                    break
+
+                future, process_id, func, args = task
+                run = False
+                result = error = None
+                try:
+                    run = future.set_running_or_notify_cancel()
+                    if run:
+                        try:
+                            result = func(*args)
+                        except BaseException as e:
+                            error = e
+                finally:
+                    # 先释放进程再通知调用方，调用方拿到结果后可以立即向同一进程提交下一个调用
+                    with self._lock:
+                        self._busy_processes.discard(process_id)
+                        self._stalled_processes.discard(process_id)
+                        self.completed += 1
+                        # 挂起的调用返回后，多补充的线程退出
+                        retire = len(self._threads) > self.max_workers + len(self._stalled_processes)
+
+                if run:
+                    if error is None:
+                        future.set_result(result)
+                    else:
+                        future.set_exception(error)
+
+                if retire:
+                    break
+        finally:
+            self.backend.uninit_thread()
+            with self._lock:
+                if threading.current_thread() in self._threads:
+                    self._threads.remove(threading.current_thread())
+
+
+# 一组调用开始执行的标记
+_STARTED = object()
+
+
+def _run_stream(batch, report):
+    """
+    依次执行同一进程的一组调用，开始时 report((第一个下标, _STARTED))，
+    之后每完成一个调用 report((下标, 结果))，单个调用的异常作为结果
+    """
+    report((batch[0][0], _STARTED))
+    for index, func, args in batch:
+        try:
+            result = func(*args)
+        except Exception as e:
+            result = e
+        report((index, result))